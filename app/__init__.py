@@ -2,21 +2,126 @@
 
 # Crea y configura la app Flask. 
 
+import atexit
+from typing import List
+
 from flask import Flask
-from .db import init_db
+from . import config
+from .archive import Archiver
+from .cache import QueryCache
+from .db import STORAGE_PROFILES, WalCheckpointer, init_db
+from .jsoncodec import install_json_provider
+from .metrics import METRICS, install_db_metrics, install_request_metrics
+from .ratelimit import RateLimiter, parse_limits
+from .shards import MAIN_DB, ShardedIngest, get_shards
+from .storage import CommitListener, archive_sources
+from .tail import TailHub
+from .writer import IngestQueue
 
-def create_app():
+def create_app(ingest_queue=None):
     """
     Fábrica de aplicaciones Flask.
     - Crea la instancia principal de Flask.
     - Registra los blueprints (grupos de rutas).
     - Devuelve la app lista para correr.
+    - ingest_queue: cola de ingesta externa (serve.py le pasa la del proceso writer); en ese
+      caso el checkpoint del WAL también queda a cargo del writer, y sus commits llegan a
+      app.extensions["commit_listeners"] por un CommitSubscriber.
     """
     # Creamos la instancia de Flask, __name__ inicializador
     app = Flask(__name__)
 
-    # Inicializamos DB al crear la App
-    init_db()
+    # A quién avisar después de cada commit de logs nuevos (cache, tail, cuotas): propios de esta app
+    commit_listeners: List[CommitListener] = []
+    app.extensions["commit_listeners"] = commit_listeners
+
+    # JSON de requests y respuestas con el codec rápido si está disponible (ver jsoncodec.py)
+    install_json_provider(app)
+
+    # Inicializamos DB al crear la App: la de LOGS_DB_PATH, o con sharding un archivo por
+    # servicio (ver shards.py); `databases` son las DBs en las que escribe este servidor
+    shards = get_shards() if config.SHARDING != "none" else None
+    if shards is not None:
+        shards.init()
+        app.extensions["shards"] = shards
+        databases = shards.shards
+    else:
+        init_db()
+        databases = [MAIN_DB]
+
+    # Con WAL, un hilo en segundo plano hace checkpoints periódicos (uno por DB)
+    wal_enabled = STORAGE_PROFILES[config.DB_PROFILE].get("journal_mode") == "WAL"
+    if wal_enabled and config.DB_CHECKPOINT_INTERVAL_S > 0 and ingest_queue is None:
+        for database in databases:
+            checkpointer = WalCheckpointer(database.engine, config.DB_CHECKPOINT_INTERVAL_S)
+            checkpointer.start()
+            atexit.register(checkpointer.stop)
+
+    # Archivo frío: los logs viejos pasan a segmentos comprimidos (con serve.py lo hace el writer)
+    if config.ARCHIVE_AFTER_DAYS > 0 and ingest_queue is None:
+        for database in databases:
+            archiver = Archiver(database.engine, archive_sources, config.ARCHIVE_AFTER_DAYS, config.ARCHIVE_INTERVAL_S,
+                                database.archive_dir, config.ARCHIVE_WINDOW, config.ARCHIVE_SEGMENT_MAX_ROWS)
+            archiver.start()
+            atexit.register(archiver.stop)
+
+    # Modo async: arrancamos el writer en segundo plano (group commit), uno por DB,
+    # y al apagar el proceso vaciamos las colas antes de salir
+    if ingest_queue is not None:
+        app.extensions["ingest_queue"] = ingest_queue
+    elif config.INGEST_MODE == "async":
+        queues = {}
+        for database in databases:
+            queue = IngestQueue(
+                database.sessions,
+                max_rows=config.INGEST_QUEUE_MAX_ROWS,
+                commit_rows=config.INGEST_COMMIT_ROWS,
+                commit_interval_ms=config.INGEST_COMMIT_INTERVAL_MS,
+                ack=config.INGEST_ACK,
+                ack_timeout_s=config.INGEST_ACK_TIMEOUT_S,
+                listeners=commit_listeners,
+            )
+            queue.start()
+            atexit.register(queue.stop)
+            queues[database.name] = queue
+        # Con shards, cada lote va a la cola del shard de su servicio
+        ingest_queue = ShardedIngest(shards, queues, config.INGEST_ACK) if shards is not None else queues[MAIN_DB.name]
+        app.extensions["ingest_queue"] = ingest_queue
+
+    # Cache de respuestas de GET /logs: cada commit de logs nuevos le avisa qué tocó
+    if config.QUERY_CACHE_MAX_BYTES > 0:
+        query_cache = QueryCache(
+            max_bytes=config.QUERY_CACHE_MAX_BYTES,
+            max_entries=config.QUERY_CACHE_MAX_ENTRIES,
+            ttl_s=config.QUERY_CACHE_TTL_S,
+        )
+        commit_listeners.append(query_cache.note_write)
+        app.extensions["query_cache"] = query_cache
+
+    # Tail en vivo (GET /logs/tail): ring buffer que alimentan los commits de logs nuevos
+    if config.TAIL_BUFFER_ROWS > 0:
+        tail_hub = TailHub(config.TAIL_BUFFER_ROWS, config.TAIL_MAX_SUBSCRIBERS)
+        commit_listeners.append(tail_hub.publish)
+        app.extensions["tail_hub"] = tail_hub
+
+    # Cuotas por token en POST /logs; los commits le avisan cuánto tardan (límites adaptativos)
+    if config.RATE_LIMIT_ENABLED:
+        rate_limiter = RateLimiter(
+            default_limits=(config.RATE_LIMIT_REQUESTS_PER_S, config.RATE_LIMIT_ITEMS_PER_S),
+            limits=parse_limits(config.RATE_LIMITS),
+            burst_s=config.RATE_LIMIT_BURST_S,
+            target_write_ms=config.RATE_LIMIT_TARGET_WRITE_MS,
+            min_factor=config.RATE_LIMIT_MIN_PERCENT / 100,
+        )
+        commit_listeners.append(rate_limiter.observe)
+        app.extensions["rate_limiter"] = rate_limiter
+
+    # Métricas (GET /metrics): duración de cada request y de cada sentencia SQL
+    METRICS.enabled = config.METRICS_ENABLED
+    if config.METRICS_ENABLED:
+        install_request_metrics(app)
+        for database in (shards.all() if shards is not None else databases):
+            install_db_metrics(database.engine)
 
     # Importamos y registramos las rutas definidas en routes.py
     from .routes import bp as routes_bp
@@ -0,0 +1,473 @@
+# archive.py — archivo frío: logs viejos en segmentos columnares comprimidos fuera de la DB
+
+# Con LOGS_ARCHIVE_AFTER_DAYS=N, un hilo en segundo plano (Archiver) saca de la DB los logs
+# recibidos hace más de N días y los escribe en archivos "segmento" (uno por ventana de
+# received_at, diaria u horaria) dentro de LOGS_ARCHIVE_DIR. La DB queda con lo reciente:
+# índices, page cache, backups y VACUUM trabajan sobre mucho menos.
+#
+# Formato de un segmento (inmutable, se escribe una vez y no se toca más):
+#   MAGIC | largo del header (4 bytes) | header JSON | bloques de columnas
+# Cada columna es un bloque zlib independiente, así una lectura descomprime solo las que usa:
+# - id, timestamp, received_at: enteros (fechas en µs) con deltas entre filas consecutivas
+# - service, severity, token_used, message: diccionario de valores distintos + un código por fila
+# Las filas van ordenadas como las devuelve GET /logs (received_at DESC, id DESC).
+#
+# Lectura (GET /logs, /logs/export): storage.iter_log_rows suma los segmentos que pueden tener
+# filas para la consulta, según los rangos y services/severities del registro (tabla log_segments),
+# sin abrir los demás. Un segmento se abre recién cuando sus filas pueden entrar en la página
+# (una consulta que se llena con logs recientes no lee ninguno). Dentro de un segmento se filtra
+# primero con las columnas de los filtros y las demás se decodifican solo si algo coincide.
+# La búsqueda full-text (q) no incluye los segmentos: su índice FTS5 vive en la DB.
+
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from heapq import heappop, heappush
+from itertools import accumulate
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from .metrics import METRICS
+from .models import LogSegment
+from .partitions import GRANULARITIES, partition_start
+from .rollups import expand_minute_counts, subtract_counts
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LOGSEG1\n"
+HEADER_SIZE = struct.Struct("!I")
+SEGMENT_SUFFIX = ".logseg"
+
+SEGMENTS_TABLE = LogSegment.__table__
+
+INT_COLUMNS = ("id", "timestamp", "received_at")
+TEXT_COLUMNS = ("service", "severity", "token_used", "message")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+# Una fila leída de un segmento: mismos atributos que las filas de la tabla logs
+class ArchivedLog(NamedTuple):
+    id: int
+    timestamp: datetime
+    received_at: datetime
+    service: str
+    severity: str
+    message: str
+    token_used: str
+
+
+# Fechas naive (como las guarda SQLite) ↔ µs desde 1970
+def to_micros(dt: datetime) -> int:
+    return (dt.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(us: int) -> datetime:
+    return EPOCH + timedelta(microseconds=us)
+
+
+# Los arrays se guardan little-endian, sea cual sea la máquina
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_ints(values: List[int]) -> bytes:
+    deltas = array("q", (b - a for a, b in zip([0] + values, values)))
+    return zlib.compress(_to_bytes(deltas))
+
+
+def _decode_ints(block: bytes) -> List[int]:
+    return list(accumulate(_from_bytes("q", zlib.decompress(block))))
+
+
+def _encode_texts(values: List[str]) -> bytes:
+    codes_by_value: Dict[str, int] = {}
+    codes = array("I", (codes_by_value.setdefault(value, len(codes_by_value)) for value in values))
+    dictionary = json.dumps(list(codes_by_value), ensure_ascii=False).encode()
+    return zlib.compress(HEADER_SIZE.pack(len(dictionary)) + dictionary + _to_bytes(codes))
+
+
+# Devuelve (valores distintos, código de cada fila)
+def _decode_texts(block: bytes) -> Tuple[List[str], array]:
+    data = zlib.decompress(block)
+    size = HEADER_SIZE.unpack_from(data)[0]
+    dictionary = json.loads(data[HEADER_SIZE.size:HEADER_SIZE.size + size])
+    return dictionary, _from_bytes("I", data[HEADER_SIZE.size + size:])
+
+
+# Escribe un segmento con `rows` (dicts o filas con las columnas de logs, ya ordenadas
+# received_at DESC, id DESC). Escribe a un .tmp y renombra: nunca queda un segmento a medias.
+# Devuelve el tamaño en bytes.
+def write_segment(path: str, rows: List[Any]) -> int:
+    columns: Dict[str, bytes] = {}
+    for name in INT_COLUMNS:
+        values = [getattr(row, name) for row in rows]
+        columns[name] = _encode_ints(values if name == "id" else [to_micros(v) for v in values])
+    for name in TEXT_COLUMNS:
+        columns[name] = _encode_texts([getattr(row, name) for row in rows])
+
+    layout: Dict[str, List[int]] = {}
+    offset = 0
+    for name, block in columns.items():
+        layout[name] = [offset, len(block)]
+        offset += len(block)
+    header = json.dumps({"version": 1, "rows": len(rows), "columns": layout}).encode()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + HEADER_SIZE.pack(len(header)) + header)
+        for block in columns.values():
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class SegmentReader:
+    """Lee columnas sueltas de un segmento: cada ints()/texts() descomprime solo esa columna."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: no es un segmento de logs")
+            size = HEADER_SIZE.unpack(f.read(HEADER_SIZE.size))[0]
+            header = json.loads(f.read(size))
+        self.rows: int = header["rows"]
+        self._layout: Dict[str, List[int]] = header["columns"]
+        self._data_start = len(MAGIC) + HEADER_SIZE.size + size
+
+    def _block(self, name: str) -> bytes:
+        offset, length = self._layout[name]
+        with open(self.path, "rb") as f:
+            f.seek(self._data_start + offset)
+            return f.read(length)
+
+    def ints(self, name: str) -> List[int]:
+        return _decode_ints(self._block(name))
+
+    def texts(self, name: str) -> Tuple[List[str], array]:
+        return _decode_texts(self._block(name))
+
+
+# Filas de un segmento que cumplen los filtros de GET /logs (sin q), en orden received_at DESC.
+# Se decodifican primero las columnas de los filtros; el resto, solo si alguna fila coincide.
+def iter_segment_rows(path: str, filters: Dict[str, Any],
+                      after: Optional[Tuple[datetime, int]] = None) -> Iterator[ArchivedLog]:
+    reader = SegmentReader(path)
+    received = reader.ints("received_at")
+    ids = reader.ints("id")
+    selected: Iterable[int] = range(reader.rows)
+
+    if filters.get("received_start"):
+        bound = to_micros(filters["received_start"])
+        selected = [i for i in selected if received[i] >= bound]
+    if filters.get("received_end"):
+        bound = to_micros(filters["received_end"])
+        selected = [i for i in selected if received[i] <= bound]
+    if after is not None:
+        after_key = (to_micros(after[0]), after[1])
+        selected = [i for i in selected if (received[i], ids[i]) < after_key]
+
+    timestamps = None
+    if filters.get("timestamp_start") or filters.get("timestamp_end"):
+        timestamps = reader.ints("timestamp")
+        if filters.get("timestamp_start"):
+            bound = to_micros(filters["timestamp_start"])
+            selected = [i for i in selected if timestamps[i] >= bound]
+        if filters.get("timestamp_end"):
+            bound = to_micros(filters["timestamp_end"])
+            selected = [i for i in selected if timestamps[i] <= bound]
+
+    texts: Dict[str, Tuple[List[str], array]] = {}
+    for name, wanted in (("service", filters.get("service")), ("severity", filters.get("severity"))):
+        if not wanted:
+            continue
+        wanted = wanted.upper() if name == "severity" else wanted
+        texts[name] = dictionary, codes = reader.texts(name)
+        if wanted not in dictionary:
+            return
+        code = dictionary.index(wanted)
+        selected = [i for i in selected if codes[i] == code]
+
+    selected = list(selected)
+    if not selected:
+        return
+
+    # Columnas para armar las filas (las de los filtros ya están decodificadas)
+    if timestamps is None:
+        timestamps = reader.ints("timestamp")
+    for name in TEXT_COLUMNS:
+        if name not in texts:
+            texts[name] = reader.texts(name)
+    services, service_codes = texts["service"]
+    severities, severity_codes = texts["severity"]
+    tokens, token_codes = texts["token_used"]
+    messages, message_codes = texts["message"]
+    for i in selected:
+        yield ArchivedLog(
+            id=ids[i],
+            timestamp=from_micros(timestamps[i]),
+            received_at=from_micros(received[i]),
+            service=services[service_codes[i]],
+            severity=severities[severity_codes[i]],
+            message=messages[message_codes[i]],
+            token_used=tokens[token_codes[i]],
+        )
+
+
+# Segmentos del registro que pueden tener filas para los filtros, el más nuevo primero.
+# Rangos de fecha en SQL; services/severities (pocos segmentos, listas cortas) acá.
+def matching_segments(conn: Connection, filters: Dict[str, Any],
+                      after: Optional[Tuple[datetime, int]] = None) -> List[Any]:
+    t = SEGMENTS_TABLE
+    query = select(t)
+    if filters.get("timestamp_start"):
+        query = query.where(t.c.timestamp_max >= filters["timestamp_start"].replace(tzinfo=None))
+    if filters.get("timestamp_end"):
+        query = query.where(t.c.timestamp_min <= filters["timestamp_end"].replace(tzinfo=None))
+    if filters.get("received_start"):
+        query = query.where(t.c.received_max >= filters["received_start"].replace(tzinfo=None))
+    if filters.get("received_end"):
+        query = query.where(t.c.received_min <= filters["received_end"].replace(tzinfo=None))
+    if after is not None:
+        query = query.where(t.c.received_min <= after[0].replace(tzinfo=None))
+    segments = conn.execute(query.order_by(t.c.received_max.desc(), t.c.id_max.desc())).all()
+
+    service = filters.get("service")
+    severity = (filters.get("severity") or "").upper()
+    matching = [
+        segment for segment in segments
+        if (not service or service in json.loads(segment.services))
+        and (not severity or severity in json.loads(segment.severities))
+    ]
+    METRICS.inc("logs_archive_segments_pruned_total", len(segments) - len(matching))
+    return matching
+
+
+class _Head:
+    """Primera fila pendiente de un stream, en el heap de merge_archived (mayor clave primero)."""
+    __slots__ = ("key", "order", "row", "stream")
+
+    def __init__(self, key: Tuple[datetime, int], order: int, row: Any, stream: Iterator[Any]):
+        self.key = key
+        self.order = order
+        self.row = row
+        self.stream = stream
+
+    def __lt__(self, other: "_Head") -> bool:
+        return (self.key, -self.order) > (other.key, -other.order)
+
+
+# Combina las filas de la DB (`hot`, ya ordenadas received_at DESC, id DESC) con las de los
+# segmentos, en el mismo orden. Cada segmento se abre recién cuando su fila más nueva puede
+# ganarle a la mejor fila pendiente: si la página se llena antes, no se lee.
+def merge_archived(hot: Iterable[Any], segments: List[Any], archive_dir: str, filters: Dict[str, Any],
+                   after: Optional[Tuple[datetime, int]] = None) -> Iterator[Any]:
+    heap: List[_Head] = []
+
+    def push(stream: Iterator[Any], order: int) -> None:
+        row = next(stream, None)
+        if row is not None:
+            heappush(heap, _Head((row.received_at, row.id), order, row, stream))
+
+    push(iter(hot), 0)
+    pending: Deque[Any] = deque(segments)
+    opened = 0
+    while heap or pending:
+        while pending and (not heap or (pending[0].received_max, pending[0].id_max) >= heap[0].key):
+            segment = pending.popleft()
+            opened += 1
+            METRICS.inc("logs_archive_segments_read_total")
+            push(iter_segment_rows(os.path.join(archive_dir, segment.file), filters, after), opened)
+        if not heap:
+            continue
+        head = heappop(heap)
+        yield head.row
+        push(head.stream, head.order)
+
+
+# Escritura: mueve a segmentos los logs recibidos antes de `cutoff`, una ventana por vez.
+# `tables` = de dónde leer y de qué tabla borrar, [(tabla o vista para leer, tabla para borrar)].
+# Cada segmento: se escribe el archivo, y en una transacción se registra y se borran sus filas
+# (si la cantidad borrada no coincide, rollback y el archivo se descarta). Devuelve los segmentos.
+def archive_before(engine: Engine, tables: Callable[[Connection], List[Tuple[Any, Any]]], cutoff: datetime,
+                   archive_dir: str, window: str = "daily", max_rows: int = 250_000) -> List[str]:
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = cutoff.replace(tzinfo=None)
+    _, window_length = GRANULARITIES[window]
+    created: List[str] = []
+    while True:
+        with engine.begin() as conn:
+            sources = tables(conn)
+            oldest = [conn.execute(select(func.min(read.c.received_at)).where(read.c.received_at < cutoff)).scalar()
+                      for read, _ in sources]
+            oldest = [value for value in oldest if value is not None]
+            if not oldest:
+                return created
+            window_start = partition_start(min(oldest), window)
+            window_end = min(window_start + window_length, cutoff)
+
+            # Las filas más viejas de la ventana (hasta max_rows entre todas las tablas)
+            rows: List[Any] = []
+            for read, _ in sources:
+                c = read.c
+                query = (
+                    select(read)
+                    .where(c.received_at >= window_start, c.received_at < window_end)
+                    .order_by(c.received_at, c.id)
+                    .limit(max_rows)
+                )
+                rows.extend(conn.execute(query))
+            rows.sort(key=lambda row: (row.received_at, row.id))
+            rows = rows[:max_rows]
+            last = (rows[-1].received_at, rows[-1].id)
+            rows.reverse()   # en el segmento: received_at DESC, id DESC
+
+            id_min = min(row.id for row in rows)
+            id_max = max(row.id for row in rows)
+            name = f"seg_{window_start:%Y%m%d%H}_{id_min}-{id_max}{SEGMENT_SUFFIX}"
+            path = os.path.join(archive_dir, name)
+            size = write_segment(path, rows)
+            try:
+                conn.execute(insert(SEGMENTS_TABLE), {
+                    "file": name,
+                    "rows": len(rows),
+                    "bytes": size,
+                    "id_min": id_min,
+                    "id_max": id_max,
+                    "timestamp_min": min(row.timestamp for row in rows),
+                    "timestamp_max": max(row.timestamp for row in rows),
+                    "received_min": rows[-1].received_at,
+                    "received_max": rows[0].received_at,
+                    "services": json.dumps(sorted({row.service for row in rows})),
+                    "severities": json.dumps(sorted({row.severity for row in rows})),
+                })
+                deleted = 0
+                for _, target in sources:
+                    c = target.c
+                    result = conn.execute(
+                        delete(target).where(c.received_at >= window_start, tuple_(c.received_at, c.id) <= tuple_(*last))
+                    )
+                    deleted += result.rowcount
+                if deleted != len(rows):
+                    raise RuntimeError(f"{name}: se iban a borrar {len(rows)} filas y coincidieron {deleted}")
+            except BaseException:
+                os.remove(path)
+                raise
+        created.append(name)
+        logger.info("archivo: %d logs de %s → %s", len(rows), window_start.isoformat(), name)
+
+
+# Retención de segmentos: borra los que solo tienen logs recibidos antes de `cutoff`.
+# Primero el registro (commit), después los archivos. Devuelve los nombres borrados.
+def drop_segments_before(engine: Engine, archive_dir: str, cutoff: datetime) -> List[str]:
+    t = SEGMENTS_TABLE
+    with engine.begin() as conn:
+        names = conn.execute(select(t.c.file).where(t.c.received_max < cutoff.replace(tzinfo=None))).scalars().all()
+        if names:
+            # Sus logs siguen contados en los rollups: se restan en la misma transacción
+            for name in names:
+                path = os.path.join(archive_dir, name)
+                if os.path.exists(path):
+                    subtract_counts(conn, expand_minute_counts(segment_minute_counts(path)))
+            conn.execute(delete(t).where(t.c.file.in_(names)))
+    for name in names:
+        path = os.path.join(archive_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    return list(names)
+
+
+# Conteos por (minuto, service, severity) de los logs archivados, para recalcular los rollups.
+# Solo se descomprimen las columnas timestamp, service y severity de cada segmento.
+def archived_minute_counts(conn: Connection, archive_dir: str) -> Counter:
+    counts: Counter = Counter()
+    for segment in list_segments(conn):
+        counts.update(segment_minute_counts(os.path.join(archive_dir, segment.file)))
+    return counts
+
+
+# Lo mismo para un segmento
+def segment_minute_counts(path: str) -> Counter:
+    counts: Counter = Counter()
+    reader = SegmentReader(path)
+    services, service_codes = reader.texts("service")
+    severities, severity_codes = reader.texts("severity")
+    minute_us = 60_000_000
+    for ts, service_code, severity_code in zip(reader.ints("timestamp"), service_codes, severity_codes):
+        minute = from_micros(ts - ts % minute_us)
+        counts[(minute, services[service_code], severities[severity_code])] += 1
+    return counts
+
+
+# Segmentos registrados, el más nuevo primero
+def list_segments(conn: Connection) -> List[Any]:
+    t = SEGMENTS_TABLE
+    return conn.execute(select(t).order_by(t.c.received_max.desc())).all()
+
+
+class Archiver:
+    """
+    Hilo en segundo plano que cada `interval_s` segundos archiva los logs recibidos hace más
+    de `after_days` días (ver archive_before). Corre donde se escribe la DB: el proceso de
+    run.py o el writer de serve.py.
+    """
+
+    def __init__(self, engine: Engine, tables: Callable[[Connection], List[Tuple[Any, Any]]], after_days: int,
+                 interval_s: float, archive_dir: str, window: str, max_rows: int):
+        if window not in GRANULARITIES:
+            raise ValueError(f"ventana de archivo desconocida: {window!r} (opciones: {sorted(GRANULARITIES)})")
+        self._engine = engine
+        self._tables = tables
+        self._after = timedelta(days=after_days)
+        self._interval_s = interval_s
+        self._archive_dir = archive_dir
+        self._window = window
+        self._max_rows = max_rows
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self) -> List[str]:
+        cutoff = datetime.now(timezone.utc) - self._after
+        return archive_before(self._engine, self._tables, cutoff, self._archive_dir, self._window, self._max_rows)
+
+    def _run(self) -> None:
+        # Primera pasada enseguida (un servidor recién levantado puede tener mucho para archivar)
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("no se pudieron archivar logs viejos")
+            if self._stop.wait(self._interval_s):
+                return
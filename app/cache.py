@@ -0,0 +1,165 @@
+# cache.py — cache LRU de respuestas de GET /logs (en memoria del proceso)
+
+# Los dashboards piden las mismas pocas combinaciones de filtros cada pocos segundos.
+# Guardamos la respuesta ya serializada (bytes del JSON + X-Next-Cursor) por consulta
+# normalizada, así un acierto no toca la DB ni vuelve a serializar filas.
+# Invalidación por "generación": cada commit de logs nuevos suma 1 a la generación y
+# deja su resumen (services, severities, rangos de tiempo). Una entrada de una generación
+# vieja solo se descarta si alguna escritura posterior pudo cambiar su resultado;
+# si no, se revalida y sigue sirviendo.
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+from .storage import WriteSummary
+
+# Cuántos resúmenes de escrituras recordamos. Una entrada más vieja que el más viejo
+# recordado no se puede revalidar y se descarta.
+WRITE_HISTORY = 1024
+
+
+class QueryScope:
+    """Qué filas puede devolver una consulta: filtros exactos y rangos (naive; None = sin límite)."""
+
+    def __init__(self, service: Optional[str] = None, severity: Optional[str] = None,
+                 timestamp_start: Optional[datetime] = None, timestamp_end: Optional[datetime] = None,
+                 received_start: Optional[datetime] = None, received_end: Optional[datetime] = None):
+        self.service = service
+        # Las severities se guardan en mayúsculas (como filtra build_logs_query): ?severity=error == ERROR
+        self.severity = severity.upper() if severity else None
+        self.timestamp_start = timestamp_start.replace(tzinfo=None) if timestamp_start else None
+        self.timestamp_end = timestamp_end.replace(tzinfo=None) if timestamp_end else None
+        self.received_start = received_start.replace(tzinfo=None) if received_start else None
+        self.received_end = received_end.replace(tzinfo=None) if received_end else None
+
+    # ¿Alguna fila de esta escritura pudo entrar en el resultado? (conservador: ante la duda, sí)
+    def affected_by(self, write: WriteSummary) -> bool:
+        if self.service is not None and self.service not in write.services:
+            return False
+        if self.severity is not None and self.severity not in write.severities:
+            return False
+        if not _overlaps(self.timestamp_start, self.timestamp_end, write.timestamp_min, write.timestamp_max):
+            return False
+        if not _overlaps(self.received_start, self.received_end, write.received_min, write.received_max):
+            return False
+        return True
+
+
+def _overlaps(start: Optional[datetime], end: Optional[datetime], lo: datetime, hi: datetime) -> bool:
+    return (start is None or hi >= start) and (end is None or lo <= end)
+
+
+class CachedResponse:
+    __slots__ = ("body", "headers", "scope", "generation", "stored_at")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], scope: QueryScope, generation: int):
+        self.body = body
+        self.headers = headers
+        self.scope = scope
+        self.generation = generation
+        self.stored_at = time.monotonic()
+
+
+class QueryCache:
+    """
+    LRU acotado por bytes y por cantidad de entradas.
+    - generation: leerla ANTES de ejecutar la consulta y pasarla a put(); así una
+      escritura que se confirme mientras tanto se detecta en el próximo get().
+    - note_write(): listener de commits (app.extensions["commit_listeners"]).
+    - ttl_s: tope de vida de una entrada, por escrituras que este proceso no ve
+      (otro proceso, manage.py retention); 0 = sin tope.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_s: int = 0):
+        self.max_bytes = max_bytes
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._writes: Deque[Tuple[int, WriteSummary]] = deque(maxlen=WRITE_HISTORY)
+        self._lock = threading.Lock()
+
+        # Contadores para monitoreo
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._expired(entry) or self._stale(entry):
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            entry.generation = self._generation   # revalidada hasta la generación actual
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, headers: Dict[str, str], scope: QueryScope, generation: int) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CachedResponse(body, headers, scope, generation)
+            self._bytes += len(body)
+            # Desalojamos las menos usadas hasta volver a los límites
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def note_write(self, summary: WriteSummary) -> None:
+        with self._lock:
+            self._generation += 1
+            self._writes.append((self._generation, summary))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def _expired(self, entry: CachedResponse) -> bool:
+        return self.ttl_s > 0 and time.monotonic() - entry.stored_at > self.ttl_s
+
+    # ¿Alguna escritura posterior a la entrada pudo cambiar su resultado?
+    def _stale(self, entry: CachedResponse) -> bool:
+        if entry.generation == self._generation:
+            return False
+        if not self._writes or self._writes[0][0] > entry.generation + 1:
+            # ya no recordamos todas las escrituras desde que se guardó
+            return True
+        # de la más nueva hacia atrás, hasta llegar a la generación de la entrada
+        for generation, summary in reversed(self._writes):
+            if generation <= entry.generation:
+                break
+            if entry.scope.affected_by(summary):
+                return True
+        return False
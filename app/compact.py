@@ -0,0 +1,202 @@
+# compact.py — layout de almacenamiento compacto (LOGS_STORAGE_LAYOUT=compact)
+
+# En el layout "wide" cada fila de logs repite service, severity, el token de 64
+# caracteres y el mensaje completo. En el compacto, logs_compact guarda solo ids
+# enteros a diccionarios (log_services, log_severities, log_tokens, log_messages):
+# cada texto distinto se guarda una vez, así las filas y sus índices ocupan menos
+# disco y entran más en el cache de páginas.
+# - escritura: los textos se traducen a ids con un cache en memoria (Interner)
+# - lectura: la vista logs_compact_view tiene exactamente las columnas de logs,
+#   así que GET /logs, la búsqueda y los rollups la usan como una tabla más y
+#   la respuesta es idéntica a la del layout wide.
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import MetaData, Table, event, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import config
+from .fts import ensure_fts, fts_enabled
+from .models import CompactLog, Log, LogMessage, LogService, LogSeverity, LogToken
+from .partitions import allocate_ids
+
+COMPACT_TABLE = CompactLog.__table__
+
+VIEW_NAME = "logs_compact_view"
+
+# Los diccionarios se resuelven con la vista (JOIN por primary key). Con value único en los
+# diccionarios chicos, un filtro como service = 'reports' arranca por el diccionario y usa
+# los mismos índices (service_id, received_at) que el layout wide.
+VIEW_SQL = f"""
+CREATE VIEW IF NOT EXISTS "{VIEW_NAME}" AS
+SELECT c.id AS id, c.timestamp AS timestamp, c.received_at AS received_at,
+       s.value AS service, v.value AS severity, m.value AS message, t.value AS token_used
+FROM logs_compact c
+JOIN log_services s ON s.id = c.service_id
+JOIN log_severities v ON v.id = c.severity_id
+JOIN log_messages m ON m.id = c.message_id
+JOIN log_tokens t ON t.id = c.token_id
+"""
+
+# La vista como tabla Core (mismas columnas que logs) para armar consultas sobre ella
+COMPACT_VIEW = Table(VIEW_NAME, MetaData(), *[column._copy() for column in Log.__table__.columns])
+
+# Cómo sacan el texto del mensaje los triggers de la FTS ({row} = new/old)
+FTS_MESSAGE_SQL = "(SELECT value FROM log_messages WHERE id = {row}.message_id)"
+
+# Clave en session.info con los ids creados en la transacción (ver Interner)
+PENDING_KEY = "compact_interned"
+
+# Máximo de valores por consulta IN (SQLite limita la cantidad de parámetros)
+LOOKUP_CHUNK = 500
+
+
+# Hash estable de 64 bits (con signo, como los INTEGER de SQLite) para buscar mensajes
+def value_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class Interner:
+    """
+    Traduce textos a ids de un diccionario, con cache en memoria (LRU si hay max_cached).
+    - hashed: el diccionario se busca por hash (log_messages) en vez de por value único.
+    - Los ids creados dentro de una transacción quedan pendientes en la sesión y pasan al
+      cache recién con el commit: si hay rollback, el cache no apunta a filas que no existen.
+    """
+
+    def __init__(self, table: Table, hashed: bool = False, max_cached: Optional[int] = None):
+        self.table = table
+        self.hashed = hashed
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ids(self, session: Session, values: Iterable[str]) -> Dict[str, int]:
+        pending = session.info.setdefault(PENDING_KEY, {}).setdefault(self.table.name, {})
+        found: Dict[str, int] = {}
+        missing: List[str] = []
+        with self._lock:
+            for value in values:
+                value_id = self._cache.get(value)
+                if value_id is not None:
+                    self._cache.move_to_end(value)
+                else:
+                    value_id = pending.get(value)
+                if value_id is None:
+                    missing.append(value)
+                else:
+                    found[value] = value_id
+        if missing:
+            created = self._resolve(session.connection(), missing)
+            pending.update(created)
+            found.update(created)
+        return found
+
+    # Agrega al cache los ids confirmados por un commit
+    def promote(self, created: Dict[str, int]) -> None:
+        with self._lock:
+            self._cache.update(created)
+            while self.max_cached is not None and len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # Busca en la DB los valores que no estaban en el cache y crea los que falten
+    def _resolve(self, conn: Connection, values: List[str]) -> Dict[str, int]:
+        t = self.table
+        result: Dict[str, int] = {}
+        for start in range(0, len(values), LOOKUP_CHUNK):
+            chunk = set(values[start:start + LOOKUP_CHUNK])
+            if self.hashed:
+                condition = t.c.hash.in_({value_hash(value) for value in chunk})
+            else:
+                condition = t.c.value.in_(chunk)
+            for value_id, value in conn.execute(select(t.c.id, t.c.value).where(condition)):
+                # con hash puede venir otro texto con el mismo hash: solo vale si el texto coincide
+                if value in chunk:
+                    result[value] = value_id
+
+        new_values = [value for value in values if value not in result]
+        if new_values:
+            params = [
+                {"value": value, "hash": value_hash(value)} if self.hashed else {"value": value}
+                for value in new_values
+            ]
+            for value_id, value in conn.execute(insert(t).returning(t.c.id, t.c.value), params):
+                result[value] = value_id
+        return result
+
+
+SERVICES = Interner(LogService.__table__)
+SEVERITIES = Interner(LogSeverity.__table__)
+TOKENS = Interner(LogToken.__table__)
+MESSAGES = Interner(LogMessage.__table__, hashed=True, max_cached=config.COMPACT_MESSAGE_CACHE)
+INTERNERS = {interner.table.name: interner for interner in (SERVICES, SEVERITIES, TOKENS, MESSAGES)}
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_interned(session: Session) -> None:
+    for name, created in session.info.pop(PENDING_KEY, {}).items():
+        INTERNERS[name].promote(created)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_interned(session: Session, transaction) -> None:
+    # Si la transacción terminó sin commit (rollback, close), los ids pendientes no existen
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+# ¿Hay filas en la tabla logs (wide)? En layout compacto nadie escribe ahí, así que alcanza
+# con mirarlo una vez: si tiene datos de antes del cambio de layout, las lecturas la incluyen.
+_wide_rows: Optional[bool] = None
+
+
+def has_wide_rows(conn: Connection) -> bool:
+    global _wide_rows
+    if _wide_rows is None:
+        _wide_rows = conn.execute(select(Log.id).limit(1)).first() is not None
+    return _wide_rows
+
+
+# Crea la vista (y su FTS) y limpia los caches en memoria (pueden venir de otra DB)
+def ensure_compact_schema(conn: Connection) -> None:
+    global _wide_rows
+    conn.exec_driver_sql(VIEW_SQL)
+    if fts_enabled():
+        ensure_fts(conn, VIEW_NAME, source_table=COMPACT_TABLE.name, message_sql=FTS_MESSAGE_SQL)
+    for interner in INTERNERS.values():
+        interner.clear()
+    _wide_rows = None
+
+
+# Inserta un lote (mismas filas que insert_rows) en logs_compact
+def insert_compact(session: Session, rows: List[Dict[str, Any]]) -> None:
+    conn = session.connection()
+    # Primero la secuencia de ids: el UPDATE toma el lock de escritura, así los diccionarios
+    # se leen y completan sin que otro proceso agregue el mismo valor en el medio
+    first_id = allocate_ids(conn, len(rows))
+    services = SERVICES.ids(session, {row["service"] for row in rows})
+    severities = SEVERITIES.ids(session, {row["severity"] for row in rows})
+    tokens = TOKENS.ids(session, {row["token_used"] for row in rows})
+    messages = MESSAGES.ids(session, {row["message"] for row in rows})
+    for offset, row in enumerate(rows):
+        row["id"] = first_id + offset
+    conn.execute(insert(COMPACT_TABLE), [
+        {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "received_at": row["received_at"],
+            "service_id": services[row["service"]],
+            "severity_id": severities[row["severity"]],
+            "token_id": tokens[row["token_used"]],
+            "message_id": messages[row["message"]],
+        }
+        for row in rows
+    ])
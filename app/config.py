@@ -0,0 +1,164 @@
+# config.py — configuración del servidor de logs
+# Todo se puede cambiar por variables de entorno (sin tocar el código).
+
+import os
+
+
+# Lee un entero de una variable de entorno (o usa el default si no está)
+def env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name)
+    return int(raw) if raw else default
+
+
+# Lee un booleano ("1"/"true"/"yes" = True) de una variable de entorno
+def env_bool(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Modo de ingesta de POST /logs:
+# - "sync": escribe y hace commit dentro del request (responde 201)
+# - "async": encola las filas validadas y responde 202; un writer en segundo plano hace commit en grupo
+INGEST_MODE = os.environ.get("LOGS_INGEST_MODE", "sync")
+
+# Máximo de filas esperando en la cola (si se llena, POST /logs responde 503)
+INGEST_QUEUE_MAX_ROWS = env_int("LOGS_INGEST_QUEUE_MAX_ROWS", 50_000)
+
+# Cuándo se da por aceptado un lote encolado (modo async y serve.py):
+# - "enqueue": al entrar en la cola (responde 202; si el commit falla después, se pierde)
+# - "commit": el request espera al commit de su grupo (responde 201, o 503 si falla o tarda más de
+#   LOGS_INGEST_ACK_TIMEOUT_S); sigue habiendo group commit entre requests concurrentes
+INGEST_ACK = os.environ.get("LOGS_INGEST_ACK", "enqueue")
+INGEST_ACK_TIMEOUT_S = env_int("LOGS_INGEST_ACK_TIMEOUT_S", 30)
+
+# Group commit: el writer hace commit al juntar N filas o al pasar X milisegundos (lo que ocurra primero)
+INGEST_COMMIT_ROWS = env_int("LOGS_INGEST_COMMIT_ROWS", 2_000)
+INGEST_COMMIT_INTERVAL_MS = env_int("LOGS_INGEST_COMMIT_INTERVAL_MS", 5)
+
+# Archivo SQLite de la DB (antes fijo en "logs.db")
+DB_PATH = os.environ.get("LOGS_DB_PATH", "logs.db")
+
+# Perfil de almacenamiento (ver STORAGE_PROFILES en db.py):
+# - "concurrent": WAL + pragmas afinados, lectores y escritores no se bloquean entre sí
+# - "default": configuración por defecto de SQLite (journal rollback)
+DB_PROFILE = os.environ.get("LOGS_DB_PROFILE", "concurrent")
+
+# Conexiones que mantiene el pool (una por hilo atendiendo requests a la vez)
+DB_POOL_SIZE = env_int("LOGS_DB_POOL_SIZE", 8)
+
+# Cada cuántos segundos el checkpointer en segundo plano vuelca el WAL a la DB (0 = desactivado)
+DB_CHECKPOINT_INTERVAL_S = env_int("LOGS_DB_CHECKPOINT_INTERVAL_S", 30)
+
+# Ajustes finos que pisan los del perfil (si la variable no está, se usa el valor del perfil)
+DB_PRAGMA_OVERRIDES = {
+    pragma: os.environ[var]
+    for pragma, var in (
+        ("synchronous", "LOGS_DB_SYNCHRONOUS"),
+        ("busy_timeout", "LOGS_DB_BUSY_TIMEOUT_MS"),
+        ("mmap_size", "LOGS_DB_MMAP_SIZE"),
+        ("cache_size", "LOGS_DB_CACHE_SIZE"),
+    )
+    if os.environ.get(var)
+}
+
+# POST /logs valida e inserta el lote en tandas de N ítems (así NDJSON/gzip no cargan todo en memoria)
+INGEST_CHUNK_ITEMS = env_int("LOGS_INGEST_CHUNK_ITEMS", 1_000)
+
+# Topes del cuerpo de POST /logs (si se pasan: 413). El del cuerpo cuenta los bytes ya descomprimidos
+# (un gzip de pocos KB puede inflarse a gigas); el de línea acota lo que se junta esperando un "\n" en NDJSON.
+INGEST_MAX_BODY_BYTES = env_int("LOGS_INGEST_MAX_BODY_BYTES", 64 * 1024 * 1024)
+INGEST_MAX_LINE_BYTES = env_int("LOGS_INGEST_MAX_LINE_BYTES", 1024 * 1024)
+
+# Particionado por tiempo (según `timestamp` del log):
+# - "none": todo en la tabla logs
+# - "daily" / "hourly": una tabla por día / por hora (logs_pYYYYMMDD / logs_pYYYYMMDDHH);
+#   las consultas con rango de timestamp solo tocan las particiones que se solapan,
+#   y la retención borra particiones enteras (DROP TABLE) en vez de filas.
+PARTITIONING = os.environ.get("LOGS_PARTITIONING", "none")
+
+# Búsqueda full-text (GET /logs?q=...) con un índice FTS5 sobre el mensaje, mantenido por triggers.
+# Cada INSERT también actualiza el índice, así que es opcional: se prende con LOGS_FTS=1.
+# Apagada, q se busca como subcadena con LIKE '%q%' (escanea los mensajes; sin rank ni highlight).
+FTS_ENABLED = env_bool("LOGS_FTS", False)
+
+# Rollups: conteos de logs por (bucket de tiempo, service, severity) para GET /logs/stats.
+# Se actualizan en la misma transacción que el INSERT de los logs; LOGS_ROLLUPS=0 los apaga
+# (si se vuelven a prender, `python manage.py rebuild-rollups` los recalcula).
+ROLLUPS_ENABLED = env_bool("LOGS_ROLLUPS", True)
+
+# Cache de respuestas de GET /logs (LRU en memoria, ver cache.py). 0 bytes = desactivado.
+# El TTL es un tope por escrituras que este proceso no ve (otros procesos, manage.py).
+QUERY_CACHE_MAX_BYTES = env_int("LOGS_QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+QUERY_CACHE_MAX_ENTRIES = env_int("LOGS_QUERY_CACHE_MAX_ENTRIES", 1_000)
+QUERY_CACHE_TTL_S = env_int("LOGS_QUERY_CACHE_TTL_S", 60)
+
+# Layout de almacenamiento de los logs:
+# - "wide": tabla logs, cada fila con sus textos (service, severity, token, mensaje)
+# - "compact": tabla logs_compact con ids a diccionarios (mensajes repetidos se guardan una vez);
+#   se lee a través de una vista con las mismas columnas. Por ahora no se combina con particiones.
+STORAGE_LAYOUT = os.environ.get("LOGS_STORAGE_LAYOUT", "wide")
+
+# Cuántos mensajes distintos recuerda en memoria el camino de ingesta del layout compacto
+COMPACT_MESSAGE_CACHE = env_int("LOGS_COMPACT_MESSAGE_CACHE", 100_000)
+
+# GET /logs/tail (ver tail.py): cuántos logs recientes guarda el ring buffer en memoria
+# (0 = tail desactivado), máximo de suscriptores a la vez y cada cuánto se manda un keepalive
+TAIL_BUFFER_ROWS = env_int("LOGS_TAIL_BUFFER_ROWS", 10_000)
+TAIL_MAX_SUBSCRIBERS = env_int("LOGS_TAIL_MAX_SUBSCRIBERS", 100)
+TAIL_HEARTBEAT_S = env_int("LOGS_TAIL_HEARTBEAT_S", 15)
+
+# Cuotas por token en POST /logs (ver ratelimit.py). Apagadas por defecto: se prenden con LOGS_RATE_LIMIT=1.
+# Cada token puede mandar LOGS_RATE_LIMIT_REQUESTS_PER_S requests y LOGS_RATE_LIMIT_ITEMS_PER_S logs
+# por segundo, con ráfagas de LOGS_RATE_LIMIT_BURST_S segundos. LOGS_RATE_LIMITS pisa tokens puntuales:
+# "svc-chat-789=5:2000,svc-reports-123=100:50000" (requests/s:logs/s).
+# Con serve.py cada worker lleva sus propios buckets: el tope real de un token es N workers × la cuota.
+RATE_LIMIT_ENABLED = env_bool("LOGS_RATE_LIMIT", False)
+RATE_LIMIT_REQUESTS_PER_S = env_int("LOGS_RATE_LIMIT_REQUESTS_PER_S", 50)
+RATE_LIMIT_ITEMS_PER_S = env_int("LOGS_RATE_LIMIT_ITEMS_PER_S", 20_000)
+RATE_LIMIT_BURST_S = env_int("LOGS_RATE_LIMIT_BURST_S", 2)
+RATE_LIMITS = os.environ.get("LOGS_RATE_LIMITS", "")
+
+# Límites adaptativos: si el promedio de lo que tarda cada commit supera este objetivo,
+# las cuotas de todos los tokens se achican (hasta LOGS_RATE_LIMIT_MIN_PERCENT %) y vuelven
+# a crecer cuando la latencia baja. 0 = cuotas fijas.
+RATE_LIMIT_TARGET_WRITE_MS = env_int("LOGS_RATE_LIMIT_TARGET_WRITE_MS", 250)
+RATE_LIMIT_MIN_PERCENT = env_int("LOGS_RATE_LIMIT_MIN_PERCENT", 10)
+
+# serve.py (modo producción): procesos HTTP pre-forkeados + un proceso writer dedicado.
+# Los workers le pasan las filas validadas al writer por un socket Unix (uno por DB).
+SERVE_WORKERS = env_int("LOGS_SERVE_WORKERS", os.cpu_count() or 2)
+WRITER_SOCKET = os.environ.get("LOGS_WRITER_SOCKET", DB_PATH + ".writer.sock")
+
+# Métricas en GET /metrics (texto de Prometheus, ver metrics.py): duración por etapa de
+# POST/GET /logs, logs aceptados/rechazados, sentencias SQL y pool de conexiones.
+METRICS_ENABLED = env_bool("LOGS_METRICS", True)
+
+# Token de administración para GET /debug/profile (profiler por muestreo). Vacío = endpoint apagado.
+ADMIN_TOKEN = os.environ.get("LOGS_ADMIN_TOKEN", "")
+
+# Archivo frío (ver archive.py): los logs recibidos hace más de LOGS_ARCHIVE_AFTER_DAYS días
+# salen de la DB a segmentos columnares comprimidos en LOGS_ARCHIVE_DIR (0 = no se archiva).
+# Un segmento por ventana de received_at ("daily" / "hourly"), de hasta
+# LOGS_ARCHIVE_SEGMENT_MAX_ROWS filas; se revisa cada LOGS_ARCHIVE_INTERVAL_S segundos.
+ARCHIVE_AFTER_DAYS = env_int("LOGS_ARCHIVE_AFTER_DAYS", 0)
+ARCHIVE_DIR = os.environ.get("LOGS_ARCHIVE_DIR", DB_PATH + ".archive")
+ARCHIVE_WINDOW = os.environ.get("LOGS_ARCHIVE_WINDOW", "daily")
+ARCHIVE_SEGMENT_MAX_ROWS = env_int("LOGS_ARCHIVE_SEGMENT_MAX_ROWS", 250_000)
+ARCHIVE_INTERVAL_S = env_int("LOGS_ARCHIVE_INTERVAL_S", 3600)
+
+# Codec JSON de la API (ver jsoncodec.py): "stdlib" (default), "auto" (orjson si está instalado) u "orjson".
+# stdlib por defecto: con orjson los mensajes no ASCII salen en UTF-8 y no como \uXXXX (otros bytes para los clientes)
+JSON_BACKEND = os.environ.get("LOGS_JSON", "stdlib")
+
+# Sharding por servicio (ver shards.py): cada servicio escribe en su propio archivo SQLite, con su
+# propio writer, así la ingesta de servicios distintos corre en paralelo y uno ruidoso no frena al resto.
+# - "none": una sola DB (LOGS_DB_PATH)
+# - "service": un shard por servicio de TOKENS: <LOGS_SHARD_DIR>/<servicio>.db
+# - "hash": LOGS_SHARD_COUNT shards fijos, cada servicio va al de crc32(servicio) % N
+# GET /logs consulta los shards en paralelo con un pool de LOGS_SHARD_QUERY_THREADS hilos.
+SHARDING = os.environ.get("LOGS_SHARDING", "none")
+SHARD_DIR = os.environ.get("LOGS_SHARD_DIR", DB_PATH + ".shards")
+SHARD_COUNT = env_int("LOGS_SHARD_COUNT", 4)
+SHARD_QUERY_THREADS = env_int("LOGS_SHARD_QUERY_THREADS", 8)
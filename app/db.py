@@ -1,17 +1,145 @@
 # db.py — Conexión y sesión de base de datos
 
-from sqlalchemy import create_engine # Es la función que crea el motor de conexión a la base de datos
-from sqlalchemy.orm import sessionmaker # 
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event, text # create_engine crea el motor de conexión a la base de datos | event: hooks (ej: al abrir cada conexión)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker #
+from . import config
 from .models import Base
+from .compact import ensure_compact_schema
+from .fts import ensure_fts, fts_enabled
+from .partitions import ensure_partitions_fts, init_id_sequence
+
+logger = logging.getLogger(__name__)
+
+# Perfiles de almacenamiento: PRAGMAs que se aplican a cada conexión nueva.
+# - journal_mode=WAL: lectores y escritores no se bloquean entre sí (un solo escritor a la vez)
+# - synchronous=NORMAL: con WAL es seguro ante caídas del proceso, y evita un fsync por commit
+# - busy_timeout: en vez de fallar con "database is locked", espera hasta N ms por el lock
+# - mmap_size / cache_size: más páginas en memoria (cache_size negativo = KiB)
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "concurrent": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+# Arma el motor para un archivo SQLite con el perfil pedido
+def make_engine(db_path: str, profile: str = "concurrent", pool_size: int = 5,
+                pragma_overrides: Optional[Dict[str, Any]] = None) -> Engine:
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"perfil de almacenamiento desconocido: {profile!r} (opciones: {sorted(STORAGE_PROFILES)})")
+    pragmas = {**STORAGE_PROFILES[profile], **(pragma_overrides or {})}
+
+    # check_same_thread=False: el pool presta cada conexión a un hilo por vez, pero no siempre al mismo
+    # timeout: espera del driver por el lock (en segundos), alineada con busy_timeout
+    connect_args = {"check_same_thread": False}
+    if "busy_timeout" in pragmas:
+        connect_args["timeout"] = int(pragmas["busy_timeout"]) / 1000.0
+
+    # echo=False: si lo pones True, imprime en consola cada query SQL que ejecuta | future=True: usa el estilo más nuevo de SQLAlchemy
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False,
+        future=True,
+        connect_args=connect_args,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+    )
+
+    # Cada conexión nueva del pool recibe los PRAGMAs del perfil
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
 
-# Motor SQLite (archivo local logs.db), crea el motor de conexión a la DB.
-# "sqlite:///logs.db": ruta de la DB (archivo SQLite en el proyecto) | echo=False: si lo pones True, imprime en consola cada query SQL que ejecuta | future=True: usa el estilo más nuevo de SQLAlchemy
-ENGINE = create_engine("sqlite:///logs.db", echo=False, future=True)
+
+# Motor SQLite (por defecto el archivo local logs.db), crea el motor de conexión a la DB.
+ENGINE = make_engine(
+    config.DB_PATH,
+    config.DB_PROFILE,
+    pool_size=config.DB_POOL_SIZE,
+    pragma_overrides=config.DB_PRAGMA_OVERRIDES,
+)
 
 # Sesión para consultar/insertar (abrir/cerrar por request), crea la fábrica de sesiones, que son las que realmente usamos para insertar/consultar datos.
 # bind=ENGINE: esta sesión va a usar el motor de conexión que definimos arriba | autoflush=False: no manda cambios automáticamente hasta que llamemos a commit() | autocommit=False: no confirma automáticamente, también requiere commit()
 SessionLocal = sessionmaker(bind=ENGINE, autoflush=False, autocommit=False, future=True)
 
-# Crear tablas si no existen
-def init_db():
-    Base.metadata.create_all(bind=ENGINE)
+# Crear tablas (e índices) si no existen
+def init_db(engine: Engine = ENGINE):
+    if config.STORAGE_LAYOUT not in ("wide", "compact"):
+        raise ValueError(f"layout de almacenamiento desconocido: {config.STORAGE_LAYOUT!r} (opciones: wide, compact)")
+    if config.STORAGE_LAYOUT == "compact" and config.PARTITIONING != "none":
+        raise ValueError("LOGS_STORAGE_LAYOUT=compact todavía no se combina con LOGS_PARTITIONING")
+    if config.SHARDING not in ("none", "service", "hash"):
+        raise ValueError(f"sharding desconocido: {config.SHARDING!r} (opciones: none, service, hash)")
+    # Los caches en memoria del layout compacto (diccionarios) y de las particiones conocidas son de una sola DB
+    if config.SHARDING != "none" and (config.STORAGE_LAYOUT != "wide" or config.PARTITIONING != "none"):
+        raise ValueError("LOGS_SHARDING todavía no se combina con LOGS_STORAGE_LAYOUT=compact ni con LOGS_PARTITIONING")
+    Base.metadata.create_all(bind=engine)
+    migrate_indexes(engine)
+    with engine.begin() as conn:
+        # Secuencia global de ids (la usan las particiones por tiempo, el layout compacto y los shards)
+        init_id_sequence(conn)
+        # Índice full-text del mensaje (si la DB ya tenía logs, se indexan ahora), también en las
+        # particiones que se crearon con la FTS apagada
+        if fts_enabled():
+            ensure_fts(conn, "logs")
+            ensure_partitions_fts(conn)
+        # Layout compacto: vista con las columnas de logs (+ su FTS)
+        if config.STORAGE_LAYOUT == "compact":
+            ensure_compact_schema(conn)
+
+
+# Migración para DBs existentes: create_all solo crea los índices junto con tablas nuevas,
+# así que en un logs.db viejo creamos los que falten (idempotente: checkfirst)
+def migrate_indexes(engine: Engine = ENGINE):
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+class WalCheckpointer:
+    """
+    Hilo en segundo plano que cada `interval_s` segundos hace
+    PRAGMA wal_checkpoint(PASSIVE): vuelca el WAL a la DB sin bloquear
+    a lectores ni escritores, así el archivo -wal no crece sin límite.
+    """
+
+    def __init__(self, engine: Engine, interval_s: float):
+        self._engine = engine
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="wal-checkpointer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                with self._engine.connect() as conn:
+                    conn.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+            except Exception:
+                logger.exception("no se pudo hacer checkpoint del WAL")
@@ -0,0 +1,131 @@
+# fts.py — búsqueda full-text sobre el mensaje de los logs (SQLite FTS5)
+
+# Cada tabla de logs (logs o una partición) tiene al lado una tabla virtual FTS5
+# "<tabla>_fts" de contenido externo: el texto no se duplica, solo se guarda el índice
+# invertido. Dos triggers la mantienen sincronizada en la misma transacción del INSERT
+# (y del DELETE, por si se borran filas). Así GET /logs?q=... no tiene que escanear mensajes.
+
+import logging
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text
+from sqlalchemy.engine import Connection
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Marcas que rodean cada término encontrado en el campo "highlight" de la respuesta
+HIGHLIGHT_OPEN = "["
+HIGHLIGHT_CLOSE = "]"
+
+# Hasta cuántas coincidencias una búsqueda se considera "selectiva" (ver fts_is_selective)
+SELECTIVE_MATCHES = 5_000
+
+FTS_METADATA = MetaData()
+_fts_tables: Dict[str, Table] = {}
+_fts_tables_lock = threading.Lock()
+
+
+# ¿El SQLite de este Python trae FTS5? (viene en casi todas las builds, pero no es obligatorio)
+def fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(message)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# FTS activa = pedida por config (LOGS_FTS) y soportada por SQLite
+@lru_cache(maxsize=None)
+def fts_enabled() -> bool:
+    if not config.FTS_ENABLED:
+        return False
+    if not fts5_available():
+        logger.warning("SQLite sin FTS5: la búsqueda full-text (q=) queda desactivada")
+        return False
+    return True
+
+
+# Chequea la sintaxis de una búsqueda FTS5 contra una FTS vacía en memoria.
+# Lanza ValueError si es inválida (así el error es un 400 y no un 500 a mitad de un stream).
+def validate_fts_query(q: str) -> None:
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(message)")
+        conn.execute("SELECT rowid FROM probe WHERE probe MATCH ?", (q,)).fetchall()
+    except sqlite3.OperationalError as e:
+        raise ValueError(str(e)) from e
+    finally:
+        conn.close()
+
+
+def fts_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+# Tabla Core para usar la FTS en consultas (rowid = id del log)
+def fts_table(table_name: str) -> Table:
+    name = fts_name(table_name)
+    with _fts_tables_lock:
+        table = _fts_tables.get(name)
+        if table is None:
+            table = Table(name, FTS_METADATA, Column("rowid", Integer), Column("message", Text))
+            _fts_tables[name] = table
+        return table
+
+
+# Crea la FTS de una tabla de logs + los triggers que la mantienen al día (idempotente).
+# Si la FTS es nueva y la tabla ya tenía filas, las indexa ("rebuild").
+# `table_name` es de donde la FTS lee id/message (una tabla o la vista del layout compacto);
+# si los logs se insertan en otra tabla, `source_table` es esa tabla y `message_sql` cómo
+# sacar el mensaje de cada fila en los triggers ({row} = new/old).
+def ensure_fts(conn: Connection, table_name: str, source_table: Optional[str] = None,
+               message_sql: str = "{row}.message") -> None:
+    name = fts_name(table_name)
+    source_table = source_table or table_name
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).first()
+    if not exists:
+        # remove_diacritics: "conexion" encuentra "Conexión"
+        conn.exec_driver_sql(
+            f'CREATE VIRTUAL TABLE "{name}" USING fts5('
+            f"message, content='{table_name}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+    new_message = message_sql.format(row="new")
+    old_message = message_sql.format(row="old")
+    conn.exec_driver_sql(
+        f'CREATE TRIGGER IF NOT EXISTS "{name}_ai" AFTER INSERT ON "{source_table}" BEGIN '
+        f'INSERT INTO "{name}"(rowid, message) VALUES (new.id, {new_message}); END'
+    )
+    conn.exec_driver_sql(
+        f'CREATE TRIGGER IF NOT EXISTS "{name}_ad" AFTER DELETE ON "{source_table}" BEGIN '
+        f'INSERT INTO "{name}"("{name}", rowid, message) VALUES (\'delete\', old.id, {old_message}); END'
+    )
+    if not exists:
+        logger.info("indexando mensajes existentes de %s en %s", table_name, name)
+        conn.exec_driver_sql(f'INSERT INTO "{name}"("{name}") VALUES (\'rebuild\')')
+
+
+# Borra la FTS de una tabla (sus triggers se van solos con el DROP de la tabla de logs)
+def drop_fts(conn: Connection, table_name: str) -> None:
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{fts_name(table_name)}"')
+
+
+# ¿La búsqueda tiene pocas coincidencias en esta tabla? Cuenta como mucho SELECTIVE_MATCHES
+# (barato: es recorrer la lista de documentos del índice). Con pocas conviene buscar por id y
+# ordenar; con muchas, recorrer el índice de received_at y cortar al llenar la página.
+def fts_is_selective(conn: Connection, table_name: str, q: str) -> bool:
+    name = fts_name(table_name)
+    count = conn.exec_driver_sql(
+        f'SELECT count(*) FROM (SELECT rowid FROM "{name}" WHERE "{name}" MATCH ? LIMIT ?)',
+        (q, SELECTIVE_MATCHES),
+    ).scalar_one()
+    return count < SELECTIVE_MATCHES
@@ -0,0 +1,95 @@
+# jsoncodec.py — codificación/decodificación JSON de la API (orjson si está instalado)
+
+# Todo el JSON de la app pasa por acá: el cuerpo de POST /logs (request.get_json y cada línea
+# NDJSON), las respuestas (jsonify) y las líneas de /logs/export y /logs/tail.
+# - "orjson": implementado en Rust, varias veces más rápido que el json de la stdlib para
+#   decodificar lotes y para serializar páginas de GET /logs (pip install orjson)
+# - "stdlib": el módulo json de Python (siempre disponible)
+# LOGS_JSON=stdlib (default) deja las respuestas byte a byte como siempre; LOGS_JSON=auto usa
+# orjson si se puede importar (si no, la stdlib) y LOGS_JSON=orjson lo pide explícitamente.
+#
+# Las respuestas son equivalentes con los dos: claves ordenadas y sin espacios (como el
+# provider por defecto de Flask). Diferencias de orjson: el texto no ASCII va en UTF-8 en vez
+# de \uXXXX, y al decodificar rechaza NaN/Infinity, enteros de más de 64 bits y surrogates
+# sueltos (el cuerpo se responde como JSON inválido).
+
+import json
+import logging
+from typing import Any
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:   # dependencia opcional
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "stdlib")
+
+
+# Backend efectivo según config.JSON_BACKEND y lo instalado
+def json_backend() -> str:
+    if config.JSON_BACKEND not in BACKENDS:
+        raise ValueError(f"backend JSON desconocido: {config.JSON_BACKEND!r} (opciones: {', '.join(BACKENDS)})")
+    if config.JSON_BACKEND == "stdlib":
+        return "stdlib"
+    if orjson is None:
+        if config.JSON_BACKEND == "orjson":
+            logger.warning("LOGS_JSON=orjson pero orjson no está instalado: se usa el json de la stdlib")
+        return "stdlib"
+    return "orjson"
+
+
+BACKEND = json_backend()
+
+
+if BACKEND == "orjson":
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    # JSON compacto con claves ordenadas, en bytes (lo que se manda por la red)
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=_ORJSON_OPTIONS)
+
+    # Lanza ValueError (orjson.JSONDecodeError) si no es JSON válido
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True,
+                          separators=(",", ":")).encode()
+
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Provider de Flask (app.json) sobre este módulo: jsonify, request.get_json y
+    current_app.json.dumps usan el backend elegido. Con la stdlib se comporta como el default.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if BACKEND == "stdlib":
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if BACKEND == "stdlib":
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    # jsonify(): los bytes van directo a la respuesta (sin pasar por str), con el "\n" final de Flask
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if BACKEND == "stdlib" or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def install_json_provider(app: Flask) -> None:
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,225 @@
+# metrics.py — métricas del servidor en formato de texto de Prometheus (GET /metrics)
+
+# Todo queda en memoria del proceso; sumar es barato (un lock + unas sumas):
+# - histogramas de duración por etapa: `with METRICS.timed("logs_stage_seconds", endpoint="ingest",
+#   stage="validate")` (decode, validate, insert, commit, query, serialize, ...)
+# - contadores: filas aceptadas por servicio, rechazadas por tipo de error, requests por endpoint
+# - DB: tiempo por tipo de sentencia (incluye la espera del lock de escritura de SQLite, que no
+#   se puede medir aparte), locks vencidos ("database is locked") y estado del pool de conexiones
+# En serve.py cada worker tiene sus propias métricas: /metrics muestra las del que atiende.
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites de los buckets de los histogramas (segundos): de 100 µs a 10 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Descripción de cada métrica (# HELP); las que no están acá salen sin descripción
+HELP = {
+    "logs_stage_seconds": "Duración de cada etapa de POST /logs (ingest) y GET /logs (list)",
+    "logs_http_request_seconds": "Duración de los requests por endpoint",
+    "logs_http_requests_total": "Requests por endpoint y código de respuesta",
+    "logs_rows_accepted_total": "Logs aceptados por POST /logs, por servicio",
+    "logs_rows_rejected_total": "Logs rechazados por POST /logs, por tipo de error",
+    "logs_db_statement_seconds": "Duración de cada sentencia SQL por tipo (incluye esperas por el lock)",
+    "logs_db_lock_timeouts_total": "Sentencias que fallaron con 'database is locked'",
+    "logs_db_pool_connections": "Conexiones del pool por estado",
+    "logs_ingest_queue_rows": "Filas esperando en la cola de ingesta (modo async / serve.py)",
+    "logs_archive_segments_read_total": "Segmentos del archivo frío abiertos por GET /logs y /logs/export",
+    "logs_archive_segments_pruned_total": "Segmentos descartados por service/severity sin abrirlos",
+    "logs_shard_query_seconds": "Duración de la consulta de GET /logs en cada shard (LOGS_SHARDING)",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """Contadores e histogramas con labels. enabled=False: todas las operaciones no hacen nada."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    @contextmanager
+    def timed(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # Recorre un iterador midiendo cuánto tarda cada next() (ej. decodificar el cuerpo por tandas)
+    def timed_iter(self, iterable, name: str, **labels: str):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.observe(name, time.perf_counter() - start, **labels)
+            yield item
+
+    # Texto de Prometheus (exposition format 0.0.4). gauges: valores del momento {nombre: [(labels, valor)]}
+    def render(self, gauges: Optional[Dict[str, List[Tuple[Labels, float]]]] = None) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()),
+                key=lambda item: item[0],
+            )
+        lines: List[str] = []
+        declared = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in declared:
+                declared.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for name, samples in sorted((gauges or {}).items()):
+            declare(name, "gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), counts, total, count in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+METRICS = Metrics()
+
+
+# Tipo de error de validación sin las partes variables, para usarlo como label:
+# "missing field: timestamp" → "missing field"; "service mismatch for token (expected 'x')" → "service mismatch for token"
+_ERROR_DETAIL = re.compile(r"\s*[:(].*$")
+
+
+def error_type(message: str) -> str:
+    return _ERROR_DETAIL.sub("", message) or "unknown"
+
+
+# Duración por tipo de sentencia y locks vencidos, con los eventos del engine.
+# Una sola vez por engine (create_app puede llamarse varias veces en el mismo proceso).
+def install_db_metrics(engine: Engine) -> None:
+    if event.contains(engine, "after_cursor_execute", _end_statement):
+        return
+    event.listen(engine, "before_cursor_execute", _start_statement)
+    event.listen(engine, "after_cursor_execute", _end_statement)
+    event.listen(engine, "handle_error", _statement_error)
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if starts:
+        kind = statement.lstrip()[:6].upper()
+        METRICS.observe("logs_db_statement_seconds", time.perf_counter() - starts.pop(),
+                        kind=kind.lower() if kind in ("INSERT", "SELECT", "UPDATE", "DELETE") else "other")
+
+
+def _statement_error(context):
+    starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    if "database is locked" in str(context.original_exception):
+        METRICS.inc("logs_db_lock_timeouts_total")
+
+
+# Estado del pool en el momento (QueuePool: tamaño, prestadas, libres, overflow).
+# Con sharding hay un pool por shard: `shard` va como label.
+def pool_gauges(engine: Engine, shard: Optional[str] = None) -> Dict[str, List[Tuple[Labels, float]]]:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    prefix: Labels = (("shard", shard),) if shard else ()
+    return {"logs_db_pool_connections": [
+        (prefix + (("state", "size"),), pool.size()),
+        (prefix + (("state", "checked_out"),), pool.checkedout()),
+        (prefix + (("state", "checked_in"),), pool.checkedin()),
+        (prefix + (("state", "overflow"),), max(0, pool.overflow())),
+    ]}
+
+
+# Duración y código de cada request (endpoint = nombre de la vista en Flask, no la URL: pocos valores)
+def install_request_metrics(app: Flask) -> None:
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            endpoint = request.endpoint or "not_found"
+            METRICS.observe("logs_http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+            METRICS.inc("logs_http_requests_total", endpoint=endpoint, status=str(response.status_code))
+        return response
@@ -3,7 +3,7 @@
 
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column #Es una clase base que usamos para declarar nuestros modelos ORM, Cada modelo (ej: Log) hereda de esta base,| Es un tipo genérico (tipo anotación) para indicar que un atributo de la clase es una columna de la DB | Es la función que define la columna real dentro del modelo. Ahí se ponen las configuraciones: tipo SQL, si es primary_key, nullable, default, etc.
-from sqlalchemy import String, DateTime, Integer, Text
+from sqlalchemy import String, DateTime, Integer, Text, Index
 
 # Base para los modelos (requerido por SQLAlchemy)
 class Base(DeclarativeBase):
@@ -13,6 +13,17 @@ class Base(DeclarativeBase):
 class Log(Base):
     __tablename__ = "logs"
 
+    # Índices pensados para los filtros de GET /logs, que siempre ordena por received_at DESC.
+    # Cada uno termina en received_at: SQLite busca por el prefijo (igualdad) y recorre el índice
+    # al revés para devolver ya ordenado, sin escanear la tabla ni ordenar en memoria.
+    __table_args__ = (
+        Index("ix_logs_received_at", "received_at"),                                       # sin filtros / rango de received_at
+        Index("ix_logs_service_received_at", "service", "received_at"),                    # service
+        Index("ix_logs_severity_received_at", "severity", "received_at"),                  # severity
+        Index("ix_logs_service_severity_received_at", "service", "severity", "received_at"),  # service + severity
+        Index("ix_logs_timestamp", "timestamp"),                                           # rango de timestamp
+    )
+
     # id autoincremental (clave primaria)
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -31,3 +42,109 @@ class Log(Base):
     # para trazabilidad (qué token usó)
     token_used: Mapped[str] = mapped_column(String(64), nullable=False)
 
+
+# Secuencia global de ids de logs. Con particiones por tiempo cada tabla tendría su propio
+# autoincremental; asignando los ids desde acá siguen siendo únicos en todas las particiones.
+class LogIdSequence(Base):
+    __tablename__ = "log_id_seq"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    next_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+# Registro de particiones por tiempo (cada fila = 1 tabla logs_p<YYYYMMDD[HH]>)
+# start_at/end_at: rango [inicio, fin) de `timestamp` que guarda esa tabla
+class LogPartition(Base):
+    __tablename__ = "log_partitions"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    start_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    end_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+# Archivo frío (ver archive.py): cada fila = 1 segmento, un archivo columnar comprimido e inmutable
+# con los logs de una ventana de received_at que salieron de la DB. Los rangos y los services /
+# severities (listas JSON) sirven para descartar segmentos sin abrirlos.
+# La fila se inserta en la misma transacción que borra esos logs de las tablas: una lectura ve
+# cada log en la DB o en un segmento, nunca en los dos ni en ninguno.
+class LogSegment(Base):
+    __tablename__ = "log_segments"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    file: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False)
+    bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    id_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    id_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    timestamp_min: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    timestamp_max: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    received_min: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    received_max: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    services: Mapped[str] = mapped_column(Text, nullable=False)
+    severities: Mapped[str] = mapped_column(Text, nullable=False)
+
+# Rollups: cantidad de logs por bucket de tiempo (según `timestamp`), service y severity.
+# granularity: "1m", "1h" o "1d"; bucket_start: inicio del bucket. Ver rollups.py.
+# La clave primaria empieza por (granularity, bucket_start): un rango de tiempo es un seek + recorrido.
+class LogRollup(Base):
+    __tablename__ = "log_rollups"
+
+    __table_args__ = (
+        Index("ix_log_rollups_service", "granularity", "service", "bucket_start"),   # filtro por service
+    )
+
+    granularity: Mapped[str] = mapped_column(String(2), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    service: Mapped[str] = mapped_column(String(100), primary_key=True)
+    severity: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+# --- Layout compacto (config.STORAGE_LAYOUT = "compact", ver compact.py) ---
+# Cada log guarda referencias enteras a diccionarios en vez de repetir los textos.
+
+# Diccionarios chicos (services, severities, tokens): value único => filtrar por nombre es un seek
+class LogService(Base):
+    __tablename__ = "log_services"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+
+class LogSeverity(Base):
+    __tablename__ = "log_severities"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[str] = mapped_column(String(20), nullable=False, unique=True)
+
+class LogToken(Base):
+    __tablename__ = "log_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+
+# Mensajes deduplicados: se indexa un hash de 64 bits del texto (no el texto, que duplicaría su tamaño)
+class LogMessage(Base):
+    __tablename__ = "log_messages"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hash: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
+
+# Logs en layout compacto: mismos índices que Log, con ids de diccionario en lugar de textos.
+# El id sale de la secuencia global (log_id_seq), así no choca con los de la tabla logs.
+class CompactLog(Base):
+    __tablename__ = "logs_compact"
+
+    __table_args__ = (
+        Index("ix_logs_compact_received_at", "received_at"),
+        Index("ix_logs_compact_service_received_at", "service_id", "received_at"),
+        Index("ix_logs_compact_severity_received_at", "severity_id", "received_at"),
+        Index("ix_logs_compact_service_severity_received_at", "service_id", "severity_id", "received_at"),
+        Index("ix_logs_compact_timestamp", "timestamp"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    received_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    service_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    severity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    token_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    message_id: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -0,0 +1,205 @@
+# partitions.py — almacenamiento particionado por tiempo
+
+# Con LOGS_PARTITIONING=daily|hourly cada log va a una tabla según su `timestamp`
+# (logs_p20250827 o logs_p2025082710). Todas tienen las mismas columnas e índices
+# que la tabla logs, así que para el resto de la app siguen siendo "logs":
+# - escritura: cada fila se enruta a su partición (se crea la primera vez que se usa)
+# - lectura: solo se consultan las particiones que se solapan con timestamp_start/end
+# - retención: se borran particiones enteras con DROP TABLE (no hay DELETE que infle el archivo)
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import Index, MetaData, Table, delete, event, insert, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .fts import drop_fts, ensure_fts, fts_enabled
+from .models import Log, LogIdSequence, LogPartition
+from .rollups import expand_minute_counts, subtract_counts, table_minute_counts
+
+# Granularidad → (formato del sufijo de la tabla, largo de cada partición)
+GRANULARITIES = {
+    "daily": ("%Y%m%d", timedelta(days=1)),
+    "hourly": ("%Y%m%d%H", timedelta(hours=1)),
+}
+
+TABLE_PREFIX = "logs_p"
+
+# Tablas de partición (Core). Van en un MetaData aparte: create_all() no las crea, se crean a demanda.
+PARTITION_METADATA = MetaData()
+_tables: Dict[str, Table] = {}
+_tables_lock = threading.Lock()
+
+# Particiones que ya sabemos que existen en la DB (evita el CREATE ... IF NOT EXISTS en cada lote).
+# Vale mientras no cambie el esquema: si otro proceso borra una partición (retención),
+# PRAGMA schema_version cambia y volvemos a chequear.
+_known_partitions: Set[str] = set()
+_known_schema_version: Optional[int] = None
+
+# Clave en session.info con las particiones creadas en la transacción: pasan a _known_partitions
+# recién con el commit (si hay rollback, el CREATE TABLE se deshace y no quedan anotadas)
+PENDING_KEY = "partitions_created"
+
+
+# Naive (sin tz) como lo guarda SQLite: el rango de una partición se compara contra lo almacenado
+def _naive(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=None)
+
+
+# Inicio de la partición que contiene `ts`
+def partition_start(ts: datetime, granularity: str) -> datetime:
+    ts = _naive(ts)
+    if granularity == "hourly":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def partition_name(start: datetime, granularity: str) -> str:
+    fmt, _ = GRANULARITIES[granularity]
+    return TABLE_PREFIX + start.strftime(fmt)
+
+
+# Tabla Core de una partición: mismas columnas e índices que logs (índices con el nombre de la tabla)
+def partition_table(name: str) -> Table:
+    with _tables_lock:
+        table = _tables.get(name)
+        if table is None:
+            columns = [column._copy() for column in Log.__table__.columns]
+            table = Table(name, PARTITION_METADATA, *columns)
+            for index in Log.__table__.indexes:
+                Index(
+                    index.name.replace("ix_logs_", f"ix_{name}_", 1),
+                    *[table.c[column.name] for column in index.columns],
+                )
+            _tables[name] = table
+        return table
+
+
+# Crea la partición si no existe y la anota en el registro (idempotente)
+def ensure_partition(session: Session, start: datetime, granularity: str) -> Table:
+    name = partition_name(start, granularity)
+    table = partition_table(name)
+    pending = session.info.setdefault(PENDING_KEY, set())
+    if name not in _known_partitions and name not in pending:
+        conn = session.connection()
+        table.create(bind=conn, checkfirst=True)
+        if fts_enabled():
+            ensure_fts(conn, name)
+        _, length = GRANULARITIES[granularity]
+        conn.execute(
+            insert(LogPartition).prefix_with("OR IGNORE"),
+            {"name": name, "start_at": start, "end_at": start + length},
+        )
+        pending.add(name)
+    return table
+
+
+# Índice full-text de todas las particiones registradas. Las creadas con LOGS_FTS=0 no lo tienen,
+# y GET /logs?q= las consulta igual: al prender la FTS se crea (e indexa) al arrancar
+def ensure_partitions_fts(conn: Connection) -> None:
+    for name in conn.execute(select(LogPartition.name)).scalars():
+        ensure_fts(conn, name)
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_partitions(session: Session) -> None:
+    _known_partitions.update(session.info.pop(PENDING_KEY, ()))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_partitions(session: Session, transaction) -> None:
+    # Si la transacción terminó sin commit (rollback, close), las particiones creadas no existen
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+# Reserva `count` ids consecutivos de la secuencia global (dentro de la transacción del insert:
+# el UPDATE toma el lock de escritura de SQLite, así que dos procesos nunca reciben el mismo rango)
+def allocate_ids(conn: Connection, count: int) -> int:
+    conn.execute(
+        update(LogIdSequence).where(LogIdSequence.name == "logs").values(next_id=LogIdSequence.next_id + count)
+    )
+    next_id = conn.execute(select(LogIdSequence.next_id).where(LogIdSequence.name == "logs")).scalar_one()
+    return next_id - count
+
+
+# Invalida el cache de particiones conocidas si el esquema cambió desde la última vez
+def _refresh_known_partitions(conn: Connection) -> None:
+    global _known_schema_version
+    version = conn.exec_driver_sql("PRAGMA schema_version").scalar_one()
+    if version != _known_schema_version:
+        _known_partitions.clear()
+        _known_schema_version = version
+
+
+# Inserta filas enrutando cada una a su partición según `timestamp`
+def insert_partitioned(session: Session, rows: List[Dict[str, Any]], granularity: str) -> None:
+    conn = session.connection()
+    first_id = allocate_ids(conn, len(rows))
+    _refresh_known_partitions(conn)
+
+    by_partition: Dict[datetime, List[Dict[str, Any]]] = {}
+    for offset, row in enumerate(rows):
+        row["id"] = first_id + offset
+        by_partition.setdefault(partition_start(row["timestamp"], granularity), []).append(row)
+
+    for start, partition_rows in by_partition.items():
+        table = ensure_partition(session, start, granularity)
+        conn.execute(insert(table), partition_rows)
+
+
+# Particiones que se solapan con [timestamp_start, timestamp_end] (None = sin límite de ese lado)
+def overlapping_partitions(conn: Connection, timestamp_start: Optional[datetime],
+                           timestamp_end: Optional[datetime]) -> List[Table]:
+    query = select(LogPartition.name)
+    if timestamp_start:
+        query = query.where(LogPartition.end_at > _naive(timestamp_start))
+    if timestamp_end:
+        query = query.where(LogPartition.start_at <= _naive(timestamp_end))
+    return [partition_table(name) for name in conn.execute(query.order_by(LogPartition.start_at.desc())).scalars()]
+
+
+# Inicializa la secuencia global por encima de los ids que ya existan en logs y logs_compact
+# (si ya existía, solo la adelanta: en el layout wide sin particiones, logs usa su propio autoincremental)
+def init_id_sequence(conn: Connection) -> None:
+    max_id = conn.execute(text(
+        "SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM logs), (SELECT COALESCE(MAX(id), 0) FROM logs_compact))"
+    )).scalar_one()
+    conn.execute(insert(LogIdSequence).prefix_with("OR IGNORE"), {"name": "logs", "next_id": max_id + 1})
+    conn.execute(
+        update(LogIdSequence)
+        .where(LogIdSequence.name == "logs", LogIdSequence.next_id <= max_id)
+        .values(next_id=max_id + 1)
+    )
+
+
+# Retención: borra (DROP TABLE) las particiones que terminan antes de `cutoff`, y resta sus
+# logs de los rollups. Devuelve los nombres de las tablas borradas.
+def drop_partitions_before(conn: Connection, cutoff: datetime) -> List[str]:
+    names = conn.execute(select(LogPartition.name).where(LogPartition.end_at <= _naive(cutoff))).scalars().all()
+    for name in names:
+        if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).first():
+            subtract_counts(conn, expand_minute_counts(table_minute_counts(conn, partition_table(name))))
+        conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        drop_fts(conn, name)
+        conn.execute(delete(LogPartition).where(LogPartition.name == name))
+        _known_partitions.discard(name)
+    return list(names)
+
+
+# Retención de los logs anteriores a activar el particionado (quedan en la tabla logs, que ya no
+# recibe filas nuevas): DELETE de los recibidos antes de `cutoff`, restándolos de los rollups.
+# Devuelve cuántos borró.
+def delete_legacy_logs_before(conn: Connection, cutoff: datetime) -> int:
+    table = Log.__table__
+    old = table.c.received_at < _naive(cutoff)
+    subtract_counts(conn, expand_minute_counts(table_minute_counts(conn, table, old)))
+    return conn.execute(delete(table).where(old)).rowcount
+
+
+# Particiones registradas (nombre, inicio, fin), la más nueva primero
+def list_partitions(conn: Connection) -> List[Any]:
+    query = select(LogPartition.name, LogPartition.start_at, LogPartition.end_at)
+    return conn.execute(query.order_by(LogPartition.start_at.desc())).all()
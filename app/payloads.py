@@ -0,0 +1,143 @@
+# payloads.py — lectura del cuerpo de POST /logs en tandas
+
+# Además del JSON de siempre (un objeto o una lista), POST /logs acepta:
+# - Content-Type: application/x-ndjson → un log JSON por línea
+# - Content-Encoding: gzip → cuerpo comprimido (JSON o NDJSON)
+# Con NDJSON el cuerpo se descomprime y parsea de a pedazos mientras va llegando,
+# y se entrega en tandas de ítems: la memoria del worker no crece con el tamaño del lote.
+# Topes (413): bytes ya descomprimidos del cuerpo (un gzip chico puede inflarse a gigas)
+# y largo de cada línea NDJSON.
+
+import zlib
+from typing import Any, Iterable, Iterator, List
+
+from .jsoncodec import loads   # orjson si está instalado (ver jsoncodec.py)
+
+# Bytes que leemos del socket por vez
+READ_CHUNK_BYTES = 64 * 1024
+
+
+# Cuerpo ilegible: gzip roto/truncado o JSON inválido
+class PayloadError(ValueError):
+    pass
+
+
+# Cuerpo (descomprimido) o línea NDJSON más grande que el tope configurado
+class PayloadTooLarge(PayloadError):
+    pass
+
+
+# Marca para una línea NDJSON que no es JSON válido (se reporta como error de ese índice)
+class InvalidLine:
+    pass
+
+
+INVALID_LINE = InvalidLine()
+
+
+# Parte una lista de ítems en tandas de `size`
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Lee el stream del request de a pedazos y (si corresponde) lo descomprime al vuelo.
+# Lanza PayloadTooLarge si el cuerpo ya descomprimido pasa de max_bytes.
+def iter_body_bytes(stream, gzipped: bool, max_bytes: int) -> Iterator[bytes]:
+    # wbits=47 (32+15): detecta automáticamente cabecera gzip o zlib
+    decompressor = zlib.decompressobj(wbits=47) if gzipped else None
+    total = 0
+    while True:
+        data = stream.read(READ_CHUNK_BYTES)
+        if not data:
+            break
+        pieces = [data] if decompressor is None else _decompress(decompressor, data)
+        for piece in pieces:
+            total += len(piece)
+            if total > max_bytes:
+                raise PayloadTooLarge(f"cuerpo de más de {max_bytes} bytes")
+            yield piece
+    if decompressor is not None:
+        tail = decompressor.flush()
+        if not decompressor.eof:
+            raise PayloadError("gzip truncado")
+        if total + len(tail) > max_bytes:
+            raise PayloadTooLarge(f"cuerpo de más de {max_bytes} bytes")
+        if tail:
+            yield tail
+
+
+# Descomprime `data` de a READ_CHUNK_BYTES como mucho por vez: lo que falta queda en
+# unconsumed_tail, así nunca se infla en memoria más que un pedazo
+def _decompress(decompressor, data: bytes) -> Iterator[bytes]:
+    while data and not decompressor.eof:
+        try:
+            piece = decompressor.decompress(data, READ_CHUNK_BYTES)
+        except zlib.error as e:
+            raise PayloadError("gzip inválido") from e
+        if piece:
+            yield piece
+        data = decompressor.unconsumed_tail
+
+
+# Recorre las líneas NDJSON a medida que llegan los bytes (las vacías se ignoran).
+# Lanza PayloadTooLarge si una línea pasa de max_line_bytes.
+def iter_ndjson_items(chunks: Iterable[bytes], max_line_bytes: int) -> Iterator[Any]:
+    # Lo que quedó de una línea incompleta, esperando más bytes (bytearray: crece sin copiar todo)
+    pending = bytearray()
+    for data in chunks:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if pending:
+                pending += data[start:end]
+                line = bytes(pending)
+                pending.clear()
+            else:
+                line = data[start:end]
+            if len(line) > max_line_bytes:
+                raise PayloadTooLarge(f"línea NDJSON de más de {max_line_bytes} bytes")
+            if line.strip():
+                yield parse_ndjson_line(line)
+            start = end + 1
+        pending += data[start:]
+        if len(pending) > max_line_bytes:
+            raise PayloadTooLarge(f"línea NDJSON de más de {max_line_bytes} bytes")
+    if pending.strip():
+        yield parse_ndjson_line(bytes(pending))
+
+
+def parse_ndjson_line(line: bytes) -> Any:
+    try:
+        return loads(line)
+    except ValueError:
+        return INVALID_LINE
+
+
+# Tandas de ítems para un cuerpo NDJSON o comprimido (el JSON plano lo resuelve request.get_json)
+def iter_payload_chunks(stream, ndjson: bool, gzipped: bool, chunk_items: int,
+                        max_body_bytes: int, max_line_bytes: int) -> Iterator[List[Any]]:
+    body = iter_body_bytes(stream, gzipped, max_body_bytes)
+
+    if not ndjson:
+        # JSON comprimido: hay que tenerlo entero para parsearlo (como mucho max_body_bytes),
+        # pero igual se inserta en tandas
+        data = b"".join(body)
+        try:
+            payload = loads(data)
+        except ValueError as e:
+            raise PayloadError("JSON inválido") from e
+        items = payload if isinstance(payload, list) else [payload]
+        yield from chunked(items, chunk_items)
+        return
+
+    chunk: List[Any] = []
+    for item in iter_ndjson_items(body, max_line_bytes):
+        chunk.append(item)
+        if len(chunk) >= chunk_items:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
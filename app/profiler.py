@@ -0,0 +1,71 @@
+# profiler.py — profiler por muestreo para sacar flame graphs con el servidor en producción
+
+# No instrumenta nada: mientras corre, un hilo mira cada 1/hz segundos qué está ejecutando cada
+# hilo del proceso (sys._current_frames) y cuenta las pilas. Cuesta casi nada cuando no se usa
+# (no hay hilo) y poco mientras se usa. El resultado sale en formato "folded" (una pila por
+# línea, funciones separadas por ';' y la cantidad de muestras), que entienden flamegraph.pl,
+# speedscope e inferno:
+#   app/routes.py:ingest_logs;app/routes.py:build_log_rows;app/timeparse.py:parse_timestamps 42
+#
+# Se pide por GET /debug/profile?seconds=10 (ver routes.py, requiere LOGS_ADMIN_TOKEN).
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Rutas relativas a la raíz del proyecto o a la carpeta de sys.path que las contiene
+# (más cortas en el flame graph: "app/routes.py", "threading.py", "flask/app.py")
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PREFIXES = sorted({os.path.join(os.path.abspath(p), "") for p in [_ROOT, *sys.path] if p}, key=len, reverse=True)
+
+# Un solo perfil a la vez por proceso
+_running = threading.Lock()
+
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f"{filename}:{code.co_name}"
+
+
+def sample(seconds: float, hz: int) -> Optional[Dict[str, int]]:
+    """
+    Muestrea todos los hilos (salvo el que llama) durante `seconds` a `hz` muestras por segundo.
+    Devuelve {pila folded: muestras}, o None si ya hay otro perfil corriendo en el proceso.
+    """
+    if not _running.acquire(blocking=False):
+        return None
+    try:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        stacks: Counter = Counter()
+        names: Dict[object, str] = {}   # cache code → nombre (las mismas funciones se repiten mucho)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = names.get(code)
+                    if name is None:
+                        name = names[code] = _frame_name(code)
+                    parts.append(name)
+                    frame = frame.f_back
+                parts.reverse()   # de la raíz a la hoja
+                stacks[";".join(parts)] += 1
+            time.sleep(interval)
+        return dict(stacks)
+    finally:
+        _running.release()
+
+
+def render_folded(stacks: Dict[str, int]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
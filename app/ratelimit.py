@@ -0,0 +1,178 @@
+# ratelimit.py — cuotas por token en POST /logs (token bucket) + ajuste por latencia de escritura
+
+# Un servicio que manda lotes en un loop puede acaparar el único writer de SQLite y
+# dejar esperando a todos los demás. Cada token tiene dos "baldes":
+# - requests: cuántos POST /logs por segundo
+# - items: cuántos logs por segundo (se cobra por tanda, a medida que se lee el cuerpo)
+# Un balde se llena a `rate` por segundo hasta `burst`; cada request/ítem saca de ahí.
+# Si no alcanza, POST /logs responde 429 con Retry-After = cuánto falta para que alcance.
+#
+# Adaptativo: cada commit de logs nuevos avisa cuánto tardó (WriteSummary.write_s).
+# Si el promedio móvil pasa la latencia objetivo, todas las tasas se multiplican por un
+# factor que baja (x0.7 por segundo, hasta un mínimo); cuando la latencia vuelve, el factor
+# sube de a poco. Un servicio que manda poco queda muy por debajo de su límite y no lo nota;
+# el que satura el writer es el que recibe los 429.
+
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .storage import WriteSummary
+
+# Ajuste del factor: cuánto se achica por paso con latencia alta y cuánto crece por paso con latencia normal
+DECREASE = 0.7
+INCREASE = 0.05
+# Mínimo de segundos entre dos ajustes del factor
+ADJUST_INTERVAL_S = 1.0
+# Peso de cada commit nuevo en el promedio móvil (EWMA) de la latencia de escritura
+EWMA_WEIGHT = 0.2
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = now
+
+    def refill(self, now: float, factor: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate * factor)
+        self.updated = now
+
+    # Segundos a esperar para poder sacar `amount` (0 = alcanza)
+    def wait_for(self, amount: float, factor: float) -> float:
+        # Un pedido más grande que el balde se permite con el balde lleno (queda en negativo)
+        needed = min(amount, self.burst) - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / (self.rate * factor)
+
+
+class TokenLimits:
+    __slots__ = ("requests", "items", "limited")
+
+    def __init__(self, requests: TokenBucket, items: TokenBucket):
+        self.requests = requests
+        self.items = items
+        self.limited = 0   # cuántas veces respondimos 429
+
+
+class RateLimiter:
+    """
+    Cuotas por token para POST /logs.
+    - limits: {token: (requests_por_s, items_por_s)}; los tokens que no están usan default_limits.
+    - burst_s: tamaño de cada balde en segundos de su tasa (ráfaga permitida).
+    - check_request()/check_items(): devuelven 0 si hay cupo (y lo descuentan) o los segundos de espera.
+    - observe(): listener de commits (app.extensions["commit_listeners"]) para el modo adaptativo.
+    - target_write_ms = 0 desactiva el ajuste adaptativo.
+    """
+
+    def __init__(self, default_limits: Tuple[float, float], limits: Dict[str, Tuple[float, float]],
+                 burst_s: float, target_write_ms: int = 0, min_factor: float = 0.1):
+        # Una tasa de 0 haría infinita la espera (y wait_for dividiría por cero): mejor fallar al arrancar
+        if min(default_limits) <= 0:
+            raise ValueError("LOGS_RATE_LIMIT_REQUESTS_PER_S y LOGS_RATE_LIMIT_ITEMS_PER_S tienen que ser > 0 "
+                             f"(recibido: {default_limits[0]:g} requests/s, {default_limits[1]:g} logs/s)")
+        self.default_limits = default_limits
+        self.limits = limits
+        self.burst_s = max(0.1, burst_s)
+        self.target_write_s = target_write_ms / 1000.0
+        self.min_factor = min(1.0, max(0.01, min_factor))
+
+        self.factor = 1.0
+        self.write_latency_s = 0.0
+        self._last_adjust = 0.0
+        self._tokens: Dict[str, TokenLimits] = {}
+        self._lock = threading.Lock()
+
+    def check_request(self, token: str) -> float:
+        return self._take(token, "requests", 1)
+
+    def check_items(self, token: str, items: int) -> float:
+        return self._take(token, "items", items)
+
+    def _take(self, token: str, kind: str, amount: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            limits = self._limits_for(token, now)
+            bucket = limits.requests if kind == "requests" else limits.items
+            bucket.refill(now, self.factor)
+            wait = bucket.wait_for(amount, self.factor)
+            if wait > 0:
+                limits.limited += 1
+                return wait
+            bucket.tokens -= amount
+            return 0.0
+
+    def _limits_for(self, token: str, now: float) -> TokenLimits:
+        limits = self._tokens.get(token)
+        if limits is None:
+            requests_per_s, items_per_s = self.limits.get(token, self.default_limits)
+            limits = TokenLimits(
+                TokenBucket(requests_per_s, requests_per_s * self.burst_s, now),
+                TokenBucket(items_per_s, items_per_s * self.burst_s, now),
+            )
+            self._tokens[token] = limits
+        return limits
+
+    def observe(self, summary: WriteSummary) -> None:
+        if self.target_write_s <= 0 or summary.write_s <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self.write_latency_s += EWMA_WEIGHT * (summary.write_s - self.write_latency_s)
+            if now - self._last_adjust < ADJUST_INTERVAL_S:
+                return
+            self._last_adjust = now
+            if self.write_latency_s > self.target_write_s:
+                self.factor = max(self.min_factor, self.factor * DECREASE)
+            elif self.write_latency_s < self.target_write_s / 2:
+                self.factor = min(1.0, self.factor + INCREASE)
+
+    # Estado de los baldes por token (con el nombre del servicio, nunca el token)
+    def stats(self, names: Dict[str, str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            tokens = {}
+            for token, limits in self._tokens.items():
+                limits.requests.refill(now, self.factor)
+                limits.items.refill(now, self.factor)
+                tokens[names.get(token, "?")] = {
+                    "requests_per_s": round(limits.requests.rate * self.factor, 2),
+                    "requests_available": round(limits.requests.tokens, 2),
+                    "items_per_s": round(limits.items.rate * self.factor, 2),
+                    "items_available": round(limits.items.tokens, 2),
+                    "limited": limits.limited,
+                }
+            return {
+                "factor": round(self.factor, 3),
+                "write_latency_ms": round(self.write_latency_s * 1000, 2),
+                "target_write_ms": round(self.target_write_s * 1000),
+                "tokens": tokens,
+            }
+
+
+# Valor de Retry-After (segundos enteros, al menos 1)
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+# Parsea LOGS_RATE_LIMITS: "token=requests_por_s:items_por_s,token2=..." → {token: (req, items)}
+def parse_limits(raw: Optional[str]) -> Dict[str, Tuple[float, float]]:
+    limits: Dict[str, Tuple[float, float]] = {}
+    for part in (raw or "").split(","):
+        if not part.strip():
+            continue
+        token, _, values = part.strip().partition("=")
+        requests_per_s, _, items_per_s = values.partition(":")
+        try:
+            parsed = (float(requests_per_s), float(items_per_s))
+        except ValueError:
+            parsed = (0.0, 0.0)
+        if not token or min(parsed) <= 0:
+            raise ValueError(f"LOGS_RATE_LIMITS inválido: {part!r} (se espera token=requests_por_s:items_por_s, > 0)")
+        limits[token] = parsed
+    return limits
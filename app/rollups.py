@@ -0,0 +1,129 @@
+# rollups.py — conteos pre-agregados de logs para GET /logs/stats
+
+# En vez de contar filas crudas en cada consulta, la tabla log_rollups guarda
+# cuántos logs hubo por (granularidad, bucket de tiempo, service, severity).
+# - escritura: cada lote insertado suma sus conteos con un UPSERT (misma transacción del INSERT)
+# - lectura: una consulta de stats recorre buckets, no filas: O(buckets) en vez de O(filas)
+# - rebuild: recalcula todo desde las tablas de logs (DBs viejas, o si estuvieron apagados)
+# - retención: lo que se borra (particiones, logs sin particionar, segmentos) se resta en la misma transacción
+# El bucket se arma con el `timestamp` del log (cuándo ocurrió), igual que las particiones.
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Row
+
+from .models import LogRollup
+
+# Granularidades disponibles → largo del bucket
+ROLLUP_GRANULARITIES = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+ROLLUPS_TABLE = LogRollup.__table__
+
+# Inicio del bucket que contiene `ts` (naive, como lo guarda SQLite)
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = ts.replace(tzinfo=None, second=0, microsecond=0)
+    if granularity == "1m":
+        return ts
+    if granularity == "1h":
+        return ts.replace(minute=0)
+    return ts.replace(hour=0, minute=0)
+
+
+# Suma los conteos por minuto a las tres granularidades (hora y día salen del minuto)
+def expand_minute_counts(minute_counts: Dict[Tuple[datetime, str, str], int]) -> Counter:
+    counts: Counter = Counter()
+    for (minute, service, severity), n in minute_counts.items():
+        counts[("1m", minute, service, severity)] += n
+        counts[("1h", minute.replace(minute=0), service, severity)] += n
+        counts[("1d", minute.replace(hour=0, minute=0), service, severity)] += n
+    return counts
+
+
+# UPSERT de conteos: si el bucket ya existe, suma; si no, lo crea
+def upsert_counts(conn: Connection, counts: Counter) -> None:
+    if not counts:
+        return
+    stmt = sqlite_insert(ROLLUPS_TABLE)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "service", "severity"],
+        set_={"count": ROLLUPS_TABLE.c.count + stmt.excluded.count},
+    )
+    conn.execute(stmt, [
+        {"granularity": g, "bucket_start": start, "service": service, "severity": severity, "count": n}
+        for (g, start, service, severity), n in counts.items()
+    ])
+
+
+# Suma un lote recién insertado a los rollups (lo llama insert_rows, dentro de su transacción)
+def update_rollups(conn: Connection, rows: List[Dict[str, Any]]) -> None:
+    minute_counts: Counter = Counter()
+    for row in rows:
+        minute_counts[(bucket_start(row["timestamp"], "1m"), row["service"], row["severity"])] += 1
+    upsert_counts(conn, expand_minute_counts(minute_counts))
+
+
+# Resta los conteos de logs que se borran y saca los buckets que quedan en cero
+def subtract_counts(conn: Connection, counts: Counter) -> None:
+    if not counts:
+        return
+    upsert_counts(conn, Counter({key: -n for key, n in counts.items()}))
+    conn.execute(delete(ROLLUPS_TABLE).where(ROLLUPS_TABLE.c.count <= 0))
+
+
+# Conteos por (minuto, service, severity) de una tabla de logs (solo las filas de `where`, si se pasa).
+# El GROUP BY por minuto lo hace SQLite; hora y día se suman con expand_minute_counts.
+def table_minute_counts(conn: Connection, table: Table, where: Optional[Any] = None) -> Counter:
+    # "YYYY-MM-DD HH:MM" = los primeros 16 caracteres del timestamp guardado
+    minute = func.substr(table.c.timestamp, 1, 16)
+    query = (
+        select(minute, table.c.service, table.c.severity, func.count())
+        .group_by(minute, table.c.service, table.c.severity)
+    )
+    if where is not None:
+        query = query.where(where)
+    minute_counts: Counter = Counter()
+    for raw_minute, service, severity, n in conn.execute(query):
+        minute_counts[(datetime.strptime(raw_minute, "%Y-%m-%d %H:%M"), service, severity)] += n
+    return minute_counts
+
+
+# Recalcula los rollups desde cero a partir de las tablas de logs (logs + particiones).
+# Devuelve cuántos logs contó.
+def rebuild_rollups(conn: Connection, tables: Iterable[Table]) -> int:
+    conn.execute(delete(ROLLUPS_TABLE))
+    total = 0
+    for table in tables:
+        minute_counts = table_minute_counts(conn, table)
+        total += sum(minute_counts.values())
+        upsert_counts(conn, expand_minute_counts(minute_counts))
+    return total
+
+
+# Buckets de una granularidad en [start, end], filtrando por service/severity.
+# Devuelve como mucho `limit` buckets, los más nuevos, en orden cronológico.
+def query_rollups(conn: Connection, granularity: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, service: Optional[str] = None,
+                  severity: Optional[str] = None, limit: int = 10_000) -> List[Row]:
+    t = ROLLUPS_TABLE
+    query = select(t.c.bucket_start, t.c.service, t.c.severity, t.c.count).where(t.c.granularity == granularity)
+    if start:
+        # el bucket que contiene a `start` también cuenta
+        query = query.where(t.c.bucket_start >= bucket_start(start, granularity))
+    if end:
+        query = query.where(t.c.bucket_start <= end.replace(tzinfo=None))
+    if service:
+        query = query.where(t.c.service == service)
+    if severity:
+        query = query.where(t.c.severity == severity.upper())
+    query = query.order_by(t.c.bucket_start.desc(), t.c.service.desc(), t.c.severity.desc()).limit(limit)
+    rows = conn.execute(query).all()
+    rows.reverse()
+    return rows
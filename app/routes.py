@@ -1,25 +1,72 @@
 # routes.py — define los endpoints (rutas) de la aplicación
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+import hmac
+import time
+import zlib
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 # Importamos helpers de autenticación
-from .auth import validate_token, TOKENS
+from .auth import parse_auth_header, validate_token, TOKENS
 
 # imports para DB y parseo de fecha real
-from dateutil import parser as dtparser   # parsea ISO8601 “en serio”
+from .timeparse import parse_timestamp_iso8601, parse_timestamps   # ISO8601: camino rápido + dateutil
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
-from .db import SessionLocal              # sesión de DB (SQLite via SQLAlchemy)
-from .models import Log                   # modelo ORM (tabla logs)
+from werkzeug.exceptions import RequestEntityTooLarge
+from . import config
+from .db import ENGINE, SessionLocal      # sesión de DB (SQLite via SQLAlchemy)
+from .fts import fts_enabled, validate_fts_query  # búsqueda full-text (FTS5)
+from .ratelimit import retry_after       # cuotas por token en POST /logs
+from .metrics import METRICS, error_type, pool_gauges  # métricas para GET /metrics
+from .jsoncodec import dumps_bytes       # JSON rápido (orjson si está instalado) para /logs/export
+from .profiler import render_folded, sample  # profiler por muestreo (GET /debug/profile)
+from .writer import IngestUnavailable     # cola de ingesta (modo async / serve.py) que no puede aceptar
+from .payloads import INVALID_LINE, PayloadError, PayloadTooLarge, chunked, iter_payload_chunks  # cuerpos NDJSON / gzip en tandas
+from .rollups import ROLLUP_GRANULARITIES, query_rollups  # conteos pre-agregados para /logs/stats
+from .cache import QueryScope  # cache de respuestas de GET /logs
+from .storage import (WriteSummary, decode_cursor, encode_cursor, insert_rows, iter_chunks,  # cursor / INSERT en lote / lecturas
+                      iter_log_rows, notify_committed, search_details)
 
 # forma de organizar y agrupar rutas en módulos separados (nombre interno del blueprint, referencia al módulo actual)
 bp = Blueprint("routes", __name__)
 
+# Formato de streaming: un objeto JSON por línea
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Filas que se leen de la DB (y se mandan al cliente) por tanda en /logs/export
+EXPORT_CHUNK_ROWS = 1000
+
+# Formato de GET /logs/tail (Server-Sent Events)
+SSE_MIMETYPE = "text/event-stream"
+
+# Máximo de buckets que devuelve GET /logs/stats
+STATS_MAX_BUCKETS = 10_000
+
+# Formato de GET /metrics (texto de Prometheus)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Topes de GET /debug/profile: duración del muestreo y muestras por segundo
+PROFILE_MAX_SECONDS = 60
+PROFILE_MAX_HZ = 1000
+
 # Conjunto de severidades válidas. WARNING la llamamos como WARN.
 VALID_SEVERITIES = {"DEBUG", "INFO", "WARN", "ERROR", "CRITICAL"}
 
+
+# Esquema de un log de POST /logs: todos los campos son obligatorios y strings
+# (severity se normaliza; si no es una de VALID_SEVERITIES queda INFO)
+class LogItem(TypedDict):
+    timestamp: str
+    service: str
+    severity: str
+    message: str
+
+
+# Campos obligatorios, en el orden en que se reporta el primero que falte
+REQUIRED_FIELDS = tuple(LogItem.__annotations__)
+
 # La función normaliza y limpia el campo de severidad, para que siempre quede en un conjunto conocido de valores.
 # Siempre espera un string y devuelve un string
 def normalize_severity(s: str) -> str:
@@ -32,19 +79,9 @@ def normalize_severity(s: str) -> str:
 def looks_like_iso8601(s: Any) -> bool:
     return isinstance(s, str) and bool(s.strip())
 
-# >>> NUEVO: parseamos ISO8601 a datetime (si viene sin timezone, lo pasamos a UTC)
-def parse_timestamp_iso8601(s: str) -> datetime:
-    # Convierte string ISO8601 (o similar) a datetime con timezone.
-    # Si no trae timezone, normalizamos a UTC.
-    dt = dtparser.parse(s)
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
-
 # Chequea que el JSON envio todos los parametros
 def validate_log_item(item: Dict[str, Any]) -> Tuple[bool, str]:
-    required = ["timestamp", "service", "severity", "message"]
-    for k in required:
+    for k in REQUIRED_FIELDS:
         if k not in item:
             return False, f"missing field: {k}"
 
@@ -60,6 +97,99 @@ def validate_log_item(item: Dict[str, Any]) -> Tuple[bool, str]:
     return True, "ok"
 
 
+# Valida un lote y lo convierte en filas "planas" listas para insertar.
+# Devuelve (filas, errores); cada error conserva el índice del ítem en el lote original.
+# `start_index` es el índice del primer ítem cuando el lote llega en tandas.
+# Una sola pasada por el lote: un ítem válido (el caso de casi todos) se chequea con una
+# condición y sin llamar a funciones por campo; los que no la cumplen pasan por
+# validate_log_item y compañía, que dan exactamente los mismos errores de siempre.
+def build_log_rows(items: List[Any], token: str, start_index: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    rows: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    append_row = rows.append
+
+    # Obtenemos el servicio esperado para el token (es unico para cada servicio)
+    expected_service = TOKENS.get(token)
+
+    # Misma hora de recepción para todo el lote (lado servidor)
+    received_at = datetime.now(timezone.utc)
+
+    # Parseamos todos los timestamps del lote en una sola llamada (camino rápido + repetidos una sola vez)
+    started = time.perf_counter()
+    timestamps = parse_timestamps([item.get("timestamp") if isinstance(item, dict) else None for item in items])
+    parsed = time.perf_counter()
+
+    # Severidades ya normalizadas en este lote (se repiten: "INFO", "error", ...)
+    severities: Dict[str, str] = {}
+
+    for position, item in enumerate(items):
+        # Camino rápido: dict con los 4 campos string, no vacíos, service del token y timestamp parseado
+        if type(item) is dict:
+            ts_raw = item.get("timestamp")
+            service = item.get("service")
+            severity = item.get("severity")
+            message = item.get("message")
+            ts_dt = timestamps[position]
+            if (type(ts_raw) is str and type(service) is str and type(severity) is str and type(message) is str
+                    and ts_dt is not None and (not expected_service or service == expected_service)):
+                service_clean = service.strip()
+                message_clean = message.strip()
+                if service_clean and message_clean and ts_raw.strip():
+                    severity_clean = severities.get(severity)
+                    if severity_clean is None:
+                        severity_clean = severities[severity] = normalize_severity(severity)
+                    append_row({
+                        "timestamp": ts_dt,
+                        "received_at": received_at,
+                        "service": service_clean,
+                        "severity": severity_clean,
+                        "message": message_clean,
+                        "token_used": token,
+                    })
+                    continue
+
+        # Camino de siempre: da el error exacto (o acepta el ítem si era válido de otra forma)
+        index = start_index + position
+
+        # Línea NDJSON que no era JSON válido
+        if item is INVALID_LINE:
+            errors.append({"index": index, "error": "invalid JSON line"})
+            continue
+
+        # Llama a la funcion que valida el log, devuelve una tupla de (True o False y un mensaje)
+        ok, msg = validate_log_item(item)
+        if not ok:
+            # Si es False, lo agg a la lista de errores
+            errors.append({"index": index, "error": msg})
+            continue
+
+        # Chequeamos que el token sea el service esperado
+        if expected_service and item.get("service") != expected_service:
+            errors.append({"index": index, "error": f"service mismatch for token (expected '{expected_service}')"})
+            continue
+
+        # Timestamp string ya convertido a datetime (ISO8601 real); None si no se pudo parsear
+        ts_dt = timestamps[position]
+        if ts_dt is None:
+            errors.append({"index": index, "error": "invalid timestamp (cannot parse ISO8601)"})
+            continue
+
+        # Armamos el registro "limpio" para guardar en DB (dict con las columnas de Log)
+        rows.append({
+            "timestamp": ts_dt,                                   # ahora es datetime
+            "received_at": received_at,                           # datetime
+            "service": item["service"].strip(),
+            "severity": normalize_severity(item.get("severity", "INFO")),
+            "message": item["message"].strip(),
+            "token_used": token,                                  # trazabilidad
+        })
+
+    # Métricas: parseo de timestamps por un lado, validación + armado de filas por otro
+    METRICS.observe("logs_stage_seconds", parsed - started, endpoint="ingest", stage="parse_timestamps")
+    METRICS.observe("logs_stage_seconds", time.perf_counter() - parsed, endpoint="ingest", stage="validate")
+    return rows, errors
+
+
 # Rutas simples
 @bp.get("/")
 def root():
@@ -71,11 +201,28 @@ def root():
 
 @bp.get("/health")
 def health():
-    return jsonify({
+    body = {
         "status": "ok",
         "service": "log-central",
         "time": datetime.now(timezone.utc).isoformat()
-    })
+    }
+    # En modo async exponemos el estado de la cola (profundidad, tamaño de commit, ...)
+    ingest_queue = current_app.extensions.get("ingest_queue")
+    if ingest_queue is not None:
+        body["ingest_queue"] = ingest_queue.stats()
+    # Cache de GET /logs: aciertos, fallos, desalojos, invalidaciones
+    query_cache = current_app.extensions.get("query_cache")
+    if query_cache is not None:
+        body["query_cache"] = query_cache.stats()
+    # Cuotas de POST /logs: factor adaptativo y baldes por servicio
+    rate_limiter = current_app.extensions.get("rate_limiter")
+    if rate_limiter is not None:
+        body["rate_limit"] = rate_limiter.stats(TOKENS)
+    # Tail en vivo: suscriptores, filas en el ring, lecturas atrasadas
+    tail_hub = current_app.extensions.get("tail_hub")
+    if tail_hub is not None:
+        body["tail"] = tail_hub.stats()
+    return jsonify(body)
 
 
 
@@ -89,81 +236,168 @@ def ingest_logs():
     if token is None:
         return jsonify({"error": "Quién sos"}), 401
 
-    # 2) Leer JSON, con silent=True: en vez de lanzar un error/romper la app, simplemente devuelve None
-    payload = request.get_json(silent=True)
-    if payload is None:
-        return jsonify({"error": "JSON inválido o ausente"}), 400
+    # Cuota de requests del token (ver ratelimit.py); la de logs se cobra por tanda más abajo
+    rate_limiter = current_app.extensions.get("rate_limiter")
+    if rate_limiter is not None:
+        wait = rate_limiter.check_request(token)
+        if wait > 0:
+            return jsonify({"error": "rate_limited", "total_logs": 0}), 429, {"Retry-After": retry_after(wait)}
+
+    # 2) Leer el cuerpo. Soportamos JSON (objeto o lista), NDJSON y ambos comprimidos con gzip
+    content_encoding = request.headers.get("Content-Encoding", "identity").lower()
+    if content_encoding not in ("identity", "gzip"):
+        return jsonify({"error": f"Content-Encoding no soportado: {content_encoding}"}), 415
+
+    # Tope del cuerpo tal como llega (Werkzeug corta con 413 al leer de más); el del cuerpo
+    # descomprimido y el de cada línea NDJSON los controla payloads.py
+    request.max_content_length = config.INGEST_MAX_BODY_BYTES
+    if request.content_length is not None and request.content_length > config.INGEST_MAX_BODY_BYTES:
+        return payload_too_large()
+
+    if request.mimetype == NDJSON_MIMETYPE or content_encoding == "gzip":
+        # Se decodifica de a pedazos mientras llega el cuerpo (ver payloads.py)
+        # (el tiempo de decodificar cada tanda va a la etapa "decode" de las métricas)
+        chunks = METRICS.timed_iter(iter_payload_chunks(
+            request.stream,
+            ndjson=request.mimetype == NDJSON_MIMETYPE,
+            gzipped=content_encoding == "gzip",
+            chunk_items=config.INGEST_CHUNK_ITEMS,
+            max_body_bytes=config.INGEST_MAX_BODY_BYTES,
+            max_line_bytes=config.INGEST_MAX_LINE_BYTES,
+        ), "logs_stage_seconds", endpoint="ingest", stage="decode")
+    else:
+        # Leer JSON, con silent=True: en vez de lanzar un error/romper la app, simplemente devuelve None
+        try:
+            with METRICS.timed("logs_stage_seconds", endpoint="ingest", stage="decode"):
+                payload = request.get_json(silent=True)
+        except RequestEntityTooLarge:
+            return payload_too_large()
+        if payload is None:
+            return jsonify({"error": "JSON inválido o ausente"}), 400
 
-    # Si nos mandan 1 objeto,  lo convertimos a lista de una para procesar uniforme
-    items = payload if isinstance(payload, list) else [payload]
+        # Si nos mandan 1 objeto,  lo convertimos a lista de una para procesar uniforme
+        items = payload if isinstance(payload, list) else [payload]
+        chunks = chunked(items, config.INGEST_CHUNK_ITEMS)
 
     total_logs = 0
     errors = []
-
-    # 3/4/5) Validación por ítem + normalización + guardado (ahora en DB)
-
-    # Obtenemos los tokens de cada servicio (es unico para cada servicio)
-    expected_service = TOKENS.get(token)
-
+    # qué se escribió (services, rangos de tiempo), para avisar después del commit
+    summary = WriteSummary()
+    # Segundos a esperar si el token se quedó sin cuota de logs a mitad del lote
+    limited_wait = 0.0
+
+    # Modo async (o serve.py): encolamos las tandas, el writer hace commit en grupo, y respondemos 202 (201 con ack=commit)
+    ingest_queue = current_app.extensions.get("ingest_queue")
+    # En modo async las tandas se encolan recién cuando el cuerpo terminó de decodificarse:
+    # si a mitad del lote aparece un PayloadError, respondemos 400 sin haber encolado nada.
+    # Mientras tanto quedan en memoria del worker, así que el lote tiene tope: las filas que
+    # entran en la cola (LOGS_INGEST_QUEUE_MAX_ROWS; uno más grande tampoco se podría encolar entero)
+    pending = []
+    pending_rows = 0
+
+    # Con sharding (ver shards.py) el lote va a la DB del servicio del token
+    shards = current_app.extensions.get("shards")
+    sessions = shards.for_token(token).sessions if shards is not None else SessionLocal
+
+    # 3/4/5) Por cada tanda: validación por ítem + normalización (a filas planas) + guardado en DB
     # Abrimos sesión de DB (se cierra automáticamente al salir del with)
     try:
-        with SessionLocal() as s:
-            for index, item in enumerate(items):
-                # Llama a la funcion que valida el log, devuelve una tupla de (True o False y un mensaje)
-                ok, msg = validate_log_item(item)
-                if not ok:
-                    # Si es False, lo agg a la lista de errores
-                    errors.append({"index": index, "error": msg})
+        with sessions() as s:
+            start_index = 0
+            for chunk in chunks:
+                if rate_limiter is not None:
+                    limited_wait = rate_limiter.check_items(token, len(chunk))
+                    if limited_wait > 0:
+                        # Lo anterior de este lote se guarda igual; avisamos cuánto entró
+                        break
+                rows, chunk_errors = build_log_rows(chunk, token, start_index)
+                start_index += len(chunk)
+
+                if ingest_queue is not None:
+                    pending_rows += len(rows)
+                    if pending_rows > config.INGEST_QUEUE_MAX_ROWS:
+                        return jsonify({"error": "batch_too_large", "max_items": config.INGEST_QUEUE_MAX_ROWS}), 413
+                    pending.append((rows, chunk_errors))
                     continue
-
-                # Chequeamos que el token sea el service esperado
-                if expected_service and item.get("service") != expected_service:
-                    errors.append({"index": index, "error": f"service mismatch for token (expected '{expected_service}')" })
-                    continue
-
-                # Convertir timestamp string a datetime (ISO8601 real)
-                try:
-                    ts_dt = parse_timestamp_iso8601(item["timestamp"])
-                except Exception:
-                    errors.append({"index": index, "error": "invalid timestamp (cannot parse ISO8601)"})
-                    continue
-
-                # Armamos el registro "limpio" para guardar en DB
-                log_row = Log(
-                    timestamp=ts_dt,                                  # ahora es datetime
-                    received_at=datetime.now(timezone.utc),           # datetime
-                    service=item["service"].strip(),
-                    severity=normalize_severity(item.get("severity", "INFO")),
-                    message=item["message"].strip(),
-                    token_used=token                                  # trazabilidad
-                )
-
-                # Guardamos en DB (agrego a la sesión, commit al final del lote)
-                s.add(log_row)
-                total_logs += 1
+                # Un solo INSERT executemany por tanda (sin objetos ORM)
+                started = time.perf_counter()
+                insert_rows(s, rows)
+                elapsed = time.perf_counter() - started
+                summary.write_s += elapsed
+                METRICS.observe("logs_stage_seconds", elapsed, endpoint="ingest", stage="insert")
+                summary.add(rows)
+                errors.extend(chunk_errors)
+                total_logs += len(rows)
+                count_rows(token, rows, chunk_errors)
 
             # Commit una sola vez por lote (mejor performance)
-            s.commit()
+            if ingest_queue is None:
+                started = time.perf_counter()
+                s.commit()
+                elapsed = time.perf_counter() - started
+                summary.write_s += elapsed
+                METRICS.observe("logs_stage_seconds", elapsed, endpoint="ingest", stage="commit")
+                notify_committed(summary, current_app.extensions["commit_listeners"])
+
+        for rows, chunk_errors in pending:
+            try:
+                with METRICS.timed("logs_stage_seconds", endpoint="ingest", stage="enqueue"):
+                    ingest_queue.enqueue(rows)
+            except IngestUnavailable as e:
+                # Cola llena o writer caído. Lo ya aceptado queda; avisamos cuánto entró
+                # (total_logs + errors = ítems procesados)
+                return (jsonify({"error": e.reason, "total_logs": total_logs, "errors": errors}), 503,
+                        {"Retry-After": "1"})
+            errors.extend(chunk_errors)
+            total_logs += len(rows)
+            count_rows(token, rows, chunk_errors)
+
+    except (PayloadTooLarge, RequestEntityTooLarge):
+        # cuerpo (o una línea) más grande que el tope: no se guarda nada
+        return payload_too_large()
+
+    except PayloadError:
+        # cuerpo ilegible (gzip roto, JSON inválido): no se guarda nada
+        return jsonify({"error": "JSON inválido o ausente"}), 400
 
     except SQLAlchemyError as e:
         # error de DB controlado
         return jsonify({"error": "db_error", "detail": str(e)}), 500
 
     # 6) Responder
+    # - Sin cuota: 429 con Retry-After (y cuántos logs del lote sí entraron)
+    if limited_wait > 0:
+        return (jsonify({"error": "rate_limited", "total_logs": total_logs, "errors": errors}), 429,
+                {"Retry-After": retry_after(limited_wait)})
+
     # - Si todo falló, devolvemos 400 para que el cliente sepa que no sirvió nada del lote.
     if total_logs == 0 and errors:
         return jsonify({"total_logs": 0, "errors": errors}), 400
 
-    # Si al menos 1 entró, devolvemos 201 (creado)
-    return jsonify({"total_logs": total_logs, "errors": errors}), 201
+    # Si al menos 1 entró, devolvemos 201 (creado), o 202 (aceptado) si quedó en la cola sin esperar el commit
+    created = ingest_queue is None or ingest_queue.ack == "commit"
+    return jsonify({"total_logs": total_logs, "errors": errors}), 201 if created else 202
 
 
 
+def payload_too_large():
+    return (jsonify({"error": "payload_too_large", "max_body_bytes": config.INGEST_MAX_BODY_BYTES,
+                     "max_line_bytes": config.INGEST_MAX_LINE_BYTES}), 413)
+
+
+# Métricas de POST /logs: aceptados por servicio, rechazados por tipo de error
+def count_rows(token: str, rows: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> None:
+    if rows:
+        METRICS.inc("logs_rows_accepted_total", len(rows), service=TOKENS.get(token, "unknown"))
+    for error in errors:
+        METRICS.inc("logs_rows_rejected_total", error=error_type(error["error"]))
+
+
 # GET /logs — consulta en DB con filtros básicos
 
-@bp.get("/logs")
-def list_logs():
-   
+# Lee los filtros de GET /logs desde el query string (compartido con /logs/export)
+def parse_log_filters() -> Dict[str, Any]:
+
     # helper para parsear fechas del query string
     def parse_query_param(param_name: str):
         raw_value = request.args.get(param_name)
@@ -174,15 +408,120 @@ def list_logs():
         except Exception:
             return None
 
-    # filtros por fecha
-    timestamp_start = parse_query_param("timestamp_start")
-    timestamp_end = parse_query_param("timestamp_end")
-    received_start = parse_query_param("received_at_start")
-    received_end = parse_query_param("received_at_end")
+    return {
+        # filtros por fecha
+        "timestamp_start": parse_query_param("timestamp_start"),
+        "timestamp_end": parse_query_param("timestamp_end"),
+        "received_start": parse_query_param("received_at_start"),
+        "received_end": parse_query_param("received_at_end"),
+        # filtros exactos
+        "service": request.args.get("service"),
+        "severity": request.args.get("severity"),
+        # búsqueda full-text sobre el mensaje (sintaxis FTS5)
+        "q": request.args.get("q"),
+    }
+
+
+# Chequea la sintaxis de q; devuelve un mensaje de error o None.
+# Sin FTS (LOGS_FTS=0) q es texto literal (LIKE) y cualquier valor sirve.
+def check_fts_query(q: Optional[str]) -> Optional[str]:
+    if not q or not fts_enabled():
+        return None
+    try:
+        validate_fts_query(q)
+    except ValueError:
+        return "q inválido (sintaxis FTS5)"
+    return None
+
+
+# Clave del cache de GET /logs: la consulta ya normalizada (fechas parseadas, paginado resuelto)
+def query_cache_key(filters: Dict[str, Any], order: str, limit: int, offset: int, cursor: Optional[str]) -> Tuple:
+    normalized = tuple(
+        (name, value.isoformat() if isinstance(value, datetime) else value)
+        for name, value in sorted(filters.items())
+    )
+    return normalized, order, limit, offset, cursor
+
+
+# Qué filas puede devolver la consulta, para saber qué escrituras la invalidan.
+# Con cursor solo entran filas recibidas hasta el cursor: los logs nuevos no cambian esa página.
+def query_scope(filters: Dict[str, Any], after: Optional[Tuple[datetime, int]]) -> QueryScope:
+    received_end = filters["received_end"]
+    if after is not None:
+        cursor_received = after[0].replace(tzinfo=None)
+        received_end = min(received_end.replace(tzinfo=None), cursor_received) if received_end else cursor_received
+    return QueryScope(
+        service=filters["service"],
+        severity=filters["severity"],
+        timestamp_start=filters["timestamp_start"],
+        timestamp_end=filters["timestamp_end"],
+        received_start=filters["received_start"],
+        received_end=received_end,
+    )
+
+
+# Convierte una fila de la DB en el dict que devuelve la API
+def serialize_log(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "timestamp": row.timestamp.isoformat(),
+        "received_at": row.received_at.isoformat(),
+        "service": row.service,
+        "severity": row.severity,
+        "message": row.message,
+        "token_used": row.token_used,
+    }
+
+
+# Lo mismo para una fila recién insertada (dict, con datetimes con zona): mismo JSON que
+# devolvería GET /logs al leerla de la DB (las fechas se guardan sin zona)
+def serialize_row_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "timestamp": row["timestamp"].replace(tzinfo=None).isoformat(),
+        "received_at": row["received_at"].replace(tzinfo=None).isoformat(),
+        "service": row["service"],
+        "severity": row["severity"],
+        "message": row["message"],
+        "token_used": row["token_used"],
+    }
+
+
+# Serializa una tanda de resultados: si la consulta fue full-text, agrega el mensaje
+# resaltado ("highlight") y la relevancia ("rank", bm25: menor = más relevante)
+# Con sharding (session=None) cada fila se busca en su shard.
+# Sin FTS (búsqueda con LIKE) no hay resaltado ni relevancia: highlight = mensaje, rank = null.
+def serialize_rows(session, filters: Dict[str, Any], rows, shards=None) -> List[Dict[str, Any]]:
+    serialized = [serialize_log(row) for row in rows]
+    if filters["q"]:
+        if not fts_enabled():
+            details = {}
+        elif shards is not None:
+            details = shards.search_details(filters, rows)
+        else:
+            details = search_details(session, filters, rows)
+        for data in serialized:
+            data["highlight"], data["rank"] = details.get(data["id"], (data["message"], None))
+    return serialized
 
-    # filtros exactos
-    service_filter = request.args.get("service")
-    severity_filter = request.args.get("severity")
+
+@bp.get("/logs")
+def list_logs():
+    # Si el cliente pide NDJSON, respondemos en streaming (mismo endpoint que /logs/export)
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return export_logs()
+
+    filters = parse_log_filters()
+    fts_error = check_fts_query(filters["q"])
+    if fts_error:
+        return jsonify({"error": fts_error}), 400
+
+    # orden: "recent" (received_at DESC, default) o "rank" (relevancia, solo con q)
+    order = request.args.get("order", "recent")
+    if order not in ("recent", "rank") or (order == "rank" and not filters["q"]):
+        return jsonify({"error": "order inválido (recent, o rank junto con q)"}), 400
+    if order == "rank" and not fts_enabled():
+        return jsonify({"error": "order=rank requiere la búsqueda full-text (LOGS_FTS=1)"}), 400
 
     # paginado
     try:
@@ -193,37 +532,242 @@ def list_logs():
     except ValueError:
         return jsonify({"error": "limit/offset inválidos"}), 400
 
-    # armamos la consulta
-    query = select(Log)
-    if timestamp_start:
-        query = query.filter(Log.timestamp >= timestamp_start)
-    if timestamp_end:
-        query = query.filter(Log.timestamp <= timestamp_end)
-    if received_start:
-        query = query.filter(Log.received_at >= received_start)
-    if received_end:
-        query = query.filter(Log.received_at <= received_end)
-    if service_filter:
-        query = query.filter(Log.service == service_filter)
-    if severity_filter:
-        query = query.filter(Log.severity == severity_filter.upper())
-
-    query = query.order_by(Log.received_at.desc()).limit(limit_results).offset(offset_results)
-
-    # ejecutar y serializar
-    with SessionLocal() as session:
-        # Ejecuta la peticion, convierte cada fila devuelta en un objeto real (clase Log), convierte el iterador en una lista completa
-        result_rows = session.execute(query).scalars().all()
-        serialized_logs = []
-        for row in result_rows:
-            serialized_logs.append({
-                "id": row.id,
-                "timestamp": row.timestamp.isoformat(),
-                "received_at": row.received_at.isoformat(),
+    # cursor (keyset): si viene, reemplaza al offset y cada página es un seek en vez de un salto
+    raw_cursor = request.args.get("cursor")
+    after = None
+    if raw_cursor:
+        try:
+            after = decode_cursor(raw_cursor)
+        except ValueError:
+            return jsonify({"error": "cursor inválido"}), 400
+        if order == "rank":
+            return jsonify({"error": "cursor no disponible con order=rank (usar offset)"}), 400
+        offset_results = 0
+
+    # Cache: si la misma consulta ya se respondió y ningún log nuevo pudo cambiarla, devolvemos esos bytes
+    query_cache = current_app.extensions.get("query_cache")
+    if query_cache is not None:
+        cache_key = query_cache_key(filters, order, limit_results, offset_results, raw_cursor)
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached.body, mimetype="application/json", headers={**cached.headers, "X-Cache": "HIT"})
+        # la generación se lee ANTES de consultar (ver QueryCache)
+        generation = query_cache.generation
+
+    # ejecutar (filtros + orden por received_at DESC) y serializar
+    shards = current_app.extensions.get("shards")
+    if shards is not None:
+        # Sharding: los shards se consultan en paralelo y se combinan por (received_at, id) DESC
+        with METRICS.timed("logs_stage_seconds", endpoint="list", stage="query"):
+            result_rows = shards.fetch_rows(filters, after, limit_results, offset_results, order)
+        with METRICS.timed("logs_stage_seconds", endpoint="list", stage="serialize"):
+            response = jsonify(serialize_rows(None, filters, result_rows, shards))
+    else:
+        with SessionLocal() as session:
+            with METRICS.timed("logs_stage_seconds", endpoint="list", stage="query"):
+                result_rows = list(iter_log_rows(session, filters, after=after, limit=limit_results,
+                                                 offset=offset_results, order=order))
+            with METRICS.timed("logs_stage_seconds", endpoint="list", stage="serialize"):
+                serialized_logs = serialize_rows(session, filters, result_rows)
+                response = jsonify(serialized_logs)
+
+    # Si la página vino llena puede haber más: mandamos el cursor para pedir la siguiente
+    if len(result_rows) == limit_results and order == "recent":
+        last = result_rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.received_at, last.id)
+
+    if query_cache is not None:
+        cached_headers = {"X-Next-Cursor": response.headers["X-Next-Cursor"]} if "X-Next-Cursor" in response.headers else {}
+        query_cache.put(cache_key, response.get_data(), cached_headers, query_scope(filters, after), generation)
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+
+# GET /logs/export — mismos filtros que GET /logs, pero en streaming NDJSON (1 log JSON por línea)
+# Lee la DB por tandas (yield_per) y va mandando cada tanda apenas está lista: memoria constante
+# aunque el rango tenga millones de filas. Sin tope de 1000; `limit` es opcional.
+# Si el cliente manda Accept-Encoding: gzip, la respuesta va comprimida.
+
+@bp.get("/logs/export")
+def export_logs():
+    filters = parse_log_filters()
+    fts_error = check_fts_query(filters["q"])
+    if fts_error:
+        return jsonify({"error": fts_error}), 400
+    try:
+        limit_results = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+
+    if limit_results is not None:
+        limit_results = max(1, limit_results)
+
+    use_gzip = "gzip" in request.accept_encodings
+    shards = current_app.extensions.get("shards")
+
+    def generate():
+        compressor = zlib.compressobj(wbits=31) if use_gzip else None   # wbits=31 => formato gzip
+        with ExitStack() as stack:
+            if shards is not None:
+                # Sharding: todos los shards en streaming, combinados por (received_at, id) DESC
+                session = None
+                rows = shards.iter_rows(filters, limit=limit_results, chunk_rows=EXPORT_CHUNK_ROWS)
+            else:
+                session = stack.enter_context(SessionLocal())
+                rows = iter_log_rows(session, filters, limit=limit_results, chunk_rows=EXPORT_CHUNK_ROWS)
+            for chunk in iter_chunks(rows, EXPORT_CHUNK_ROWS):
+                lines = serialize_rows(session, filters, chunk, shards)
+                data = b"".join(dumps_bytes(line) + b"\n" for line in lines)
+                yield compressor.compress(data) if compressor else data
+        if compressor:
+            yield compressor.flush()
+
+    headers = {"Vary": "Accept-Encoding"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+
+# GET /logs/stats — cantidad de logs por bucket de tiempo (1m/1h/1d), service y severity.
+# Se responde desde los rollups (conteos ya agregados al insertar): cuesta O(buckets), no O(filas).
+# Filtros: timestamp_start/timestamp_end (el bucket que contiene al inicio también entra), service, severity.
+
+@bp.get("/logs/stats")
+def logs_stats():
+    if not config.ROLLUPS_ENABLED:
+        return jsonify({"error": "rollups desactivados (LOGS_ROLLUPS=0)"}), 400
+
+    granularity = request.args.get("bucket", "1m")
+    if granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({"error": f"bucket inválido (opciones: {', '.join(ROLLUP_GRANULARITIES)})"}), 400
+
+    try:
+        # limit: cuántos buckets como mucho (se devuelven los más nuevos)
+        limit_results = max(1, min(STATS_MAX_BUCKETS, int(request.args.get("limit", STATS_MAX_BUCKETS))))
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+
+    filters = parse_log_filters()
+    shards = current_app.extensions.get("shards")
+    if shards is not None:
+        # Sharding: los rollups de cada shard, combinados
+        rows = shards.query_rollups(granularity, start=filters["timestamp_start"], end=filters["timestamp_end"],
+                                    service=filters["service"], severity=filters["severity"], limit=limit_results)
+    else:
+        with SessionLocal() as session:
+            rows = query_rollups(session.connection(), granularity,
+                                 start=filters["timestamp_start"], end=filters["timestamp_end"],
+                                 service=filters["service"], severity=filters["severity"], limit=limit_results)
+
+    return jsonify({
+        "bucket": granularity,
+        "buckets": [
+            {
+                "bucket_start": row.bucket_start.isoformat(),
                 "service": row.service,
                 "severity": row.severity,
-                "message": row.message,
-                "token_used": row.token_used,
-            })
-        return jsonify(serialized_logs)
+                "count": row.count,
+            }
+            for row in rows
+        ],
+    })
+
 
+# GET /logs/tail — logs nuevos en vivo (Server-Sent Events), con filtros service y severity.
+# Sale del ring buffer en memoria que alimentan los commits (ver tail.py): no consulta la DB.
+# Cada evento: "id: <n>" + "data: <log JSON>". Al reconectar, el navegador (EventSource) manda
+# Last-Event-ID y se reenvía lo que falte si sigue en el ring; si no, llega un evento "lagged".
+
+@bp.get("/logs/tail")
+def tail_logs():
+    tail_hub = current_app.extensions.get("tail_hub")
+    if tail_hub is None:
+        return jsonify({"error": "tail desactivado (LOGS_TAIL_BUFFER_ROWS=0)"}), 400
+
+    service = request.args.get("service")
+    severity = request.args.get("severity")
+    severity = severity.upper() if severity else None
+
+    # Last-Event-ID = id del último log recibido (único en todos los workers y shards)
+    raw_last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(raw_last_id) if raw_last_id else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID inválido"}), 400
+
+    subscription = tail_hub.subscribe(last_id)
+    if subscription is None:
+        return jsonify({"error": "demasiados suscriptores"}), 503, {"Retry-After": "5"}
+
+    def generate():
+        try:
+            # Primer mensaje enseguida: el cliente sabe que está conectado (y los proxies no esperan)
+            yield ": conectado\n\n"
+            while True:
+                entries, lagged = tail_hub.read(subscription, timeout=config.TAIL_HEARTBEAT_S)
+                if lagged:
+                    # resume_after: id del log más nuevo que se perdió (lo que sigue sí está en el ring)
+                    yield f"event: lagged\ndata: {{\"resume_after\": {subscription.resume_after}}}\n\n"
+                events = []
+                for entry in entries:
+                    row = entry.row
+                    if (service and row["service"] != service) or (severity and row["severity"] != severity):
+                        continue
+                    if entry.data is None:
+                        entry.data = current_app.json.dumps(serialize_row_dict(row), separators=(",", ":"))
+                    events.append(f"id: {row['id']}\ndata: {entry.data}\n\n")
+                # Sin novedades (o todo filtrado): un comentario mantiene viva la conexión y
+                # permite detectar clientes que se fueron
+                yield "".join(events) if events else ": keepalive\n\n"
+        finally:
+            tail_hub.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype=SSE_MIMETYPE, headers=headers)
+
+
+# GET /metrics — métricas en texto de Prometheus (ver metrics.py)
+# Además de los contadores e histogramas acumulados, el estado del momento: pool de conexiones (por shard)
+# y filas esperando en la cola de ingesta (modo async / serve.py).
+
+@bp.get("/metrics")
+def metrics():
+    if not config.METRICS_ENABLED:
+        return jsonify({"error": "métricas desactivadas (LOGS_METRICS=0)"}), 404
+
+    shards = current_app.extensions.get("shards")
+    gauges = shards.pool_gauges() if shards is not None else pool_gauges(ENGINE)
+    ingest_queue = current_app.extensions.get("ingest_queue")
+    if ingest_queue is not None:
+        queue_stats = ingest_queue.stats()
+        if "queue_rows" in queue_stats:
+            gauges["logs_ingest_queue_rows"] = [((), queue_stats["queue_rows"])]
+    return Response(METRICS.render(gauges), content_type=METRICS_CONTENT_TYPE)
+
+
+# GET /debug/profile?seconds=10&hz=100 — perfil por muestreo de este proceso (ver profiler.py)
+# Responde, al terminar, las pilas en formato folded para armar un flame graph:
+#   curl -H "Authorization: Token $LOGS_ADMIN_TOKEN" "localhost:8000/debug/profile?seconds=30" > perfil.folded
+#   flamegraph.pl perfil.folded > perfil.svg   (o abrir perfil.folded en speedscope.app)
+# Solo con LOGS_ADMIN_TOKEN configurado (si no, 404). Un perfil a la vez por proceso (si no, 409).
+
+@bp.get("/debug/profile")
+def debug_profile():
+    if not config.ADMIN_TOKEN:
+        return jsonify({"error": "profiler desactivado (LOGS_ADMIN_TOKEN vacío)"}), 404
+    token = parse_auth_header(request.headers.get("Authorization")) or ""
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Quién sos"}), 401
+
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz = int(request.args.get("hz", 100))
+    except ValueError:
+        return jsonify({"error": "seconds/hz inválidos"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0 < hz <= PROFILE_MAX_HZ:
+        return jsonify({"error": f"seconds (0-{PROFILE_MAX_SECONDS}) / hz (1-{PROFILE_MAX_HZ}) fuera de rango"}), 400
+
+    stacks = sample(seconds, hz)
+    if stacks is None:
+        return jsonify({"error": "ya hay un perfil corriendo"}), 409
+    return Response(render_folded(stacks), mimetype="text/plain")
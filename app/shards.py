@@ -0,0 +1,304 @@
+# shards.py — almacenamiento repartido por servicio (LOGS_SHARDING=service|hash)
+
+# Con una sola DB todos los servicios comparten el archivo y su único lock de escritura: un
+# servicio ruidoso alarga los commits, llena el WAL y agranda el archivo para todos. Con sharding
+# cada servicio (o grupo de servicios, por hash) tiene su propio archivo SQLite con su lock, su
+# writer (IngestQueue en modo async, un proceso writer en serve.py), su WAL, sus rollups y su
+# archivo frío: la ingesta de servicios distintos corre en paralelo.
+# - escritura: un POST /logs es de un solo servicio (el del token) → va a un solo shard
+# - lectura: GET /logs consulta los shards en paralelo (pool de hilos) y combina las páginas con
+#   un k-way merge por (received_at, id) DESC; con ?service= solo se consulta el shard de ese servicio
+# - ids: cada shard reparte ids de su propio rango (número de shard << SHARD_ID_BITS), así siguen
+#   siendo únicos entre shards (los usan el cursor y la búsqueda full-text) y del id sale el shard
+# - la DB de antes de activar el sharding (LOGS_DB_PATH), si existe, se sigue leyendo (shard 0);
+#   ya no recibe logs nuevos. manage.py (retention, archive, ...) recorre todas.
+#
+# Archivos: <LOGS_SHARD_DIR>/<servicio>.db ("service") o <LOGS_SHARD_DIR>/shard<N>.db ("hash"),
+# segmentos del archivo frío en <LOGS_ARCHIVE_DIR>/<shard>/ y el socket de su writer (serve.py)
+# en <shard>.db.writer.sock.
+
+import heapq
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import sessionmaker
+
+from . import config
+from .auth import TOKENS
+from .db import ENGINE, SessionLocal, init_db, make_engine
+from .metrics import METRICS, Labels, pool_gauges
+from .models import LogIdSequence
+from .rollups import query_rollups
+from .storage import iter_log_rows, rank_sort_key, search_details, sort_key
+
+# Bits del id que numeran filas dentro de un shard: el shard N usa los ids [N << 40, (N + 1) << 40).
+# Un billón de logs por shard y, con hasta 8192 shards, ids < 2^53 (exactos en JavaScript).
+SHARD_ID_BITS = 40
+
+
+class Shard:
+    """
+    Una DB de logs con lo suyo: motor, fábrica de sesiones, carpeta del archivo frío y socket
+    del writer de serve.py. number = rango de ids (0 = la DB de LOGS_DB_PATH), se conoce en init().
+    """
+
+    def __init__(self, name: str, path: str, engine: Engine, sessions: sessionmaker,
+                 archive_dir: str, writer_socket: str):
+        self.name = name
+        self.path = path
+        self.engine = engine
+        self.sessions = sessions
+        self.archive_dir = archive_dir
+        self.writer_socket = writer_socket
+        self.number = 0
+
+
+# La DB de LOGS_DB_PATH como un shard más (sin sharding es la única)
+MAIN_DB = Shard("main", config.DB_PATH, ENGINE, SessionLocal, config.ARCHIVE_DIR, config.WRITER_SOCKET)
+
+
+def open_shard(name: str) -> Shard:
+    path = os.path.join(config.SHARD_DIR, name + ".db")
+    engine = make_engine(path, config.DB_PROFILE, pool_size=config.DB_POOL_SIZE,
+                         pragma_overrides=config.DB_PRAGMA_OVERRIDES)
+    sessions = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    return Shard(name, path, engine, sessions, os.path.join(config.ARCHIVE_DIR, name), path + ".writer.sock")
+
+
+# Nombre del shard de un servicio (también sirve de nombre de archivo)
+def shard_name(service: str) -> str:
+    if config.SHARDING == "hash":
+        # crc32 y no hash(): tiene que dar lo mismo en todos los procesos y entre reinicios
+        return f"shard{zlib.crc32(service.encode()) % max(1, config.SHARD_COUNT)}"
+    return re.sub(r"[^A-Za-z0-9_-]", "_", service)
+
+
+# Fila de GET /logs/stats combinada entre shards
+class StatsBucket(NamedTuple):
+    bucket_start: datetime
+    service: str
+    severity: str
+    count: int
+
+
+class ShardSet:
+    """
+    Los shards de escritura (uno por servicio o por hash) + la DB anterior al sharding si existe.
+    - init(): esquema de cada DB y rango de ids de cada shard
+    - for_service(): a qué shard va un servicio; readable(): a cuáles hay que consultar
+    - fetch_rows() / iter_rows() / search_details() / query_rollups(): lecturas combinadas
+    """
+
+    def __init__(self, names: List[str], legacy: Optional[Shard]):
+        self.shards = [open_shard(name) for name in names]
+        self.legacy = legacy
+        self._by_name = {shard.name: shard for shard in self.shards}
+        self._by_number: Dict[int, Shard] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    # Todas las DBs: las de escritura y (para leer) la anterior al sharding
+    def all(self) -> List[Shard]:
+        return self.shards + ([self.legacy] if self.legacy is not None else [])
+
+    def get(self, name: str) -> Shard:
+        return self._by_name[name]
+
+    def for_service(self, service: str) -> Optional[Shard]:
+        return self._by_name.get(shard_name(service))
+
+    def for_token(self, token: str) -> Shard:
+        return self._by_name[shard_name(TOKENS[token])]
+
+    # Shards que pueden tener logs para el filtro de service (sin filtro: todos)
+    def readable(self, service: Optional[str] = None) -> List[Shard]:
+        if not service:
+            return self.all()
+        shard = self.for_service(service)
+        return ([shard] if shard is not None else []) + ([self.legacy] if self.legacy is not None else [])
+
+    # El shard de un id (por su rango)
+    def by_id(self, log_id: int) -> Optional[Shard]:
+        return self._by_number.get(log_id >> SHARD_ID_BITS)
+
+    # Crea el esquema de cada DB y le da a cada shard su rango de ids. El número queda guardado
+    # en la secuencia de ids de su DB (next_id >> SHARD_ID_BITS): los shards existentes conservan
+    # el suyo y uno nuevo (servicio agregado a TOKENS) toma el siguiente libre.
+    def init(self) -> None:
+        os.makedirs(config.SHARD_DIR, exist_ok=True)
+        for shard in self.all():
+            init_db(shard.engine)
+        fresh = []
+        for shard in self.shards:
+            shard.number = self._stored_number(shard)
+            if shard.number == 0:
+                fresh.append(shard)
+        taken = {shard.number for shard in self.shards}
+        for shard in fresh:
+            shard.number = max(taken) + 1
+            taken.add(shard.number)
+            with shard.engine.begin() as conn:
+                conn.execute(
+                    update(LogIdSequence)
+                    .where(LogIdSequence.name == "logs", LogIdSequence.next_id < shard.number << SHARD_ID_BITS)
+                    .values(next_id=shard.number << SHARD_ID_BITS)
+                )
+        self._by_number = {shard.number: shard for shard in self.all()}
+
+    @staticmethod
+    def _stored_number(shard: Shard) -> int:
+        with shard.engine.connect() as conn:
+            next_id = conn.execute(select(LogIdSequence.next_id).where(LogIdSequence.name == "logs")).scalar_one()
+        return next_id >> SHARD_ID_BITS
+
+    # Cierra las conexiones de todos los shards (serve.py, antes de forkear)
+    def dispose(self) -> None:
+        for shard in self.all():
+            shard.engine.dispose()
+
+    # Pool de hilos para las consultas en paralelo; se crea al primer uso (después del fork en serve.py)
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max(1, config.SHARD_QUERY_THREADS),
+                                                thread_name_prefix="shard-query")
+            return self._pool
+
+    # Una página de GET /logs: cada shard en un hilo del pool, con su propia sesión, trae como mucho
+    # offset + limit filas ya ordenadas; el k-way merge las combina y se corta la página.
+    def fetch_rows(self, filters: Dict[str, Any], after: Optional[Tuple[datetime, int]], limit: int,
+                   offset: int = 0, order: str = "recent") -> List[Row]:
+        shards = self.readable(filters["service"])
+        if len(shards) == 1:
+            return self._fetch(shards[0], filters, after, limit, offset, order)
+        pages = list(self._executor().map(lambda shard: self._fetch(shard, filters, after, offset + limit, 0, order),
+                                          shards))
+        # Con order=rank la relevancia (bm25) sale de las estadísticas de cada shard: el orden
+        # entre shards es aproximado
+        merged = heapq.merge(*pages, key=rank_sort_key if order == "rank" else sort_key, reverse=True)
+        return list(islice(merged, offset, offset + limit))
+
+    @staticmethod
+    def _fetch(shard: Shard, filters: Dict[str, Any], after: Optional[Tuple[datetime, int]], limit: int,
+               offset: int, order: str) -> List[Row]:
+        started = time.perf_counter()
+        with shard.sessions() as session:
+            rows = list(iter_log_rows(session, filters, after=after, limit=limit, offset=offset, order=order,
+                                      archive_dir=shard.archive_dir))
+        METRICS.observe("logs_shard_query_seconds", time.perf_counter() - started, shard=shard.name)
+        return rows
+
+    # /logs/export: sin tope de filas no se puede traer todo de cada shard, así que se recorren
+    # en streaming (cada uno por tandas, con su sesión abierta) y se combinan con el mismo merge
+    def iter_rows(self, filters: Dict[str, Any], limit: Optional[int] = None, chunk_rows: int = 1000) -> Iterator[Row]:
+        with ExitStack() as stack:
+            streams = [
+                iter_log_rows(stack.enter_context(shard.sessions()), filters, limit=limit, chunk_rows=chunk_rows,
+                              archive_dir=shard.archive_dir)
+                for shard in self.readable(filters["service"])
+            ]
+            yield from islice(heapq.merge(*streams, key=sort_key, reverse=True), limit)
+
+    # search_details() de storage.py para filas de varios shards: cada una se busca en el suyo
+    def search_details(self, filters: Dict[str, Any], rows: List[Row]) -> Dict[int, Tuple[str, float]]:
+        by_shard: Dict[int, List[Row]] = {}
+        for row in rows:
+            by_shard.setdefault(row.id >> SHARD_ID_BITS, []).append(row)
+        details: Dict[int, Tuple[str, float]] = {}
+        for number, shard_rows in by_shard.items():
+            shard = self._by_number.get(number)
+            if shard is not None:
+                with shard.sessions() as session:
+                    details.update(search_details(session, filters, shard_rows))
+        return details
+
+    # GET /logs/stats: los rollups de cada shard (en paralelo), sumando los buckets repetidos (solo
+    # puede pasar con la DB anterior al sharding) y con el mismo corte que query_rollups
+    def query_rollups(self, granularity: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      service: Optional[str] = None, severity: Optional[str] = None,
+                      limit: int = 10_000) -> List[StatsBucket]:
+        def fetch(shard: Shard) -> List[Row]:
+            with shard.engine.connect() as conn:
+                return query_rollups(conn, granularity, start=start, end=end, service=service,
+                                     severity=severity, limit=limit)
+
+        counts: Dict[Tuple[datetime, str, str], int] = {}
+        for rows in self._executor().map(fetch, self.readable(service)):
+            for row in rows:
+                key = (row.bucket_start, row.service, row.severity)
+                counts[key] = counts.get(key, 0) + row.count
+        newest = sorted(counts.items(), reverse=True)[:limit]
+        return [StatsBucket(*key, count) for key, count in reversed(newest)]
+
+    # Estado de los pools de conexiones, con el shard como label (GET /metrics)
+    def pool_gauges(self) -> Dict[str, List[Tuple[Labels, float]]]:
+        gauges: Dict[str, List[Tuple[Labels, float]]] = {}
+        for shard in self.all():
+            for name, samples in pool_gauges(shard.engine, shard=shard.name).items():
+                gauges.setdefault(name, []).extend(samples)
+        return gauges
+
+
+class ShardedIngest:
+    """
+    Una cola de ingesta por shard con la interfaz de IngestQueue para routes.py (enqueue, stats,
+    ack): enqueue() manda el lote a la cola del shard de su servicio (todas las filas de un lote son
+    del mismo servicio, el del token). Sirve con IngestQueue (modo async) y con WriterClient (serve.py).
+    """
+
+    def __init__(self, shards: ShardSet, queues: Dict[str, Any], ack: str):
+        self.shards = shards
+        self.queues = queues
+        self.ack = ack
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        self.queues[self.shards.for_service(rows[0]["service"]).name].enqueue(rows)
+
+    def stop(self) -> None:
+        for queue in self.queues.values():
+            queue.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        per_shard = {name: queue.stats() for name, queue in self.queues.items()}
+        return {
+            "queue_rows": sum(stats.get("queue_rows", 0) for stats in per_shard.values()),
+            "shards": per_shard,
+        }
+
+
+_shards: Optional[ShardSet] = None
+_shards_lock = threading.Lock()
+
+
+# Los shards del proceso (se abren una vez, como ENGINE en db.py). Los nombres salen de TOKENS
+# (config.SHARDING="service") o son shard0..shardN-1 ("hash").
+def get_shards() -> ShardSet:
+    global _shards
+    with _shards_lock:
+        if _shards is None:
+            if config.SHARDING == "hash":
+                names = [f"shard{i}" for i in range(max(1, config.SHARD_COUNT))]
+            else:
+                names = sorted({shard_name(service) for service in TOKENS.values()})
+            legacy = MAIN_DB if os.path.exists(config.DB_PATH) else None
+            _shards = ShardSet(names, legacy)
+        return _shards
+
+
+# Las DBs de logs: sin sharding, la de LOGS_DB_PATH; con sharding, los shards + la anterior si existe
+def log_databases() -> List[Shard]:
+    if config.SHARDING == "none":
+        return [MAIN_DB]
+    return get_shards().all()
@@ -0,0 +1,312 @@
+# storage.py — lectura y escritura de logs en la DB
+
+# Camino rápido para insertar lotes: en vez de crear un objeto ORM Log por ítem
+# (identity map + unit of work), mandamos filas "planas" (dicts) en un único
+# INSERT tipo executemany sobre la tabla logs (SQLAlchemy Core).
+# Con particionado por tiempo (config.PARTITIONING) las filas van a su partición
+# y las lecturas combinan solo las particiones que hacen falta (ver partitions.py).
+
+import base64
+import heapq
+import logging
+from collections import deque
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import Select, Table, func, insert, literal_column, select, tuple_
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.orm import Session
+
+from . import config
+from .archive import matching_segments, merge_archived
+from .compact import COMPACT_TABLE, COMPACT_VIEW, has_wide_rows, insert_compact
+from .fts import HIGHLIGHT_CLOSE, HIGHLIGHT_OPEN, fts_enabled, fts_is_selective, fts_table
+from .models import Log
+from .partitions import allocate_ids, insert_partitioned, overlapping_partitions
+from .rollups import update_rollups
+
+# Tabla "cruda" de logs (Core), la misma que usa el modelo ORM
+LOGS_TABLE = Log.__table__
+
+logger = logging.getLogger(__name__)
+
+
+# Inserta un lote de filas ya validadas (cada fila = dict con las columnas de Log)
+# y suma sus conteos a los rollups en la misma transacción.
+# Cada fila queda con su id (row["id"]) en todos los layouts.
+# No hace commit: eso queda en manos de quien abrió la sesión.
+def insert_rows(session: Session, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    if config.PARTITIONING != "none":
+        insert_partitioned(session, rows, config.PARTITIONING)
+    elif config.STORAGE_LAYOUT == "compact":
+        insert_compact(session, rows)
+    elif config.SHARDING != "none":
+        # Con shards los ids salen de la secuencia de la DB, que arranca en el rango del shard
+        # (ver shards.py): así son únicos entre shards aunque cada uno tenga su tabla logs
+        first_id = allocate_ids(session.connection(), len(rows))
+        for offset, row in enumerate(rows):
+            row["id"] = first_id + offset
+        session.execute(insert(LOGS_TABLE), rows)
+    else:
+        # Pasar una lista de dicts a execute() => executemany en el driver
+        session.execute(insert(LOGS_TABLE), rows)
+        # Un executemany con el lock de escritura toma rowids consecutivos (max + 1 cada vez):
+        # los ids del lote terminan en last_insert_rowid(). Más barato que RETURNING o la secuencia.
+        last_id = session.connection().exec_driver_sql("SELECT last_insert_rowid()").scalar_one()
+        first_id = last_id - len(rows) + 1
+        for offset, row in enumerate(rows):
+            row["id"] = first_id + offset
+    if config.ROLLUPS_ENABLED:
+        update_rollups(session.connection(), rows)
+
+
+class WriteSummary:
+    """
+    Resumen de las filas de un commit: qué services/severities y qué rangos de
+    timestamp y received_at tocaron (naive, como se guardan). Se arma de a tandas
+    con add(), así no hace falta retener todas las filas hasta el commit: solo las
+    últimas config.TAIL_BUFFER_ROWS (`recent`, para /logs/tail), que se sueltan
+    después de avisar a los listeners.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=config.TAIL_BUFFER_ROWS)
+        self.services: Set[str] = set()
+        self.severities: Set[str] = set()
+        self.timestamp_min: Optional[datetime] = None
+        self.timestamp_max: Optional[datetime] = None
+        self.received_min: Optional[datetime] = None
+        self.received_max: Optional[datetime] = None
+        # Segundos que tardó la escritura (INSERTs + commit), lo completa quien hace el commit
+        self.write_s = 0.0
+
+    def add(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        self.rows += len(rows)
+        self.recent.extend(rows)
+        self.services.update(row["service"] for row in rows)
+        self.severities.update(row["severity"] for row in rows)
+        timestamps = [row["timestamp"].replace(tzinfo=None) for row in rows]
+        received = [row["received_at"].replace(tzinfo=None) for row in rows]
+        self.timestamp_min = min(timestamps + ([self.timestamp_min] if self.timestamp_min else []))
+        self.timestamp_max = max(timestamps + ([self.timestamp_max] if self.timestamp_max else []))
+        self.received_min = min(received + ([self.received_min] if self.received_min else []))
+        self.received_max = max(received + ([self.received_max] if self.received_max else []))
+
+
+# Función que se llama después de cada commit de logs nuevos (ej. invalidar el cache de GET /logs).
+# Cada app tiene su lista (app.extensions["commit_listeners"], ver create_app): así una app
+# descartada no sigue recibiendo commits.
+CommitListener = Callable[[WriteSummary], None]
+
+
+# Avisa a los listeners que se confirmaron filas nuevas (llamar después del commit, no antes).
+# Un listener que falla no corta el aviso a los demás ni a quien hizo el commit (el writer, el request):
+# las filas ya están guardadas, así que solo queda en el log
+def notify_committed(summary: WriteSummary, listeners: Iterable[CommitListener]) -> None:
+    if not summary.rows:
+        return
+    for listener in list(listeners):
+        try:
+            listener(summary)
+        except Exception:
+            logger.exception("falló un listener de commit (%r)", listener)
+    # Las filas solo se prestan durante el aviso (el cache de consultas se queda con el resumen)
+    summary.recent.clear()
+
+
+# Tablas a consultar para un rango de timestamp: la tabla logs, o (particionado) las
+# particiones que se solapan + logs (datos anteriores a activar el particionado),
+# o (layout compacto) la vista compacta + logs si tiene datos de antes del cambio de layout
+def source_tables(conn: Connection, timestamp_start: Optional[datetime] = None,
+                  timestamp_end: Optional[datetime] = None) -> List[Table]:
+    if config.STORAGE_LAYOUT == "compact":
+        return [COMPACT_VIEW, LOGS_TABLE] if has_wide_rows(conn) else [COMPACT_VIEW]
+    if config.PARTITIONING == "none":
+        return [LOGS_TABLE]
+    return overlapping_partitions(conn, timestamp_start, timestamp_end) + [LOGS_TABLE]
+
+
+# Para el archivo frío (archive.py): cada tabla de source_tables con la tabla de la que se borra
+# (la vista del layout compacto se lee, pero las filas están en logs_compact)
+def archive_sources(conn: Connection) -> List[Tuple[Table, Table]]:
+    return [(table, COMPACT_TABLE if table is COMPACT_VIEW else table) for table in source_tables(conn)]
+
+
+# Clave del orden de GET /logs (received_at DESC, id DESC)
+def sort_key(row: Row) -> Tuple[datetime, int]:
+    return row.received_at, row.id
+
+
+# Clave del orden por relevancia (rank ASC, id DESC), para heapq.merge con reverse=True
+def rank_sort_key(row: Row) -> Tuple[float, int]:
+    return -row.rank, row.id
+
+
+# Recorre los logs que cumplen los filtros, en el orden de GET /logs, leyendo la DB por tandas.
+# Con una sola tabla es un único SELECT; con particiones, un SELECT por partición
+# (cada uno ya ordenado por su índice) combinados con un k-way merge.
+# Si hay segmentos del archivo frío que pueden tener filas (sin q), se suman al merge
+# (archive_dir: carpeta de los segmentos de esta DB; por defecto config.ARCHIVE_DIR).
+def iter_log_rows(session: Session, filters: Dict[str, Any], after: Optional[Tuple[datetime, int]] = None,
+                  limit: Optional[int] = None, offset: int = 0, chunk_rows: int = 1000,
+                  order: str = "recent", archive_dir: Optional[str] = None) -> Iterator[Row]:
+    conn = session.connection()
+    tables = source_tables(conn, filters.get("timestamp_start"), filters.get("timestamp_end"))
+    segments = [] if filters.get("q") else matching_segments(conn, filters, after)
+
+    def table_query(table: Table) -> Select:
+        q = filters.get("q")
+        selective = bool(q) and order == "recent" and fts_enabled() and fts_is_selective(conn, table.name, q)
+        return build_logs_query(table, **filters, after=after, order=order, fts_selective=selective)
+
+    if len(tables) == 1 and not segments:
+        query = table_query(tables[0])
+        if limit is not None:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+        yield from conn.execute(query.execution_options(yield_per=chunk_rows))
+        return
+
+    streams = []
+    for table in tables:
+        query = table_query(table)
+        if limit is not None:
+            # cada partición aporta como mucho offset + limit filas
+            query = query.limit(offset + limit)
+        streams.append(conn.execute(query.execution_options(yield_per=chunk_rows)))
+    merged = heapq.merge(*streams, key=rank_sort_key if order == "rank" else sort_key, reverse=True)
+    if segments:
+        merged = merge_archived(merged, segments, archive_dir or config.ARCHIVE_DIR, filters, after)
+    yield from islice(merged, offset, None if limit is None else offset + limit)
+
+
+# Mensaje resaltado y relevancia (bm25) de los logs encontrados por una búsqueda full-text, por id.
+# Se calcula aparte y solo para las filas de la página: highlight()/bm25() sobre todas las
+# coincidencias sería lo más caro de la consulta. La FTS5 resuelve rápido un rango de rowid
+# (un IN de ids, en cambio, repite la búsqueda por cada id), así que pedimos min..max y filtramos.
+def search_details(session: Session, filters: Dict[str, Any], rows: List[Row]) -> Dict[int, Tuple[str, float]]:
+    wanted = {row.id for row in rows}
+    if not wanted:
+        return {}
+    conn = session.connection()
+    details: Dict[int, Tuple[str, float]] = {}
+    for table in source_tables(conn, filters.get("timestamp_start"), filters.get("timestamp_end")):
+        fts = fts_table(table.name)
+        fts_ref = literal_column(f'"{fts.name}"')
+        query = (
+            select(
+                fts.c.rowid,
+                func.highlight(fts_ref, 0, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE),
+                func.bm25(fts_ref),
+            )
+            .where(fts_ref.op("MATCH")(filters["q"]))
+            .where(fts.c.rowid.between(min(wanted), max(wanted)))
+        )
+        for rowid, highlight, rank in conn.execute(query):
+            if rowid in wanted:
+                details[rowid] = (highlight, rank)
+    return details
+
+
+# Agrupa un iterable en listas de `size` elementos (la última puede ser más corta)
+def iter_chunks(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Arma el SELECT de GET /logs con los filtros opcionales, ordenado por received_at DESC.
+# `after` = (received_at, id) de la última fila de la página anterior (paginado por cursor).
+# Las combinaciones de filtros están cubiertas por los índices de models.Log.
+# `table` es la tabla logs o una partición (mismas columnas e índices).
+# `q` = búsqueda full-text sobre el mensaje; `fts_selective` = si q tiene pocas coincidencias (ver fts.py).
+# Sin FTS (LOGS_FTS=0), `q` se busca como texto literal con LIKE '%q%' (escanea los mensajes).
+# `order` = "recent" (received_at DESC) o "rank" (relevancia, solo con q y FTS; agrega la columna rank).
+def build_logs_query(
+    table: Table = LOGS_TABLE,
+    timestamp_start: Optional[datetime] = None,
+    timestamp_end: Optional[datetime] = None,
+    received_start: Optional[datetime] = None,
+    received_end: Optional[datetime] = None,
+    service: Optional[str] = None,
+    severity: Optional[str] = None,
+    q: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    order: str = "recent",
+    fts_selective: bool = True,
+) -> Select:
+    c = table.c
+    query = select(table)
+    if q and not fts_enabled():
+        # Sin índice: subcadena literal (% y _ de q no son comodines; sin distinguir mayúsculas ASCII)
+        query = query.filter(c.message.like(f"%{like_escape(q)}%", escape="\\"))
+    elif q:
+        # Búsqueda full-text sobre la FTS de la tabla; sintaxis FTS5 ("frase exacta", prefijo*, AND/OR/NOT)
+        fts = fts_table(table.name)
+        fts_ref = literal_column(f'"{fts.name}"')
+        if order == "rank":
+            # Orden por relevancia: hace falta el bm25 de todas las coincidencias => join con la FTS
+            query = (
+                query.join(fts, fts.c.rowid == c.id)
+                .filter(fts_ref.op("MATCH")(q))
+                .add_columns(func.bm25(fts_ref).label("rank"))
+            )
+        else:
+            # Orden por recencia: la FTS solo aporta el conjunto de ids que coinciden.
+            # Pocas coincidencias: se traen por id y se ordenan (barato). Muchas: se recorre el índice
+            # de received_at y se corta al llenar la página ("id + 0" evita que SQLite busque por id).
+            matches = select(fts.c.rowid).where(fts_ref.op("MATCH")(q))
+            id_column = c.id if fts_selective else c.id + 0
+            query = query.filter(id_column.in_(matches))
+    if timestamp_start:
+        query = query.filter(c.timestamp >= timestamp_start)
+    if timestamp_end:
+        query = query.filter(c.timestamp <= timestamp_end)
+    if received_start:
+        query = query.filter(c.received_at >= received_start)
+    if received_end:
+        query = query.filter(c.received_at <= received_end)
+    if service:
+        query = query.filter(c.service == service)
+    if severity:
+        query = query.filter(c.severity == severity.upper())
+    if after:
+        # Keyset: seguimos justo después de la última fila vista (seek en el índice, sin saltear filas)
+        query = query.filter(tuple_(c.received_at, c.id) < tuple_(*after))
+    if order == "rank":
+        # Más relevante primero (bm25: menor = mejor)
+        return query.order_by(literal_column("rank"), c.id.desc())
+    # id como desempate: el orden es total y estable aunque lleguen logs nuevos mientras se pagina
+    return query.order_by(c.received_at.desc(), c.id.desc())
+
+
+# Escapa los comodines de LIKE (% y _, con \ como escape) para buscar `text` literal
+def like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Cursor opaco para paginar GET /logs: codifica la última (received_at, id) devuelta
+def encode_cursor(received_at: datetime, log_id: int) -> str:
+    raw = json.dumps([received_at.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Inversa de encode_cursor. Lanza ValueError si el cursor está mal formado.
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        received_at, log_id = json.loads(raw)
+        return datetime.fromisoformat(received_at), int(log_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("cursor inválido") from e
@@ -0,0 +1,152 @@
+# tail.py — GET /logs/tail: logs nuevos en vivo desde un ring buffer en memoria
+
+# Cada commit de logs nuevos (listener de storage) agrega las filas al final de un
+# ring buffer acotado. Cada suscriptor lee del ring con su propio cursor: no hay una
+# cola por suscriptor ni se consulta la DB, y publicar nunca espera a nadie.
+# Un suscriptor lento que queda más atrás que lo que guarda el ring se marca "lagged"
+# (se le avisa y sigue desde lo más viejo que quede). Cada entrada lleva un número de
+# secuencia del proceso (la posición de los cursores) y el id del log, que es el id del
+# evento SSE: es único en todas las DBs y workers, así que al reconectar con Last-Event-ID
+# (a este u otro worker de serve.py, o después de un reinicio) se reenvía del ring lo que
+# tenga id mayor, si todavía está.
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .storage import WriteSummary
+
+# Máximo de entradas que se entregan por lectura (una reconexión no retiene el lock mucho tiempo)
+READ_BATCH = 1_000
+
+
+class TailEntry:
+    __slots__ = ("seq", "row", "data")   # row["id"] = id del evento SSE
+
+    def __init__(self, seq: int, row: Dict[str, Any]):
+        self.seq = seq
+        self.row = row
+        # JSON del log, se serializa una vez (la primera vez que se manda) y se reusa
+        self.data: Optional[str] = None
+
+
+class Subscription:
+    __slots__ = ("cursor", "lagged", "after_id", "replay_until", "missed", "resume_after")
+
+    def __init__(self, cursor: int):
+        self.cursor = cursor   # seq de la última entrada entregada
+        self.lagged = 0        # cuántas veces se quedó atrás del ring
+        # Reconexión: de las entradas hasta replay_until (las que ya estaban al suscribirse)
+        # solo se entregan las de id > after_id. No se corta en la primera: con shards los commits
+        # de otra DB pueden llegar con ids menores
+        self.after_id: Optional[int] = None
+        self.replay_until = 0
+        self.missed = False    # el Last-Event-ID ya no está en el ring: avisar lagged en la primera lectura
+        self.resume_after = 0  # id del log más nuevo que se perdió en el último salto
+
+
+class TailHub:
+    """
+    Ring buffer de los últimos `size` logs confirmados + suscriptores.
+    - publish(): listener de commits (app.extensions["commit_listeners"]).
+    - subscribe()/read()/unsubscribe(): los usa cada conexión de /logs/tail.
+    - max_subscribers: subscribe() devuelve None si ya hay tantas conexiones.
+    """
+
+    def __init__(self, size: int, max_subscribers: int):
+        self.size = max(1, size)
+        self.max_subscribers = max_subscribers
+        self._ring: Deque[TailEntry] = deque(maxlen=self.size)
+        self._seq = 0
+        # id del log más nuevo que salió del ring (o que no llegó a entrar)
+        self._lost_max_id = 0
+        self._subscribers = 0
+        self._cond = threading.Condition()
+
+        # Contadores para monitoreo
+        self.published = 0
+        self.lagged_reads = 0
+
+    def publish(self, summary: WriteSummary) -> None:
+        if not summary.recent:
+            return
+        with self._cond:
+            # Si el commit trajo más filas de las que entran en el ring, las primeras se saltean
+            # (los ids de un commit son crecientes: las salteadas son menores que la primera que queda)
+            skipped = summary.rows - len(summary.recent)
+            if skipped:
+                self._seq += skipped
+                self._lost_max_id = max(self._lost_max_id, summary.recent[0]["id"] - 1)
+            for row in summary.recent:
+                if len(self._ring) == self.size:
+                    self._lost_max_id = max(self._lost_max_id, self._ring[0].row["id"])
+                self._seq += 1
+                self._ring.append(TailEntry(self._seq, row))
+            self.published += summary.rows
+            self._cond.notify_all()
+
+    # Nueva suscripción. Sin last_id arranca desde ahora; con last_id (Last-Event-ID, un id de log)
+    # reenvía lo del ring con id mayor. Si el ring ya descartó logs posteriores a last_id,
+    # la primera lectura avisa lagged.
+    def subscribe(self, last_id: Optional[int] = None) -> Optional[Subscription]:
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+            if last_id is None:
+                return Subscription(self._seq)
+            subscription = Subscription(self._ring[0].seq - 1 if self._ring else self._seq)
+            subscription.after_id = last_id
+            subscription.replay_until = self._seq
+            if last_id < self._lost_max_id:
+                subscription.missed = True
+                subscription.resume_after = self._lost_max_id
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._cond:
+            self._subscribers -= 1
+
+    # Entradas posteriores al cursor (espera hasta `timeout` si no hay). Devuelve
+    # (entradas, lagged): lagged = se perdieron entradas que el ring ya descartó
+    # (subscription.resume_after = id del log más nuevo perdido).
+    def read(self, subscription: Subscription, timeout: float) -> Tuple[List[TailEntry], bool]:
+        with self._cond:
+            if self._seq <= subscription.cursor and not subscription.missed:
+                self._cond.wait(timeout)
+            lagged = subscription.missed
+            subscription.missed = False
+            oldest = self._ring[0].seq if self._ring else self._seq + 1
+            if subscription.cursor < oldest - 1:
+                lagged = True
+                subscription.resume_after = self._lost_max_id
+                subscription.cursor = oldest - 1
+            if lagged:
+                subscription.lagged += 1
+                self.lagged_reads += 1
+            # Desde el final hacia atrás hasta el cursor: barato para quien está al día
+            entries: List[TailEntry] = []
+            for entry in reversed(self._ring):
+                if entry.seq <= subscription.cursor:
+                    break
+                entries.append(entry)
+            entries.reverse()
+            entries = entries[:READ_BATCH]
+            if entries:
+                subscription.cursor = entries[-1].seq
+            if subscription.after_id is not None:
+                after_id, replay_until = subscription.after_id, subscription.replay_until
+                entries = [entry for entry in entries if entry.seq > replay_until or entry.row["id"] > after_id]
+                if subscription.cursor >= replay_until:
+                    subscription.after_id = None
+            return entries, lagged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "buffer_rows": len(self._ring),
+                "buffer_size": self.size,
+                "subscribers": self._subscribers,
+                "published_rows": self.published,
+                "lagged_reads": self.lagged_reads,
+            }
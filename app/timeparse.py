@@ -0,0 +1,72 @@
+# timeparse.py — parseo de timestamps ISO8601 (camino rápido + fallback a dateutil)
+
+# Los clientes mandan casi siempre ISO8601 estricto, por ejemplo la salida de
+# datetime.now(timezone.utc).isoformat() ("2025-08-27T10:00:00.123456+00:00").
+# Para esas formas usamos datetime.fromisoformat (implementado en C, decenas de
+# veces más rápido que dateutil). Cualquier otra cosa ("27 Aug 2025 10:00", etc.)
+# sigue pasando por dateutil, así que lo que se aceptaba antes se sigue aceptando.
+
+import re
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Sequence
+
+from dateutil import parser as dtparser   # parsea ISO8601 “en serio”
+
+# Formas que fromisoformat resuelve igual que dateutil:
+# fecha, fecha + hora[:min[:seg[.fracción]]] con "T" o espacio, y zona "Z" o ±HH[:]MM
+ISO8601_STRICT = re.compile(
+    r"\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d{1,9})?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+)
+
+
+# Convierte string ISO8601 (o similar) a datetime con timezone.
+# Si no trae timezone, normalizamos a UTC.
+def parse_timestamp_iso8601(s: str) -> datetime:
+    dt = None
+    if ISO8601_STRICT.fullmatch(s):
+        try:
+            dt = datetime.fromisoformat(s)
+        except ValueError:
+            # ej: "2025-02-30" o una versión de Python sin soporte para alguna forma: decide dateutil
+            dt = None
+    if dt is None:
+        dt = dtparser.parse(s)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+# Parsea un lote de timestamps en una sola llamada.
+# Devuelve una lista alineada con `values`: datetime, o None si el valor no es un string parseable.
+# Un valor igual al anterior (típico en lotes armados en el mismo instante) reutiliza el resultado.
+def parse_timestamps(values: Sequence[Any]) -> List[Optional[datetime]]:
+    # Referencias locales: evita buscar atributos/globales en cada vuelta del loop
+    fullmatch = ISO8601_STRICT.fullmatch
+    fromisoformat = datetime.fromisoformat
+    utc = timezone.utc
+
+    parsed: List[Optional[datetime]] = []
+    append = parsed.append
+    previous: Any = None
+    previous_dt: Optional[datetime] = None
+    for value in values:
+        if value == previous and previous is not None:
+            append(previous_dt)
+            continue
+        dt: Optional[datetime] = None
+        if isinstance(value, str):
+            try:
+                dt = fromisoformat(value) if fullmatch(value) else None
+            except ValueError:
+                dt = None
+            if dt is None:
+                try:
+                    dt = dtparser.parse(value)
+                except Exception:
+                    dt = None
+            if dt is not None and dt.tzinfo is None:
+                dt = dt.replace(tzinfo=utc)
+        append(dt)
+        previous, previous_dt = value, dt
+    return parsed
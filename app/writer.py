@@ -0,0 +1,194 @@
+# writer.py — cola de ingesta "write-behind" con group commit
+
+# En modo async, POST /logs no escribe en la DB: deja las filas validadas en
+# una cola acotada (en memoria) y responde 202. Un único hilo writer vacía la
+# cola y hace commit en grupo (juntando filas de varios requests), así la
+# latencia del request no incluye el fsync y los clientes no compiten por el
+# lock de escritura de SQLite.
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .storage import CommitListener, WriteSummary, insert_rows, notify_committed
+
+logger = logging.getLogger(__name__)
+
+# Aviso de un lote al confirmarse su grupo: True = commit hecho, False = el grupo falló
+CommitCallback = Callable[[bool], None]
+
+
+class IngestUnavailable(Exception):
+    """No se pudo aceptar un lote: reason = "ingest_queue_full", "writer_unavailable", "write_failed", ..."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class IngestQueue:
+    """
+    Cola acotada (en filas) + hilo writer con group commit.
+    - submit(): encola un lote; devuelve False si la cola está llena o cerrada.
+    - El writer hace commit al juntar `commit_rows` filas o al pasar
+      `commit_interval_ms` desde el primer lote pendiente.
+    - stop(): deja de aceptar lotes, vacía lo pendiente y espera al writer.
+    - ack: cuándo enqueue() da un lote por aceptado: "enqueue" (al entrar en la cola) o
+      "commit" (espera al commit de su grupo, hasta ack_timeout_s).
+    - listeners: a quiénes avisar cada commit (storage.notify_committed); se pueden sumar después.
+    """
+
+    def __init__(self, session_factory, max_rows: int, commit_rows: int, commit_interval_ms: int,
+                 ack: str = "enqueue", ack_timeout_s: float = 30.0,
+                 listeners: Optional[List[CommitListener]] = None):
+        self._session_factory = session_factory
+        self.listeners = listeners if listeners is not None else []
+        self.max_rows = max_rows
+        self.commit_rows = max(1, commit_rows)
+        self.commit_interval = max(0, commit_interval_ms) / 1000.0
+        self.ack = ack
+        self.ack_timeout_s = ack_timeout_s
+
+        # Lotes pendientes (cada uno = filas de un request + a quién avisar cuando se confirme)
+        self._pending: Deque[Tuple[List[Dict[str, Any]], Optional[CommitCallback]]] = deque()
+        self._pending_rows = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Contadores para monitoreo
+        self.committed_rows = 0
+        self.commits = 0
+        self.last_commit_rows = 0
+        self.rejected_batches = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="logs-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: List[Dict[str, Any]], on_commit: Optional[CommitCallback] = None) -> bool:
+        if not rows:
+            if on_commit is not None:
+                on_commit(True)
+            return True
+        with self._cond:
+            if self._closed or self._pending_rows + len(rows) > self.max_rows:
+                self.rejected_batches += 1
+                return False
+            self._pending.append((rows, on_commit))
+            self._pending_rows += len(rows)
+            self._cond.notify()
+        return True
+
+    # Encola un lote según `ack`; si no se puede aceptar, lanza IngestUnavailable
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        if self.ack != "commit":
+            if not self.submit(rows):
+                raise IngestUnavailable("ingest_queue_full")
+            return
+        done = threading.Event()
+        outcome: List[bool] = []
+
+        def on_commit(ok: bool) -> None:
+            outcome.append(ok)
+            done.set()
+
+        if not self.submit(rows, on_commit):
+            raise IngestUnavailable("ingest_queue_full")
+        if not done.wait(self.ack_timeout_s):
+            raise IngestUnavailable("commit_timeout")
+        if not outcome[0]:
+            raise IngestUnavailable("write_failed")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queue_rows": self._pending_rows,
+                "queue_batches": len(self._pending),
+                "max_rows": self.max_rows,
+                "ack": self.ack,
+                "commit_batch_rows": self.commit_rows,
+                "last_commit_rows": self.last_commit_rows,
+                "committed_rows": self.committed_rows,
+                "commits": self.commits,
+                "rejected_batches": self.rejected_batches,
+                "write_errors": self.write_errors,
+            }
+
+    # Junta lotes hasta commit_rows o hasta que venza el intervalo
+    def _take_group(self) -> Optional[Tuple[List[Dict[str, Any]], List[CommitCallback]]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                # cerrada y vacía: el writer termina
+                return None
+
+            deadline = time.monotonic() + self.commit_interval
+            while self._pending_rows < self.commit_rows and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            group: List[Dict[str, Any]] = []
+            callbacks: List[CommitCallback] = []
+            while self._pending and len(group) < self.commit_rows:
+                rows, on_commit = self._pending.popleft()
+                group.extend(rows)
+                if on_commit is not None:
+                    callbacks.append(on_commit)
+            self._pending_rows -= len(group)
+            return group, callbacks
+
+    def _run(self) -> None:
+        while True:
+            taken = self._take_group()
+            if taken is None:
+                return
+            group, callbacks = taken
+            ok = self._write(group)
+            # Los que esperaban el commit (ack="commit") se enteran después de los listeners,
+            # así el cache ya está invalidado cuando el cliente recibe su respuesta
+            for on_commit in callbacks:
+                try:
+                    on_commit(ok)
+                except Exception:
+                    logger.exception("writer: falló el aviso de commit de un lote")
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        started = time.perf_counter()
+        try:
+            with self._session_factory() as s:
+                insert_rows(s, rows)
+                s.commit()
+        except Exception:
+            # Con ack="enqueue" ya respondimos 202: no hay a quién devolverle el error, lo dejamos en el log.
+            # Cualquier error (DB, una fila mal armada) falla solo este grupo: el hilo writer sigue vivo
+            self.write_errors += 1
+            logger.exception("writer: no se pudo guardar un grupo de %d filas", len(rows))
+            return False
+        self.commits += 1
+        self.committed_rows += len(rows)
+        self.last_commit_rows = len(rows)
+
+        # Avisamos qué se confirmó (ej. para invalidar el cache de GET /logs).
+        # El grupo ya está guardado: si armar el aviso falla, queda en el log y el commit cuenta igual
+        try:
+            summary = WriteSummary()
+            summary.add(rows)
+            summary.write_s = time.perf_counter() - started
+            notify_committed(summary, self.listeners)
+        except Exception:
+            logger.exception("writer: no se pudo avisar el commit de %d filas", len(rows))
+        return True
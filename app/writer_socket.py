@@ -0,0 +1,282 @@
+# writer_socket.py — proceso writer dedicado (serve.py) y su cliente, por un socket Unix
+
+# En serve.py hay varios procesos HTTP y uno solo escribe en SQLite: el writer. Los workers
+# validan y normalizan los logs y le mandan las filas por un socket Unix; el writer las pone
+# en su IngestQueue (group commit), así SQLite tiene un único escritor y no hay peleas por el lock.
+# Por la misma vía el writer avisa cada commit (WriteSummary) a los workers suscriptos, que lo
+# reenvían a sus listeners locales: cache de GET /logs, /logs/tail y cuotas adaptativas.
+#
+# Protocolo: mensajes con 4 bytes de largo + pickle. Solo se habla con procesos propios por un
+# socket con permisos 0600 (pickle no es seguro frente a datos de terceros).
+#   {"op": "enqueue", "rows": [...]}  → {"ok": True} | {"ok": False, "error": "ingest_queue_full"|...}
+#   {"op": "stats"}                   → stats() de la IngestQueue
+#   {"op": "subscribe"}               → a partir de ahí el writer manda un WriteSummary por commit
+
+import logging
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .storage import CommitListener, WriteSummary, notify_committed
+from .writer import IngestQueue, IngestUnavailable
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!I")
+
+# Tope de espera al mandarle un commit a un worker (si no lee, se lo desconecta)
+BROADCAST_TIMEOUT_S = 5.0
+
+# Conexiones pendientes de aceptar en el socket del writer (el default de socketserver es 5)
+LISTEN_BACKLOG = 512
+
+# Conexiones libres que guarda cada worker para reusar
+CLIENT_POOL_SIZE = 16
+
+
+def send_message(sock: socket.socket, message: Any) -> None:
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> Any:
+    size = HEADER.unpack(_recv_exact(sock, HEADER.size))[0]
+    return pickle.loads(_recv_exact(sock, size))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("socket cerrado")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class _Subscriber:
+    __slots__ = ("sock", "lock")
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+
+class WriterServer:
+    """
+    Lado del proceso writer: atiende a los workers por el socket Unix y encola en `queue`.
+    - start(): crea el socket (0600) y registra el aviso de commits a los suscriptores.
+    - stop(): deja de atender, vacía la cola (último group commit) y borra el socket.
+    """
+
+    def __init__(self, socket_path: str, queue: IngestQueue):
+        self.socket_path = socket_path
+        self.queue = queue
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)   # quedó de un writer anterior
+        writer = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                writer._handle(self.request)
+
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler, bind_and_activate=False)
+        server.daemon_threads = True
+        server.request_queue_size = LISTEN_BACKLOG
+        # Permisos antes de escuchar: solo este usuario puede conectarse
+        old_umask = os.umask(0o177)
+        try:
+            server.server_bind()
+        finally:
+            os.umask(old_umask)
+        server.server_activate()
+        self._server = server
+        self.queue.listeners.append(self.broadcast)
+        threading.Thread(target=server.serve_forever, name="writer-socket", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self.queue.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    # Una conexión de un worker: pedidos hasta que la cierre
+    def _handle(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                message = recv_message(sock)
+            except (ConnectionError, OSError):
+                return
+            op = message.get("op")
+            if op == "subscribe":
+                self._subscribe(sock)
+                return
+            if op == "enqueue":
+                try:
+                    self.queue.enqueue(message["rows"])
+                    reply: Dict[str, Any] = {"ok": True}
+                except IngestUnavailable as e:
+                    reply = {"ok": False, "error": e.reason}
+            elif op == "stats":
+                reply = self.queue.stats()
+            else:
+                reply = {"ok": False, "error": f"op desconocida: {op!r}"}
+            try:
+                send_message(sock, reply)
+            except OSError:
+                return
+
+    def _subscribe(self, sock: socket.socket) -> None:
+        sock.settimeout(BROADCAST_TIMEOUT_S)
+        subscriber = _Subscriber(sock)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        # El worker no manda nada más: esperamos a que cierre para sacarlo de la lista
+        while True:
+            try:
+                if not sock.recv(1024):
+                    break
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+        self._unsubscribe(subscriber)
+
+    def _unsubscribe(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    # Listener de commits del writer: el mismo WriteSummary a cada worker suscripto
+    def broadcast(self, summary: WriteSummary) -> None:
+        data = pickle.dumps(summary, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = HEADER.pack(len(data)) + data
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                with subscriber.lock:
+                    subscriber.sock.sendall(frame)
+            except OSError:
+                logger.warning("writer: un worker no recibió el aviso de commit, se lo desconecta")
+                self._unsubscribe(subscriber)
+                subscriber.sock.close()
+
+
+class WriterClient:
+    """
+    Lado de cada worker HTTP: misma interfaz que IngestQueue para routes.py (enqueue, stats, ack).
+    Cada pedido usa una conexión libre del pool (o abre una) y la devuelve al terminar; si el
+    writer no responde, enqueue() lanza IngestUnavailable("writer_unavailable") y POST /logs
+    contesta 503. Una conexión rota se descarta; la próxima vez se abre otra.
+    """
+
+    def __init__(self, socket_path: str, ack: str, ack_timeout_s: float):
+        self.socket_path = socket_path
+        self.ack = ack
+        # Con ack="commit" el writer responde recién después del commit
+        self.timeout = ack_timeout_s + 5.0
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        try:
+            reply = self._call({"op": "enqueue", "rows": rows})
+        except OSError:
+            raise IngestUnavailable("writer_unavailable")
+        if not reply.get("ok"):
+            raise IngestUnavailable(reply.get("error", "writer_unavailable"))
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            return {"writer": "ok", **self._call({"op": "stats"})}
+        except OSError:
+            return {"writer": "unavailable"}
+
+    def _call(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            sock = self._idle.pop() if self._idle else None
+        try:
+            if sock is None:
+                sock = connect(self.socket_path, self.timeout)
+                reply = self._exchange(sock, message)
+            else:
+                try:
+                    reply = self._exchange(sock, message)
+                except OSError:
+                    # Conexión guardada de un writer anterior (se reinició): una vez más con una nueva
+                    sock.close()
+                    sock = connect(self.socket_path, self.timeout)
+                    reply = self._exchange(sock, message)
+        except OSError:
+            if sock is not None:
+                sock.close()
+            raise
+        with self._lock:
+            if len(self._idle) < CLIENT_POOL_SIZE:
+                self._idle.append(sock)
+                sock = None
+        if sock is not None:
+            sock.close()
+        return reply
+
+    @staticmethod
+    def _exchange(sock: socket.socket, message: Dict[str, Any]) -> Dict[str, Any]:
+        send_message(sock, message)
+        return recv_message(sock)
+
+
+def connect(socket_path: str, timeout: float) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class CommitSubscriber:
+    """
+    Hilo de cada worker que recibe los commits del writer y los pasa a notify_committed():
+    así el cache de GET /logs, /logs/tail y las cuotas adaptativas ven las escrituras de todos.
+    Si el writer se cae, reintenta la conexión cada `retry_s` segundos.
+    """
+
+    def __init__(self, socket_path: str, listeners: List[CommitListener], retry_s: float = 0.5):
+        self.socket_path = socket_path
+        self.listeners = listeners
+        self.retry_s = retry_s
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name="commit-subscriber", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            sock = None
+            try:
+                sock = connect(self.socket_path, timeout=5.0)
+                send_message(sock, {"op": "subscribe"})
+                sock.settimeout(None)
+                while True:
+                    notify_committed(recv_message(sock), self.listeners)
+            except (OSError, pickle.UnpicklingError):
+                if sock is not None:
+                    sock.close()
+                time.sleep(self.retry_s)
@@ -0,0 +1,2 @@
+# benchmarks — scripts para medir el rendimiento del servidor de logs
+# Se corren desde la raíz del proyecto con: python -m benchmarks.<script>
@@ -0,0 +1,130 @@
+# bench_concurrency.py — lecturas y escrituras concurrentes, latencia p50/p99 por perfil
+# Compara el perfil "default" (journal rollback) contra "concurrent" (WAL + pragmas).
+# Uso: python -m benchmarks.bench_concurrency --readers 4 --writers 2 --seconds 5
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import STORAGE_PROFILES, make_engine
+from app.models import Base, Log
+from app.storage import insert_rows
+
+SERVICES = ["reports", "payments", "chat"]
+SEVERITIES = ["DEBUG", "INFO", "WARN", "ERROR", "CRITICAL"]
+
+
+def make_rows(n: int) -> List[Dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "timestamp": now,
+            "received_at": now,
+            "service": random.choice(SERVICES),
+            "severity": random.choice(SEVERITIES),
+            "message": f"mensaje {i}",
+            "token_used": "svc-reports-123",
+        }
+        for i in range(n)
+    ]
+
+
+# Percentil simple sobre una lista ordenada
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_profile(profile: str, readers: int, writers: int, seconds: float, seed_rows: int, batch_size: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), profile, pool_size=readers + writers)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+        # Datos previos para que las lecturas tengan algo que recorrer
+        with SessionLocal() as s:
+            insert_rows(s, make_rows(seed_rows))
+            s.commit()
+
+        latencies: Dict[str, Any] = {"read": [], "write": []}
+        failures = {"read": 0, "write": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def reader():
+            query = select(Log).order_by(Log.received_at.desc()).limit(100)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    with SessionLocal() as s:
+                        s.execute(query.filter(Log.service == random.choice(SERVICES))).scalars().all()
+                except OperationalError:
+                    with lock:
+                        failures["read"] += 1
+                    continue
+                with lock:
+                    latencies["read"].append(time.perf_counter() - start)
+
+        def writer():
+            while time.monotonic() < deadline:
+                rows = make_rows(batch_size)
+                start = time.perf_counter()
+                try:
+                    with SessionLocal() as s:
+                        insert_rows(s, rows)
+                        s.commit()
+                except OperationalError:
+                    # "database is locked": el escritor no consiguió el lock a tiempo
+                    with lock:
+                        failures["write"] += 1
+                    continue
+                with lock:
+                    latencies["write"].append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    latencies["failures"] = failures
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia lectura/escritura por perfil de almacenamiento")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--profiles", nargs="+", default=sorted(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':>10} | {'op':>5} | {'ops':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'fallos':>6}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.readers, args.writers, args.seconds, args.seed_rows, args.batch_size)
+        for op in ("read", "write"):
+            values = sorted(result[op])
+            print(
+                f"{profile:>10} | {op:>5} | {len(values):>7} | "
+                f"{percentile(values, 50) * 1000:>8.2f} | {percentile(values, 99) * 1000:>8.2f} | "
+                f"{result['failures'][op]:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
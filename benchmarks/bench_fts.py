@@ -0,0 +1,120 @@
+# bench_fts.py — búsqueda full-text (FTS5) vs. escaneo con LIKE '%term%'
+# Llena una DB temporal con N logs (mensajes armados con un vocabulario fijo) y mide
+# la latencia de cada búsqueda por los dos caminos.
+# Uso: python -m benchmarks.bench_fts --rows 2000000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+from app.db import init_db, make_engine
+from app.storage import LOGS_TABLE, insert_rows, iter_log_rows, search_details
+
+# La FTS es opcional (LOGS_FTS); antes del primer uso (fts_enabled() queda cacheado)
+config.FTS_ENABLED = True
+
+WORDS = [
+    "reporte", "mensual", "exportado", "csv", "timeout", "consultando", "ventas", "permisos",
+    "insuficientes", "usuario", "fallo", "renderizar", "pdf", "reintento", "envío", "email",
+    "vacío", "datos", "cache", "caliente", "poblada", "conexión", "base", "restablecida",
+    "pago", "rechazado", "tarjeta", "chat", "mensaje", "entregado", "cola", "saturada",
+]
+
+# (búsqueda FTS5, término para LIKE)
+SEARCHES = [
+    ("timeout", "timeout"),
+    ("tarjeta", "tarjeta"),
+    ('"pago rechazado"', "pago rechazado"),
+    ("renderiz*", "renderiz"),
+]
+
+
+def fill(SessionLocal, rows: int, batch: int = 10_000) -> None:
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    inserted = 0
+    while inserted < rows:
+        n = min(batch, rows - inserted)
+        chunk = []
+        for i in range(n):
+            ts = start + timedelta(milliseconds=inserted + i)
+            chunk.append({
+                "timestamp": ts,
+                "received_at": ts,
+                "service": random.choice(["reports", "payments", "chat"]),
+                "severity": random.choice(["DEBUG", "INFO", "WARN", "ERROR"]),
+                "message": " ".join(random.choices(WORDS, k=random.randint(4, 10))) + f" #{inserted + i}",
+                "token_used": "svc-reports-123",
+            })
+        with SessionLocal() as s:
+            insert_rows(s, chunk)
+            s.commit()
+        inserted += n
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda: FTS5 vs. LIKE '%term%'")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"))
+        init_db(engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+        start = time.perf_counter()
+        fill(SessionLocal, args.rows)
+        print(f"{args.rows} filas insertadas (con índice FTS) en {time.perf_counter() - start:.1f}s\n")
+
+        # Camino de GET /logs?q=...: página por recencia + highlight/rank solo de esa página
+        def fts_page(q: str):
+            filters = {"q": q}
+            with SessionLocal() as session:
+                rows = list(iter_log_rows(session, filters, limit=args.limit))
+                search_details(session, filters, rows)
+            return rows
+
+        def like_page(term: str):
+            query = (
+                select(LOGS_TABLE)
+                .where(LOGS_TABLE.c.message.like(f"%{term}%"))
+                .order_by(LOGS_TABLE.c.received_at.desc(), LOGS_TABLE.c.id.desc())
+                .limit(args.limit)
+            )
+            with engine.connect() as conn:
+                return conn.execute(query).all()
+
+        print(f"{'búsqueda':>18} | {'coincidencias':>13} | {'FTS ms':>8} | {'LIKE ms':>8} | {'speedup':>7}")
+        # "inexistente" = peor caso para LIKE: recorre toda la tabla sin llenar la página
+        for fts_query, like_term in SEARCHES + [("inexistente", "inexistente")]:
+            with engine.connect() as conn:
+                matches = conn.execute(
+                    text("SELECT count(*) FROM logs_fts WHERE logs_fts MATCH :q"), {"q": fts_query}
+                ).scalar_one()
+            fts_s = timed(lambda: fts_page(fts_query))
+            like_s = timed(lambda: like_page(like_term))
+            print(
+                f"{fts_query:>18} | {matches:>13} | {fts_s * 1000:>8.1f} | "
+                f"{like_s * 1000:>8.1f} | {like_s / fts_s:>6.1f}x"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
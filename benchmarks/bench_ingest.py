@@ -0,0 +1,93 @@
+# bench_ingest.py — compara filas/seg del camino ORM vs. el INSERT en lote (Core)
+# Uso: python -m benchmarks.bench_ingest --rounds 20
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Log
+from app.routes import build_log_rows, normalize_severity, parse_timestamp_iso8601, validate_log_item
+from app.storage import insert_rows
+
+TOKEN = "svc-reports-123"
+SERVICE_NAME = "reports"
+SEVERITIES = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+BATCH_SIZES = [1, 10, 100, 1000]
+
+
+# Lote de ítems como los que manda client_reports_auto.py
+def make_batch(size: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "service": SERVICE_NAME,
+            "severity": random.choice(SEVERITIES),
+            "message": f"mensaje de prueba {i}",
+        }
+        for i in range(size)
+    ]
+
+
+# Camino anterior: un objeto Log por ítem + s.add() + commit
+def ingest_orm(SessionLocal, items: List[Dict[str, Any]]) -> None:
+    with SessionLocal() as s:
+        for item in items:
+            ok, _ = validate_log_item(item)
+            if not ok:
+                continue
+            s.add(Log(
+                timestamp=parse_timestamp_iso8601(item["timestamp"]),
+                received_at=datetime.now(timezone.utc),
+                service=item["service"].strip(),
+                severity=normalize_severity(item.get("severity", "INFO")),
+                message=item["message"].strip(),
+                token_used=TOKEN,
+            ))
+        s.commit()
+
+
+# Camino nuevo: filas planas + un INSERT executemany + commit
+def ingest_bulk(SessionLocal, items: List[Dict[str, Any]]) -> None:
+    rows, _ = build_log_rows(items, TOKEN)
+    with SessionLocal() as s:
+        insert_rows(s, rows)
+        s.commit()
+
+
+# Corre `rounds` lotes con una DB nueva y devuelve filas/seg
+def measure(fn: Callable, batch_size: int, rounds: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+        batches = [make_batch(batch_size) for _ in range(rounds)]
+
+        start = time.perf_counter()
+        for batch in batches:
+            fn(SessionLocal, batch)
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    return (batch_size * rounds) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta: ORM vs. INSERT en lote")
+    parser.add_argument("--rounds", type=int, default=20, help="Lotes por tamaño (default 20)")
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} | {'orm rows/s':>12} | {'bulk rows/s':>12} | {'speedup':>7}")
+    for size in BATCH_SIZES:
+        orm = measure(ingest_orm, size, args.rounds)
+        bulk = measure(ingest_bulk, size, args.rounds)
+        print(f"{size:>6} | {orm:>12.0f} | {bulk:>12.0f} | {bulk / orm:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# bench_layout.py — layout de almacenamiento "wide" vs. "compact"
+# Inserta los mismos N logs (mensajes repetidos como los de client_reports_auto.py y
+# tokens de 64 caracteres) en una DB por layout y reporta:
+# - filas/s de ingesta (INSERT en tandas de 1000 + commit, como POST /logs)
+# - bytes por fila en disco (tabla + índices + diccionarios)
+# - latencia de GET /logs y que la respuesta sea idéntica byte a byte en los dos layouts (si no, exit 1)
+# La FTS y los rollups se apagan para medir solo el almacenamiento de los logs.
+# Uso: python -m benchmarks.bench_layout --rows 500000
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+
+# Antes del primer uso de la FTS (fts_enabled() queda cacheado)
+config.FTS_ENABLED = False
+config.ROLLUPS_ENABLED = False
+
+from app.db import init_db, make_engine  # noqa: E402
+from app.routes import serialize_log  # noqa: E402
+from app.storage import insert_rows, iter_log_rows  # noqa: E402
+from client_reports_auto import MESSAGES  # noqa: E402
+
+SERVICES = ["reports", "payments", "chat"]
+SEVERITIES = ["DEBUG", "INFO", "WARN", "ERROR"]
+TOKENS = [f"svc-{service}-" + "x" * (59 - len(service)) for service in SERVICES]   # 64 caracteres
+
+# Consultas de GET /logs para comparar las respuestas de los dos layouts
+QUERIES = [
+    {},
+    {"service": "payments"},
+    {"severity": "ERROR"},
+    {"service": "chat", "severity": "WARN"},
+]
+
+
+def make_rows(rows: int):
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    result = []
+    for i in range(rows):
+        service = random.randrange(len(SERVICES))
+        ts = start + timedelta(milliseconds=i)
+        result.append({
+            "timestamp": ts,
+            "received_at": ts,
+            "service": SERVICES[service],
+            "severity": random.choice(SEVERITIES),
+            "message": random.choice(MESSAGES),
+            "token_used": TOKENS[service],
+        })
+    return result
+
+
+def db_bytes(engine) -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar_one()
+        used = conn.exec_driver_sql("PRAGMA page_count").scalar_one() - conn.exec_driver_sql("PRAGMA freelist_count").scalar_one()
+    return used * page_size
+
+
+def run_layout(layout: str, rows, tmp: str, batch: int = 1000):
+    config.STORAGE_LAYOUT = layout
+    engine = make_engine(os.path.join(tmp, f"{layout}.db"))
+    init_db(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    empty = db_bytes(engine)
+
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch):
+        with SessionLocal() as s:
+            insert_rows(s, [dict(row) for row in rows[offset:offset + batch]])
+            s.commit()
+    elapsed = time.perf_counter() - start
+    bytes_per_row = (db_bytes(engine) - empty) / len(rows)
+
+    # Respuestas de GET /logs (mismo serializado que la API) y su latencia
+    responses = []
+    start = time.perf_counter()
+    for filters in QUERIES:
+        full = {"timestamp_start": None, "timestamp_end": None, "received_start": None,
+                "received_end": None, "service": None, "severity": None, "q": None, **filters}
+        with SessionLocal() as s:
+            page = [serialize_log(row) for row in iter_log_rows(s, full, limit=100)]
+        responses.append(json.dumps(page, sort_keys=True, separators=(",", ":")).encode())
+    query_ms = (time.perf_counter() - start) * 1000 / len(QUERIES)
+
+    engine.dispose()
+    print(f"{layout:>8} | {len(rows) / elapsed:>10.0f} | {bytes_per_row:>9.1f} | {query_ms:>9.2f}")
+    return responses, bytes_per_row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de layouts de almacenamiento: wide vs. compact")
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{args.rows} logs, {len(MESSAGES)} mensajes distintos, tokens de {len(TOKENS[0])} caracteres\n")
+    print(f"{'layout':>8} | {'filas/s':>10} | {'bytes/fila':>9} | {'GET ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        wide, wide_bytes = run_layout("wide", rows, tmp)
+        compact, compact_bytes = run_layout("compact", rows, tmp)
+
+    print(f"\ncompact ocupa {compact_bytes / wide_bytes:.0%} de wide")
+    if wide != compact:
+        print("las respuestas de GET /logs difieren entre layouts")
+        sys.exit(1)
+    print("respuestas de GET /logs idénticas byte a byte")
+
+
+if __name__ == "__main__":
+    main()
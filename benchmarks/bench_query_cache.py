@@ -0,0 +1,77 @@
+# bench_query_cache.py — GET /logs con y sin el cache de respuestas
+# Simula dashboards: las mismas pocas combinaciones de filtros pedidas una y otra vez,
+# con un POST /logs de vez en cuando (que invalida solo las consultas que puede afectar).
+# Usa el cliente de pruebas de Flask sobre una DB temporal (mide el servidor, no la red).
+# Uso: python -m benchmarks.bench_query_cache --rows 200000 --requests 2000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+TOKEN = "svc-reports-123"
+
+# Combinaciones que piden los dashboards
+DASHBOARD_QUERIES = [
+    "/logs?limit=100",
+    "/logs?service=reports&limit=100",
+    "/logs?service=reports&severity=ERROR&limit=100",
+    "/logs?severity=ERROR&limit=50",
+    "/logs?service=chat&limit=100",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de GET /logs con y sin cache de respuestas")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--write-every", type=int, default=50, help="un POST /logs cada N lecturas")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["LOGS_DB_PATH"] = os.path.join(tmp, "bench.db")
+    # Importamos después de fijar la DB: config lee las variables de entorno al importarse
+    from app import config, create_app
+    from app.db import SessionLocal, init_db
+    from app.storage import insert_rows
+
+    init_db()
+
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    for inserted in range(0, args.rows, 10_000):
+        with SessionLocal() as s:
+            insert_rows(s, [{
+                "timestamp": start + timedelta(milliseconds=inserted + i),
+                "received_at": start + timedelta(milliseconds=inserted + i),
+                "service": random.choice(["reports", "payments", "chat"]),
+                "severity": random.choice(["INFO", "WARN", "ERROR"]),
+                "message": "m",
+                "token_used": TOKEN,
+            } for i in range(min(10_000, args.rows - inserted))])
+            s.commit()
+    print(f"{args.rows} filas en la DB; {args.requests} lecturas, un POST cada {args.write_every}\n")
+
+    results = {}
+    for label, max_bytes in (("sin cache", 0), ("con cache", 32 * 1024 * 1024)):
+        config.QUERY_CACHE_MAX_BYTES = max_bytes
+        client = create_app().test_client()
+        t0 = time.perf_counter()
+        for i in range(args.requests):
+            if i % args.write_every == 0:
+                # los logs de reports invalidan las consultas sin service o con service=reports
+                client.post("/logs", json=[{"timestamp": datetime.now(timezone.utc).isoformat(), "service": "reports",
+                                            "severity": "INFO", "message": "nuevo"}],
+                            headers={"Authorization": f"Token {TOKEN}"})
+            client.get(DASHBOARD_QUERIES[i % len(DASHBOARD_QUERIES)])
+        results[label] = time.perf_counter() - t0
+        print(f"{label:>10} | {args.requests / results[label]:>8.0f} req/s")
+        if max_bytes:
+            print(f"{'':>10} | {client.get('/health').get_json()['query_cache']}")
+
+    print(f"\nspeedup: {results['sin cache'] / results['con cache']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# bench_shards.py — una DB compartida vs. un shard por servicio (LOGS_SHARDING=service)
+# Un hilo writer por servicio inserta lotes de 1000 con commit (como la IngestQueue de cada shard)
+# durante --seconds segundos, en una sola DB y después en un archivo por servicio. Reporta:
+# - filas/s totales y p50/p99 de cada commit (con una DB los writers se turnan el lock de escritura)
+#   En un solo proceso los writers además comparten el GIL (armar las filas es Python): con serve.py
+#   cada shard tiene su proceso writer y la ingesta escala con los núcleos
+# - latencia de GET /logs (página de 100): consulta directa vs. fan-out a los shards en paralelo
+# Uso: python -m benchmarks.bench_shards --seconds 5
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+from app.db import init_db, make_engine
+from app.shards import ShardSet
+from app.storage import insert_rows, iter_log_rows
+from benchmarks.bench_concurrency import percentile
+from client_reports_auto import MESSAGES
+
+SERVICES = ["reports", "payments", "chat"]
+SEVERITIES = ["DEBUG", "INFO", "WARN", "ERROR"]
+BATCH = 1_000
+
+NO_FILTERS = {"timestamp_start": None, "timestamp_end": None, "received_start": None,
+              "received_end": None, "service": None, "severity": None, "q": None}
+
+
+def make_batch(service: str) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "timestamp": now - timedelta(milliseconds=i),
+            "received_at": now,
+            "service": service,
+            "severity": random.choice(SEVERITIES),
+            "message": random.choice(MESSAGES),
+            "token_used": f"svc-{service}",
+        }
+        for i in range(BATCH)
+    ]
+
+
+# Un hilo por servicio escribiendo con la fábrica de sesiones que le toca
+def run_writers(sessions_by_service: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    rows = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def writer(service: str) -> None:
+        sessions = sessions_by_service[service]
+        while time.monotonic() < deadline:
+            batch = make_batch(service)
+            start = time.perf_counter()
+            with sessions() as s:
+                insert_rows(s, batch)
+                s.commit()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                rows[0] += len(batch)
+
+    threads = [threading.Thread(target=writer, args=(service,)) for service in SERVICES]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {"rows_s": rows[0] / seconds, "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000}
+
+
+def measure_query(fetch, repeat: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fetch()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sharding por servicio: ingesta paralela y fan-out de GET /logs")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{len(SERVICES)} writers (uno por servicio), lotes de {BATCH}, {args.seconds:.0f}s por modo\n")
+    print(f"{'modo':>10} | {'filas/s':>10} | {'commit p50':>10} | {'commit p99':>10} | {'GET ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Una sola DB para todos los servicios
+        config.SHARDING = "none"
+        engine = make_engine(os.path.join(tmp, "single.db"), pool_size=len(SERVICES) + 1)
+        init_db(engine)
+        sessions = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+        single = run_writers({service: sessions for service in SERVICES}, args.seconds)
+
+        def single_page():
+            with sessions() as s:
+                return list(iter_log_rows(s, NO_FILTERS, limit=100))
+
+        single["get_ms"] = measure_query(single_page)
+        engine.dispose()
+
+        # Un shard por servicio
+        config.SHARDING = "service"
+        config.SHARD_DIR = os.path.join(tmp, "shards")
+        shards = ShardSet(SERVICES, legacy=None)
+        shards.init()
+        sharded = run_writers({service: shards.for_service(service).sessions for service in SERVICES}, args.seconds)
+        sharded["get_ms"] = measure_query(lambda: shards.fetch_rows(NO_FILTERS, None, 100))
+        shards.dispose()
+
+    for name, result in (("1 DB", single), ("shards", sharded)):
+        print(f"{name:>10} | {result['rows_s']:>10.0f} | {result['p50_ms']:>9.1f}ms | {result['p99_ms']:>9.1f}ms | "
+              f"{result['get_ms']:>8.2f}")
+    print(f"\ningesta con shards: x{sharded['rows_s'] / single['rows_s']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# bench_stats.py — GET /logs/stats desde rollups vs. GROUP BY sobre las filas crudas
+# Llena una DB temporal con N logs repartidos en `--hours` horas y mide:
+# 1) el costo extra de mantener los rollups al insertar (mismo lote, con y sin rollups)
+# 2) la consulta de conteos por minuto/hora/día (rollups vs. agregar la tabla logs)
+# Uso: python -m benchmarks.bench_stats --rows 1000000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+from app.db import init_db, make_engine
+from app.rollups import query_rollups
+from app.storage import LOGS_TABLE, insert_rows
+
+SERVICES = ["reports", "payments", "chat"]
+SEVERITIES = ["DEBUG", "INFO", "WARN", "ERROR"]
+
+# Cuántos caracteres del timestamp guardado forman cada bucket ("YYYY-MM-DD HH:MM")
+BUCKET_PREFIX = {"1m": 16, "1h": 13, "1d": 10}
+
+
+def make_rows(start: datetime, span: timedelta, n: int):
+    return [{
+        "timestamp": start + span * random.random(),
+        "received_at": start,
+        "service": random.choice(SERVICES),
+        "severity": random.choice(SEVERITIES),
+        "message": "m",
+        "token_used": "svc-reports-123",
+    } for _ in range(n)]
+
+
+def fill(SessionLocal, rows: int, start: datetime, span: timedelta, batch: int = 10_000) -> float:
+    elapsed = 0.0
+    for inserted in range(0, rows, batch):
+        chunk = make_rows(start, span, min(batch, rows - inserted))
+        t0 = time.perf_counter()
+        with SessionLocal() as s:
+            insert_rows(s, chunk)
+            s.commit()
+        elapsed += time.perf_counter() - t0
+    return elapsed
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de GET /logs/stats: rollups vs. GROUP BY")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hours", type=int, default=24)
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    span = timedelta(hours=args.hours)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"))
+        init_db(engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+        # 1) costo de escritura: 50k filas sin rollups y otras 50k con rollups
+        sample = min(args.rows, 50_000)
+        config.ROLLUPS_ENABLED = False
+        without = fill(SessionLocal, sample, start, span)
+        config.ROLLUPS_ENABLED = True
+        with_rollups = fill(SessionLocal, sample, start, span)
+        print(f"INSERT de {sample} filas: {without:.2f}s sin rollups | {with_rollups:.2f}s con rollups")
+
+        fill(SessionLocal, args.rows - 2 * sample, start, span)
+        print(f"{args.rows} filas en la DB\n")
+
+        def raw_counts(granularity: str):
+            bucket = func.substr(LOGS_TABLE.c.timestamp, 1, BUCKET_PREFIX[granularity])
+            query = (
+                select(bucket, LOGS_TABLE.c.service, LOGS_TABLE.c.severity, func.count())
+                .group_by(bucket, LOGS_TABLE.c.service, LOGS_TABLE.c.severity)
+            )
+            with engine.connect() as conn:
+                return conn.execute(query).all()
+
+        def rollup_counts(granularity: str):
+            with engine.connect() as conn:
+                return query_rollups(conn, granularity)
+
+        # 2) lectura: conteos por bucket agregando las filas crudas vs. leyendo los rollups
+        print(f"{'bucket':>6} | {'buckets':>8} | {'GROUP BY ms':>11} | {'rollups ms':>10} | {'speedup':>7}")
+        for granularity in ("1m", "1h", "1d"):
+            raw_s = timed(lambda: raw_counts(granularity))
+            rollup_s = timed(lambda: rollup_counts(granularity))
+            buckets = len(rollup_counts(granularity))
+            print(f"{granularity:>6} | {buckets:>8} | {raw_s * 1000:>11.1f} | "
+                  f"{rollup_s * 1000:>10.1f} | {raw_s / rollup_s:>6.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
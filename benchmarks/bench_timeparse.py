@@ -0,0 +1,103 @@
+# bench_timeparse.py — conformidad y micro-benchmark del parseo de timestamps
+# 1) Conformidad: el camino rápido tiene que dar exactamente lo mismo que dateutil
+#    (mismo instante, mismo offset y mismos campos) para cada caso; si no, exit 1.
+# 2) Benchmark: dateutil vs. parse_timestamp_iso8601 vs. parse_timestamps (lote).
+# Uso: python -m benchmarks.bench_timeparse --items 10000
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser as dtparser
+
+from app.timeparse import parse_timestamp_iso8601, parse_timestamps
+
+# Formas que mandan los clientes (isoformat() de Python, "Z", sin zona, etc.) y algunas raras
+CONFORMANCE_CASES = [
+    "2025-08-27T10:00:00Z",
+    "2025-08-27T10:00:00+00:00",
+    "2025-08-27T10:00:00.123456+00:00",
+    "2025-08-27T10:00:00.123+00:00",
+    "2025-08-27T10:00:00.1234567Z",
+    "2025-08-27T10:00:00,5Z",
+    "2025-08-27T10:00:00-03:00",
+    "2025-08-27T10:00:00+0530",
+    "2025-08-27T10:00:00",
+    "2025-08-27T10:00",
+    "2025-08-27 10:00:00",
+    "2025-08-27 10:00:00.5 +01:00",
+    "2025-08-27",
+    "2024-02-29T23:59:59.999999Z",
+    "2025-02-30T10:00:00Z",            # fecha imposible: las dos fallan
+    "2025-08-27T24:00:00Z",            # hora 24: las dos fallan
+    "27 Aug 2025 10:00:00 UTC",        # no ISO: decide dateutil
+    "2025/08/27 10:00",
+    "Wed, 27 Aug 2025 10:00:00 GMT",
+    "20250827T100000Z",
+    "not a date",
+]
+
+
+# Lo que hacía el servidor antes: dateutil para todo
+def reference_parse(s: str) -> datetime:
+    dt = dtparser.parse(s)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def outcome(fn, s: str):
+    try:
+        dt = fn(s)
+    except Exception:
+        return "error"
+    return (dt.replace(tzinfo=None), dt.utcoffset())
+
+
+def check_conformance() -> int:
+    mismatches = 0
+    batch = parse_timestamps(CONFORMANCE_CASES)
+    for value, batch_dt in zip(CONFORMANCE_CASES, batch):
+        expected = outcome(reference_parse, value)
+        got = outcome(parse_timestamp_iso8601, value)
+        got_batch = "error" if batch_dt is None else (batch_dt.replace(tzinfo=None), batch_dt.utcoffset())
+        ok = got == expected and got_batch == expected
+        mismatches += not ok
+        print(f"[{' ok ' if ok else 'DIFF'}] {value!r}: {got}" + ("" if ok else f" (dateutil: {expected})"))
+    return mismatches
+
+
+def bench(label: str, fn, values, baseline=None) -> float:
+    start = time.perf_counter()
+    fn(values)
+    elapsed = time.perf_counter() - start
+    speedup = f" | {baseline / elapsed:>6.1f}x" if baseline else ""
+    print(f"{label:>28} | {len(values) / elapsed:>12.0f} ts/s{speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conformidad y benchmark del parseo de timestamps")
+    parser.add_argument("--items", type=int, default=10_000)
+    args = parser.parse_args()
+
+    mismatches = check_conformance()
+
+    # Timestamps como los de client_reports_auto.py (isoformat() en UTC, microsegundos distintos)
+    now = datetime.now(timezone.utc)
+    values = [(now + timedelta(microseconds=i * 37)).isoformat() for i in range(args.items)]
+    print()
+    base = bench("dateutil", lambda vs: [reference_parse(v) for v in vs], values)
+    bench("parse_timestamp_iso8601", lambda vs: [parse_timestamp_iso8601(v) for v in vs], values, base)
+    bench("parse_timestamps (lote)", parse_timestamps, values, base)
+    # Lote con valores repetidos (mismo instante para todo el lote)
+    bench("parse_timestamps (repetidos)", parse_timestamps, [values[0]] * args.items, base)
+
+    if mismatches:
+        print(f"\n{mismatches} casos difieren de dateutil")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# loadgen.py — generador de carga contra un servidor de logs corriendo (run.py / gunicorn)
+# Lanza N procesos; cada uno simula un servicio (con su token de app/auth.py) que mezcla
+# POST /logs (lotes de `--batch-size` logs de `--message-size` caracteres) y GET /logs
+# según `--read-ratio`. Reporta, para POST y GET: requests/s, logs/s y latencia p50/p90/p99/max,
+# más los códigos de respuesta (ej. 429 si las cuotas por token están activas).
+#
+# - `--rate 0` (default): cada proceso manda el siguiente request apenas vuelve el anterior
+#   (lazo cerrado: mide la capacidad máxima).
+# - `--rate N`: N requests/s por proceso a intervalos fijos (lazo abierto). La latencia se mide
+#   desde el momento en que el request TENÍA que salir, así un servidor trabado no esconde la
+#   espera (si no, los requests atrasados nunca se cuentan: "coordinated omission").
+#
+# Para medir el servidor y no las cuotas, dejar LOGS_RATE_LIMIT apagado (default).
+# Uso: python -m benchmarks.loadgen --processes 8 --duration 10 --batch-size 100 --read-ratio 0.2
+
+import argparse
+import multiprocessing
+import random
+import string
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import requests
+
+from app.auth import TOKENS
+from benchmarks.results import load_results, percentile, print_comparison, save_results
+from client_reports_auto import MESSAGES
+
+SEVERITIES = ["DEBUG", "INFO", "WARN", "ERROR"]
+
+
+# Mensajes de `size` caracteres: uno de los de client_reports_auto.py + relleno aleatorio
+def make_messages(size: int, count: int = 64) -> List[str]:
+    result = []
+    for _ in range(count):
+        base = random.choice(MESSAGES)
+        padding = "".join(random.choices(string.ascii_lowercase + " ", k=max(0, size - len(base) - 1)))
+        result.append((base + " " + padding)[:size] if size > len(base) else base[:size])
+    return result
+
+
+# Un proceso = un servicio simulado. Devuelve latencias (s) y contadores para juntar al final.
+def run_worker(index: int, params: Dict[str, Any], start_at: float) -> Dict[str, Any]:
+    token = list(TOKENS)[index % len(TOKENS)]
+    service = TOKENS[token]
+    messages = make_messages(params["message_size"])
+    rng = random.Random(index)
+    session = requests.Session()   # keep-alive: una conexión por proceso
+    headers = {"Authorization": f"Token {token}"}
+    post_url = params["url"].rstrip("/") + "/logs"
+
+    latencies: Dict[str, List[float]] = {"post": [], "get": []}
+    status: Dict[str, Counter] = {"post": Counter(), "get": Counter()}
+    logs_sent = 0
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    start = time.perf_counter()
+    deadline = start + params["duration"]
+    interval = 1.0 / params["rate"] if params["rate"] > 0 else 0.0
+    sent = 0
+    while True:
+        scheduled = start + sent * interval if interval else time.perf_counter()
+        if scheduled >= deadline:
+            break
+        now = time.perf_counter()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        sent += 1
+
+        op = "get" if rng.random() < params["read_ratio"] else "post"
+        try:
+            if op == "post":
+                ts = datetime.now(timezone.utc).isoformat()
+                batch = [{"timestamp": ts, "service": service, "severity": rng.choice(SEVERITIES),
+                          "message": rng.choice(messages)} for _ in range(params["batch_size"])]
+                resp = session.post(post_url, json=batch, headers=headers, timeout=params["timeout"])
+                if resp.status_code in (201, 202):
+                    logs_sent += resp.json().get("total_logs", 0)
+            else:
+                query = {"service": service, "limit": params["read_limit"]}
+                if rng.random() < 0.5:
+                    query["severity"] = rng.choice(SEVERITIES)
+                resp = session.get(post_url, params=query, timeout=params["timeout"])
+            code = str(resp.status_code)
+        except requests.RequestException:
+            code = "error de conexión"
+        latencies[op].append(time.perf_counter() - scheduled)
+        status[op][code] += 1
+
+    return {"latencies": latencies, "status": status, "logs_sent": logs_sent,
+            "elapsed": time.perf_counter() - start}
+
+
+def summarize(workers: List[Dict[str, Any]], duration: float) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for op in ("post", "get"):
+        values = sorted(v for w in workers for v in w["latencies"][op])
+        if not values:
+            continue
+        results[op] = {
+            "requests": len(values),
+            "req_s": len(values) / duration,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    if "post" in results:
+        results["post"]["logs_s"] = sum(w["logs_sent"] for w in workers) / duration
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga (POST/GET /logs) con varios procesos")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base del servidor")
+    parser.add_argument("--processes", type=int, default=4, help="servicios simulados (un proceso cada uno)")
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de carga")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests/s por proceso (0 = sin pausa)")
+    parser.add_argument("--batch-size", type=int, default=100, help="logs por POST")
+    parser.add_argument("--message-size", type=int, default=80, help="caracteres por mensaje")
+    parser.add_argument("--read-ratio", type=float, default=0.2, help="fracción de requests que son GET /logs")
+    parser.add_argument("--read-limit", type=int, default=100, help="limit de cada GET /logs")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--compare", help="corrida guardada para comparar (ruta o 'last')")
+    parser.add_argument("--no-save", action="store_true", help="no guardar esta corrida en benchmarks/results/")
+    args = parser.parse_args()
+
+    baseline = load_results("loadgen", args.compare) if args.compare else None
+    params = {key: value for key, value in vars(args).items() if key not in ("compare", "no_save")}
+
+    print(f"{args.processes} procesos x {args.duration}s contra {args.url} | rate={args.rate or 'máximo'}"
+          f" | batch={args.batch_size} | mensaje={args.message_size} | lecturas={args.read_ratio:.0%}\n")
+    # Todos arrancan juntos (dentro de 1s), después de que cada proceso haya importado y armado sus datos
+    start_at = time.time() + 1.0
+    with multiprocessing.Pool(args.processes) as pool:
+        workers = pool.starmap(run_worker, [(i, params, start_at) for i in range(args.processes)])
+
+    duration = max(w["elapsed"] for w in workers)
+    results = summarize(workers, duration)
+    print(f"{'op':>5} | {'requests':>8} | {'req/s':>8} | {'logs/s':>9} | {'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    for op, r in results.items():
+        logs_s = f"{r['logs_s']:>9.0f}" if "logs_s" in r else f"{'':>9}"
+        print(f"{op:>5} | {r['requests']:>8} | {r['req_s']:>8.1f} | {logs_s} | {r['p50_ms']:>8.2f} | "
+              f"{r['p90_ms']:>8.2f} | {r['p99_ms']:>8.2f} | {r['max_ms']:>8.2f}")
+    for op in ("post", "get"):
+        codes = sum((w["status"][op] for w in workers), Counter())
+        if codes:
+            print(f"{op:>5} | respuestas: {dict(codes)}")
+
+    if not args.no_save:
+        print(f"\nguardado en {save_results('loadgen', results, params)}")
+    if args.compare:
+        if baseline is None:
+            print("no hay corridas anteriores para comparar")
+        else:
+            print_comparison(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# microbench.py — micro-benchmarks en proceso de las piezas calientes del servidor
+# Mide sin red ni servidor (una DB temporal) cada paso por el que pasa un log:
+# - validate_log_item / parse_timestamp_iso8601: por ítem
+# - decodificación del cuerpo de un POST /logs de 1000 ítems (jsoncodec: orjson o stdlib)
+# - build_log_rows: validación + normalización de un lote de 1000
+# - insert_rows + commit: el camino de ingesta de POST /logs, lotes de 1000
+# - GET /logs: la consulta de una página de 100, y su serialización a JSON (como list_logs)
+# Cada caso se repite `--repeat` veces; se reporta la mediana. Los resultados se guardan en
+# benchmarks/results/ (ver results.py) y se pueden comparar con una corrida anterior.
+# Uso: python -m benchmarks.microbench --compare last
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from flask import Flask, jsonify
+from sqlalchemy.orm import sessionmaker
+
+from app.db import init_db, make_engine
+from app.jsoncodec import BACKEND, install_json_provider, loads
+from app.routes import build_log_rows, serialize_rows, validate_log_item
+from app.storage import insert_rows, iter_log_rows
+from app.timeparse import parse_timestamp_iso8601
+from benchmarks.results import load_results, print_comparison, save_results
+from client_reports_auto import MESSAGES
+
+TOKEN = "svc-reports-123"
+SEVERITIES = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+BATCH = 1_000
+
+# Filtros de GET /logs sin nada puesto (como parse_log_filters sin parámetros)
+NO_FILTERS = {"timestamp_start": None, "timestamp_end": None, "received_start": None,
+              "received_end": None, "service": None, "severity": None, "q": None}
+
+
+# Lote de ítems como los que manda client_reports_auto.py
+def make_items(n: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "timestamp": (now + timedelta(microseconds=i * 37)).isoformat(),
+            "service": "reports",
+            "severity": random.choice(SEVERITIES),
+            "message": random.choice(MESSAGES),
+        }
+        for i in range(n)
+    ]
+
+
+# Corre `fn` `repeat` veces; cada corrida hace `ops` operaciones. Devuelve métricas por operación.
+def measure(fn: Callable[[], None], ops: int, repeat: int) -> Dict[str, float]:
+    fn()   # calentamiento (caches, imports perezosos, páginas de la DB)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        "ops_s": ops / median,
+        "per_op_us": median / ops * 1e6,
+        "best_per_op_us": min(times) / ops * 1e6,
+    }
+
+
+def run_cases(repeat: int, rows: int) -> Dict[str, Dict[str, float]]:
+    items = make_items(BATCH)
+    timestamps = [item["timestamp"] for item in items]
+    results: Dict[str, Dict[str, float]] = {}
+
+    results["validate_log_item"] = measure(lambda: [validate_log_item(item) for item in items], BATCH, repeat)
+    results["parse_timestamp_iso8601"] = measure(lambda: [parse_timestamp_iso8601(ts) for ts in timestamps],
+                                                 BATCH, repeat)
+    body = json.dumps(items).encode()
+    results[f"decodificar lote 1000 ({BACKEND})"] = measure(lambda: loads(body), BATCH, repeat)
+    results["build_log_rows (lote 1000)"] = measure(lambda: build_log_rows(items, TOKEN), BATCH, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "micro.db"))
+        init_db(engine)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+        # insert_rows + commit: filas ya validadas, como las deja build_log_rows
+        batch_rows, _ = build_log_rows(items, TOKEN)
+
+        def insert_batch():
+            with SessionLocal() as s:
+                insert_rows(s, [dict(row) for row in batch_rows])
+                s.commit()
+
+        results["insert_rows + commit (lote 1000)"] = measure(insert_batch, BATCH, repeat)
+
+        # Más filas para que GET /logs lea de una tabla con datos
+        for _ in range(max(0, rows - BATCH * (repeat + 1)) // BATCH):
+            insert_batch()
+
+        def query_page():
+            with SessionLocal() as s:
+                return list(iter_log_rows(s, NO_FILTERS, limit=100))
+
+        results["GET /logs consulta (100 filas)"] = measure(query_page, 100, repeat)
+
+        # Serialización como list_logs: filas → dicts → JSON con el provider de la app
+        app = Flask(__name__)
+        install_json_provider(app)
+        page = query_page()
+
+        def serialize_page():
+            with SessionLocal() as s, app.test_request_context():
+                jsonify(serialize_rows(s, NO_FILTERS, page)).get_data()
+
+        results["GET /logs serialización (100)"] = measure(serialize_page, 100, repeat)
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks en proceso de validación, parseo, INSERT y serialización")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=100_000, help="filas en la DB para las consultas")
+    parser.add_argument("--compare", help="corrida guardada para comparar (ruta o 'last')")
+    parser.add_argument("--no-save", action="store_true", help="no guardar esta corrida en benchmarks/results/")
+    args = parser.parse_args()
+
+    # La corrida anterior se carga antes de guardar esta (si no, "last" sería esta misma)
+    baseline = load_results("microbench", args.compare) if args.compare else None
+
+    results = run_cases(args.repeat, args.rows)
+    print(f"{'caso':>32} | {'ops/s':>12} | {'µs/op':>10} | {'mejor µs/op':>11}")
+    for case, metrics in results.items():
+        print(f"{case:>32} | {metrics['ops_s']:>12.0f} | {metrics['per_op_us']:>10.2f} | {metrics['best_per_op_us']:>11.2f}")
+
+    if not args.no_save:
+        print(f"\nguardado en {save_results('microbench', results, vars(args))}")
+    if args.compare:
+        if baseline is None:
+            print("no hay corridas anteriores para comparar")
+        else:
+            print_comparison(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
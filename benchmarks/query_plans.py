@@ -0,0 +1,74 @@
+# query_plans.py — verifica que cada combinación de filtros de GET /logs use un índice
+# Corre EXPLAIN QUERY PLAN sobre una DB temporal y falla (exit 1) si alguna
+# consulta hace SCAN de la tabla logs en vez de SEARCH/SCAN sobre un índice.
+# Se chequean los dos layouts: la tabla logs y la vista del layout compacto.
+# Uso: python -m benchmarks.query_plans
+
+import itertools
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.compact import COMPACT_VIEW, ensure_compact_schema
+from app.db import init_db, make_engine
+from app.storage import LOGS_TABLE, build_logs_query
+
+NOW = datetime.now(timezone.utc)
+
+# Valores de ejemplo para cada filtro que acepta GET /logs
+FILTER_VALUES = {
+    "service": "reports",
+    "severity": "ERROR",
+    "timestamp_start": NOW - timedelta(hours=1),
+    "timestamp_end": NOW,
+    "received_start": NOW - timedelta(hours=1),
+    "received_end": NOW,
+    "after": (NOW, 1000),
+}
+
+# Grupos de filtros (inicio/fin de un rango van juntos o solos, da igual para el plan)
+FILTER_GROUPS = [
+    ("service",),
+    ("severity",),
+    ("timestamp_start", "timestamp_end"),
+    ("received_start", "received_end"),
+    ("after",),
+]
+
+
+def plan_for(conn, query) -> list:
+    sql = str(query.limit(100).compile(conn, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "plans.db"))
+        init_db(engine)
+        with engine.begin() as conn:
+            ensure_compact_schema(conn)
+        with engine.connect() as conn:
+            for table in (LOGS_TABLE, COMPACT_VIEW):
+                print(f"--- {table.name}")
+                for n in range(len(FILTER_GROUPS) + 1):
+                    for groups in itertools.combinations(FILTER_GROUPS, n):
+                        filters = {name: FILTER_VALUES[name] for group in groups for name in group}
+                        plan = plan_for(conn, build_logs_query(table, **filters))
+                        # "SCAN <tabla>" sin "USING ... INDEX" = recorrido completo de la tabla
+                        full_scan = any(step.strip().startswith("SCAN ") and "USING" not in step for step in plan)
+                        failures += full_scan
+                        label = " + ".join(g[0].replace("_start", "").replace("after", "cursor") for g in groups) or "(sin filtros)"
+                        print(f"[{'SCAN' if full_scan else ' ok '}] {label}: {' | '.join(plan)}")
+        engine.dispose()
+
+    if failures:
+        print(f"\n{failures} combinaciones sin índice")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# results.py — guardar y comparar resultados de benchmarks entre corridas
+# Cada corrida se guarda como JSON en benchmarks/results/<benchmark>-<fecha>-<commit>.json,
+# con los parámetros y el commit de git, para poder compararla después con otra:
+#   python -m benchmarks.microbench --compare last
+#   python -m benchmarks.loadgen --compare benchmarks/results/loadgen-20250901-101500-abc1234.json
+
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# Percentil simple sobre una lista ordenada
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(RESULTS_DIR), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# Guarda una corrida. results = {caso: {métrica: valor}}; params = argumentos de la corrida.
+def save_results(benchmark: str, results: Dict[str, Dict[str, float]], params: Dict[str, Any]) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = git_commit()
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{benchmark}-{stamp}" + (f"-{commit}" if commit else "") + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": benchmark,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": commit,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": params,
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+    return path
+
+
+# Carga una corrida guardada; "last" = la más reciente de ese benchmark
+def load_results(benchmark: str, ref: str) -> Optional[Dict[str, Any]]:
+    if ref == "last":
+        saved = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{benchmark}-*.json")))
+        if not saved:
+            return None
+        ref = saved[-1]
+    with open(ref, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Tabla de diferencias contra una corrida anterior. Las métricas en *_ms / *_us son "menos es mejor".
+def print_comparison(current: Dict[str, Dict[str, float]], baseline: Dict[str, Any]) -> None:
+    print(f"\ncomparado con {baseline.get('commit') or '?'} ({baseline.get('time')}):")
+    print(f"{'caso':>32} | {'métrica':>12} | {'antes':>12} | {'ahora':>12} | {'cambio':>8}")
+    for case, metrics in current.items():
+        before_metrics = baseline["results"].get(case, {})
+        for metric, now in metrics.items():
+            before = before_metrics.get(metric)
+            if not isinstance(before, (int, float)) or not before:
+                continue
+            change = (now - before) / before
+            better = change < 0 if metric.endswith(("_ms", "_us")) else change > 0
+            mark = "" if abs(change) < 0.05 else (" +" if better else " -")
+            print(f"{case:>32} | {metric:>12} | {before:>12.2f} | {now:>12.2f} | {change:>+7.0%}{mark}")
@@ -1,13 +1,16 @@
 # client_reports_auto.py — cliente simulador "reports" (automático)
-# Envía logs al servidor central en forma periódica o en lotes.
+# Genera logs en forma periódica o en lotes y los manda con LogShipper (log_shipper.py):
+# el loop solo los encola; un hilo los junta en lotes y los manda comprimidos, por una
+# conexión keep-alive, con reintentos y spool local si el servidor no responde.
 # Requiere: pip install requests
 
-import requests
 import random
 import time
 import argparse  # CLI (Command Line Interface)
 from datetime import datetime, timezone
-from typing import List, Dict
+from typing import Dict
+
+from log_shipper import LogShipper
 
 # URL del servidor central (tiene que estar corriendo run.py)
 SERVER_URL = "http://127.0.0.1:8000/logs"
@@ -48,43 +51,18 @@ def build_log(message: str, severity: str) -> Dict[str, str]:
     }
 
 
-# Envío de 1 log por request (POST con un objeto)
-def send_single_log(server_url: str, token: str) -> None:
-    # Armamos un payload aleatorio (mensaje + severidad)
-    payload = build_log(
+# Genera 1 log aleatorio (mensaje + severidad) y lo encola en el shipper
+def send_single_log(shipper: LogShipper) -> None:
+    shipper.emit(build_log(
         message=random.choice(MESSAGES),
         severity=random.choice(SEVERITIES),
-    )
+    ))
 
-    # Headers HTTP: formato JSON y token de autorización
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Token {token}",
-    }
 
-    # Enviamos al servidor
-    resp = requests.post(server_url, json=payload, headers=headers, timeout=5)
-    print("[single] HTTP:", resp.status_code, "| resp:", resp.json())
-
-
-# Envío por lotes (POST con una lista de objetos)
-def send_batch_logs(batch_size: int, server_url: str, token: str) -> None:
-    # Construimos N logs en memoria (lista de dicts)
-    batch: List[Dict[str, str]] = [
-        build_log(
-            message=random.choice(MESSAGES),
-            severity=random.choice(SEVERITIES),
-        )
-        for _ in range(batch_size)
-    ]
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Token {token}",
-    }
-
-    resp = requests.post(server_url, json=batch, headers=headers, timeout=10)
-    print(f"[batch x{batch_size}] HTTP:", resp.status_code, "| resp:", resp.json())
+# Genera N logs aleatorios de una vez (el shipper los manda juntos con lo que haya en el buffer)
+def send_batch_logs(batch_size: int, shipper: LogShipper) -> None:
+    for _ in range(batch_size):
+        send_single_log(shipper)
 
 
 def main():
@@ -127,6 +105,18 @@ def main():
     parser.add_argument(
         "--token", type=str, default=TOKEN, help="Token del servicio (Authorization)"
     )
+    # Cómo manda el shipper: tamaño máximo de cada POST y cada cuánto manda lo que haya
+    parser.add_argument(
+        "--flush-size", type=int, default=500, help="Logs por POST como máximo (default 500)"
+    )
+    parser.add_argument(
+        "--flush-interval", type=float, default=1.0,
+        help="Segundos máximos que un log espera en el buffer (default 1.0)",
+    )
+    # Archivo donde quedan los logs si el servidor no responde (se reenvían cuando vuelve)
+    parser.add_argument(
+        "--spool", type=str, default="reports.spool", help="Archivo spool local ('' = sin spool)"
+    )
 
     # Leemos/validamos lo que vino por CLI
     args = parser.parse_args()
@@ -134,6 +124,14 @@ def main():
     # NO reasignamos globales; usamos variables locales claras
     server_url = args.url
     token = args.token
+    shipper = LogShipper(
+        server_url,
+        token=token,
+        service=SERVICE_NAME,
+        batch_size=args.flush_size,
+        flush_interval=args.flush_interval,
+        spool_path=args.spool or None,
+    )
 
     print(
         f"===> Iniciando cliente '{SERVICE_NAME}'"
@@ -149,13 +147,14 @@ def main():
         sent = 0
         while True:
             if args.mode == "single":
-                send_single_log(server_url, token)
+                send_single_log(shipper)
             else:
                 # mode=batch
                 batch_size = max(1, args.batch_size)
-                send_batch_logs(batch_size, server_url, token)
+                send_batch_logs(batch_size, shipper)
 
             sent += 1
+            print(f"[{args.mode}] encolados: {sent} | shipper: {shipper.stats()}")
             # Si se definió un límite de envíos (--count > 0), cortamos al llegar
             if args.count > 0 and sent >= args.count:
                 print("\nListo. Se alcanzó el límite de envíos (--count).")
@@ -167,6 +166,11 @@ def main():
     except KeyboardInterrupt:
         print("\nDetenido por el usuario (CTRL+C). ¡Hasta la próxima!")
 
+    finally:
+        # Mandamos lo que quedó en el buffer antes de salir
+        shipper.close()
+        print("Final:", shipper.stats())
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+# log_shipper.py — cliente reutilizable para mandar logs al servidor central (POST /logs)
+# Requiere: pip install requests
+#
+# En vez de un requests.post por log (conexión TCP nueva y el que loguea esperando la red),
+# LogShipper junta los logs en un buffer en memoria y un hilo en segundo plano los manda:
+# - en lotes: al juntar `batch_size` logs o al pasar `flush_interval` segundos
+# - por una sesión HTTP con keep-alive (las conexiones se reusan entre lotes)
+# - como NDJSON comprimido con gzip (el servidor lo decodifica mientras llega)
+# - con reintentos ante 429/5xx/errores de red, esperando Retry-After o un backoff con jitter
+# - si el servidor no responde después de los reintentos, el lote va a un archivo "spool"
+#   local (NDJSON) que se reenvía solo cuando el servidor vuelve
+#
+# Uso:
+#     from log_shipper import LogShipper
+#     shipper = LogShipper("http://127.0.0.1:8000/logs", token="svc-reports-123",
+#                          service="reports", spool_path="reports.spool")
+#     shipper.log("INFO", "Generando reporte mensual")
+#     ...
+#     shipper.close()   # manda lo pendiente antes de salir
+
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("log_shipper")
+
+# Respuestas que vale la pena reintentar (el resto: el lote tiene un problema y no va a mejorar)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class LogShipper:
+    """
+    Buffer + hilo que manda lotes de logs a POST /logs.
+    - log()/emit(): encolan y vuelven enseguida (la red la usa solo el hilo del shipper).
+    - max_buffer: tope de logs en memoria; si se llena, lo más viejo va al spool (o se descarta).
+    - max_retries / backoff_base / backoff_max: reintentos con backoff exponencial y jitter.
+    - spool_path: archivo para los lotes que no se pudieron mandar (None = se descartan).
+    - flush(): espera a que se mande lo que había; close(): flush + detiene el hilo.
+    """
+
+    def __init__(self, url: str, token: str, service: Optional[str] = None,
+                 batch_size: int = 500, flush_interval: float = 1.0, max_buffer: int = 100_000,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 timeout: float = 10.0, spool_path: Optional[str] = None, compress: bool = True):
+        self.url = url
+        self.service = service
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.01, flush_interval)
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.spool_path = spool_path
+        self.compress = compress
+
+        # Una sola sesión: reusa las conexiones (keep-alive) entre lotes
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._headers = {"Authorization": f"Token {token}", "Content-Type": "application/x-ndjson"}
+        if compress:
+            self._headers["Content-Encoding"] = "gzip"
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._spool_lock = threading.Lock()
+
+        # Contadores para monitoreo
+        self.sent = 0         # logs aceptados por el servidor
+        self.rejected = 0     # logs que el servidor marcó como inválidos (no se reintentan)
+        self.retries = 0      # reintentos de lotes
+        self.spooled = 0      # logs escritos al spool
+        self.dropped = 0      # logs descartados (buffer lleno sin spool, o error no reintentable)
+
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+
+    # Arma un log con timestamp UTC de ahora (o el que se pase) y lo encola
+    def log(self, severity: str, message: str, timestamp: Optional[datetime] = None,
+            service: Optional[str] = None) -> None:
+        self.emit({
+            "timestamp": (timestamp or datetime.now(timezone.utc)).isoformat(),
+            "service": service or self.service,
+            "severity": severity,
+            "message": message,
+        })
+
+    # Encola un log ya armado (dict con timestamp, service, severity, message)
+    def emit(self, item: Dict[str, Any]) -> None:
+        overflow = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LogShipper cerrado")
+            self._buffer.append(item)
+            if len(self._buffer) > self.max_buffer:
+                overflow = [self._buffer.popleft() for _ in range(self.batch_size)]
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        if overflow:
+            # El servidor no da abasto: lo más viejo sale de memoria (al spool si hay)
+            self._spool(overflow)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._buffer or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._session.close()
+
+    def __enter__(self) -> "LogShipper":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            buffered = len(self._buffer)
+        return {"buffered": buffered, "sent": self.sent, "rejected": self.rejected,
+                "retries": self.retries, "spooled": self.spooled, "dropped": self.dropped}
+
+    # Hilo: espera un lote lleno (o que venza el intervalo) y lo manda
+    def _run(self) -> None:
+        self._replay_spool()
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._buffer) < self.batch_size and not (self._closed or self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._buffer:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._in_flight = len(batch)
+            try:
+                undelivered = self._deliver(batch)
+                if undelivered:
+                    self._spool(undelivered)
+                else:
+                    # El servidor responde: si quedó algo en el spool, es el momento de reenviarlo
+                    self._replay_spool()
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    # Manda un lote con reintentos. Devuelve lo que no se pudo mandar (hay que guardarlo en el spool).
+    def _deliver(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        attempt = 0
+        while batch:
+            wait = None
+            try:
+                resp = self._session.post(self.url, data=self._encode(batch), headers=self._headers,
+                                          timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.warning("log_shipper: no se pudo conectar con %s: %s", self.url, e)
+            else:
+                if resp.status_code < 300 or resp.status_code == 400:
+                    # 201/202, o 400 = todo el lote inválido: los errores no se arreglan reintentando
+                    body = self._json(resp)
+                    self.sent += body.get("total_logs", 0)
+                    self.rejected += len(body.get("errors", []))
+                    return []
+                if resp.status_code not in RETRY_STATUS:
+                    logger.error("log_shipper: POST /logs respondió %s, se descartan %d logs",
+                                 resp.status_code, len(batch))
+                    self.dropped += len(batch)
+                    return []
+                # 429/503 pueden haber aceptado el principio del lote: total_logs + errors = ítems procesados
+                body = self._json(resp)
+                processed = body.get("total_logs", 0) + len(body.get("errors", []))
+                self.sent += body.get("total_logs", 0)
+                self.rejected += len(body.get("errors", []))
+                batch = batch[processed:]
+                wait = _retry_after(resp.headers.get("Retry-After"))
+
+            if not batch or attempt >= self.max_retries:
+                return batch
+            attempt += 1
+            self.retries += 1
+            # Backoff exponencial con "full jitter": los clientes no reintentan todos a la vez
+            if wait is None:
+                wait = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            time.sleep(wait)
+        return batch
+
+    def _encode(self, batch: List[Dict[str, Any]]) -> bytes:
+        body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch).encode()
+        return gzip.compress(body, compresslevel=5) if self.compress else body
+
+    @staticmethod
+    def _json(resp: requests.Response) -> Dict[str, Any]:
+        try:
+            body = resp.json()
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    # Agrega logs al final del spool (NDJSON). Sin spool, se descartan.
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        if not self.spool_path:
+            logger.error("log_shipper: sin spool, se descartan %d logs", len(batch))
+            self.dropped += len(batch)
+            return
+        with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in batch)
+        self.spooled += len(batch)
+
+    # Reenvía lo que haya en el spool. Se renombra primero: lo que falle vuelve a un spool nuevo.
+    def _replay_spool(self) -> None:
+        if not self.spool_path:
+            return
+        sending = self.spool_path + ".sending"
+        with self._spool_lock:
+            if not os.path.exists(sending):
+                if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+                    return
+                os.replace(self.spool_path, sending)
+        items = []
+        with open(sending, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    # línea cortada (ej. el proceso murió escribiendo): se saltea
+                    continue
+        logger.info("log_shipper: reenviando %d logs del spool", len(items))
+        for start in range(0, len(items), self.batch_size):
+            undelivered = self._deliver(items[start:start + self.batch_size])
+            if undelivered:
+                # El servidor se volvió a caer: lo que falta queda en el spool para la próxima
+                self._spool(undelivered + items[start + self.batch_size:])
+                break
+        os.remove(sending)
+
+
+# Retry-After en segundos (el servidor siempre manda un entero); None si no vino o no se entiende
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
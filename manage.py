@@ -0,0 +1,151 @@
+# manage.py — comandos de mantenimiento del servidor de logs
+# Se corre desde la raíz del proyecto, con las mismas variables de entorno que el servidor:
+#   python manage.py partitions            → lista las particiones por tiempo
+#   python manage.py retention --days 30   → borra las particiones (y logs sin particionar) de hace más de 30 días
+#   python manage.py rebuild-rollups       → recalcula los conteos de GET /logs/stats desde los logs
+#   python manage.py archive --days 90     → pasa al archivo frío los logs recibidos hace más de 90 días
+#   python manage.py segments              → lista los segmentos del archivo frío
+#   python manage.py shards                → lista los shards (LOGS_SHARDING) con su rango de ids
+# Con sharding, cada comando recorre todos los shards (y la DB anterior al sharding, si existe).
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from app import config
+from app.db import init_db
+from app.archive import archive_before, archived_minute_counts, drop_segments_before, list_segments
+from app.partitions import delete_legacy_logs_before, drop_partitions_before, list_partitions
+from app.rollups import expand_minute_counts, rebuild_rollups, upsert_counts
+from app.shards import SHARD_ID_BITS, get_shards, log_databases
+from app.storage import archive_sources, source_tables
+
+
+# DBs sobre las que corre cada comando; con sharding, se anuncia cada una
+def databases():
+    for database in log_databases():
+        if config.SHARDING != "none":
+            print(f"[{database.name}] {database.path}")
+        yield database
+
+
+def cmd_partitions(args) -> None:
+    for database in databases():
+        with database.engine.connect() as conn:
+            partitions = list_partitions(conn)
+        if not partitions:
+            print("No hay particiones (LOGS_PARTITIONING =", config.PARTITIONING + ")")
+        for name, start_at, end_at in partitions:
+            print(f"{name}  [{start_at.isoformat()} → {end_at.isoformat()})")
+
+
+def cmd_retention(args) -> None:
+    # Borramos particiones enteras (DROP TABLE): no hay DELETE de millones de filas ni archivo inflado.
+    # Los rollups de GET /logs/stats se descuentan en la misma transacción.
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.days)
+    for database in databases():
+        with database.engine.begin() as conn:
+            dropped = drop_partitions_before(conn, cutoff)
+            # Con particiones, la tabla logs solo tiene lo anterior a activarlas: se borra por received_at
+            legacy = delete_legacy_logs_before(conn, cutoff) if config.PARTITIONING != "none" else 0
+        print(f"Particiones borradas (anteriores a {cutoff.isoformat()}): {len(dropped)}")
+        for name in dropped:
+            print(" -", name)
+        if legacy:
+            print(f"Logs sin particionar borrados (tabla logs, recibidos antes de {cutoff.isoformat()}): {legacy}")
+        # Lo mismo con los segmentos del archivo frío
+        dropped = drop_segments_before(database.engine, database.archive_dir, cutoff)
+        print(f"Segmentos borrados (anteriores a {cutoff.isoformat()}): {len(dropped)}")
+        for name in dropped:
+            print(" -", name)
+
+
+def cmd_rebuild_rollups(args) -> None:
+    for database in databases():
+        # Todo en una transacción: las consultas de stats ven los rollups viejos hasta el commit
+        with database.engine.begin() as conn:
+            total = rebuild_rollups(conn, source_tables(conn))
+            # Los logs archivados también cuentan
+            archived = archived_minute_counts(conn, database.archive_dir)
+            upsert_counts(conn, expand_minute_counts(archived))
+            total += sum(archived.values())
+        print(f"Rollups recalculados a partir de {total} logs")
+
+
+def cmd_archive(args) -> None:
+    days = args.days if args.days is not None else config.ARCHIVE_AFTER_DAYS
+    if days <= 0:
+        raise SystemExit("Indicar --days (o LOGS_ARCHIVE_AFTER_DAYS)")
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    for database in databases():
+        created = archive_before(database.engine, archive_sources, cutoff, database.archive_dir,
+                                 config.ARCHIVE_WINDOW, config.ARCHIVE_SEGMENT_MAX_ROWS)
+        print(f"Segmentos creados (logs recibidos antes de {cutoff.isoformat()}): {len(created)}")
+        for name in created:
+            print(" -", name)
+        if created:
+            print("El archivo de la DB no se achica solo: el espacio liberado se reusa (o correr VACUUM)")
+
+
+def cmd_segments(args) -> None:
+    for database in databases():
+        with database.engine.connect() as conn:
+            segments = list_segments(conn)
+        if not segments:
+            print("No hay segmentos en el archivo frío")
+        for s in segments:
+            print(f"{s.file}  {s.rows} logs  {s.bytes / 1024:.0f} KiB  "
+                  f"[{s.received_min.isoformat()} → {s.received_max.isoformat()}]  services: {', '.join(json.loads(s.services))}")
+
+
+def cmd_shards(args) -> None:
+    if config.SHARDING == "none":
+        print("Sin sharding (LOGS_SHARDING = none): todo en", config.DB_PATH)
+        return
+    for shard in get_shards().all():
+        size = os.path.getsize(shard.path) if os.path.exists(shard.path) else 0
+        role = "solo lectura (anterior al sharding)" if shard is get_shards().legacy else "escritura"
+        print(f"{shard.name}  #{shard.number}  ids desde {shard.number << SHARD_ID_BITS}  "
+              f"{size / 1024 / 1024:.1f} MiB  {role}  {shard.path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento del servidor de logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("partitions", help="Lista las particiones por tiempo")
+
+    retention = subparsers.add_parser("retention", help="Borra particiones (y logs sin particionar) más viejos que --days")
+    retention.add_argument("--days", type=int, required=True, help="Días de logs a conservar")
+
+    subparsers.add_parser("rebuild-rollups", help="Recalcula los rollups de GET /logs/stats desde los logs")
+
+    archive = subparsers.add_parser("archive", help="Pasa al archivo frío los logs más viejos que --days")
+    archive.add_argument("--days", type=int, help="Días de logs que quedan en la DB (default: LOGS_ARCHIVE_AFTER_DAYS)")
+
+    subparsers.add_parser("segments", help="Lista los segmentos del archivo frío")
+
+    subparsers.add_parser("shards", help="Lista los shards (LOGS_SHARDING) con su rango de ids")
+
+    args = parser.parse_args()
+
+    # Nos aseguramos de que el esquema exista (igual que al arrancar el servidor)
+    if config.SHARDING != "none":
+        get_shards().init()
+    else:
+        init_db()
+
+    commands = {
+        "partitions": cmd_partitions,
+        "retention": cmd_retention,
+        "rebuild-rollups": cmd_rebuild_rollups,
+        "archive": cmd_archive,
+        "segments": cmd_segments,
+        "shards": cmd_shards,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
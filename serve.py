@@ -0,0 +1,255 @@
+# serve.py — servidor de producción: N workers HTTP pre-forkeados + 1 proceso writer
+# run.py levanta el servidor de desarrollo de Flask en un solo proceso (un solo núcleo).
+# Acá el proceso principal (master) abre el puerto y forkea:
+# - un proceso writer: el único que escribe en SQLite (IngestQueue con group commit, checkpoints
+#   del WAL y archivo frío), atendiendo a los workers por un socket Unix (ver app/writer_socket.py)
+# - N workers HTTP que comparten el puerto: parsean, validan y leen de la DB; las filas
+#   validadas de POST /logs se las mandan al writer
+# Si un proceso muere, el master lo vuelve a levantar. Mientras el writer no está,
+# POST /logs responde 503 (writer_unavailable) y las lecturas siguen funcionando.
+# Con LOGS_SHARDING (ver app/shards.py) hay un proceso writer por shard, cada uno con su socket:
+# la ingesta de servicios distintos se escribe en paralelo.
+# Con SIGTERM/CTRL+C: primero se cierran los workers, después el writer vacía su cola.
+#
+# Uso: python serve.py --workers 4 --port 8000 --ack commit
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict
+
+from app import config
+
+logger = logging.getLogger("serve")
+
+# Si un proceso muere antes de estos segundos, esperamos antes de relanzarlo (evita un loop de caídas)
+MIN_UPTIME_S = 1.0
+
+
+# DBs con su propio writer: la de LOGS_DB_PATH, o un shard por servicio
+def writer_databases():
+    from app.shards import MAIN_DB, get_shards
+
+    return get_shards().shards if config.SHARDING != "none" else [MAIN_DB]
+
+
+def run_writer(listener: socket.socket, name: str) -> None:
+    # El writer no atiende HTTP: cierra su copia del puerto
+    listener.close()
+
+    from app.archive import Archiver
+    from app.db import STORAGE_PROFILES, WalCheckpointer
+    from app.storage import archive_sources
+    from app.writer import IngestQueue
+    from app.writer_socket import WriterServer
+
+    database = next(database for database in writer_databases() if database.name == name)
+    queue = IngestQueue(
+        database.sessions,
+        max_rows=config.INGEST_QUEUE_MAX_ROWS,
+        commit_rows=config.INGEST_COMMIT_ROWS,
+        commit_interval_ms=config.INGEST_COMMIT_INTERVAL_MS,
+        ack=config.INGEST_ACK,
+        ack_timeout_s=config.INGEST_ACK_TIMEOUT_S,
+    )
+    queue.start()
+    server = WriterServer(database.writer_socket, queue)
+    server.start()
+
+    checkpointer = None
+    if STORAGE_PROFILES[config.DB_PROFILE].get("journal_mode") == "WAL" and config.DB_CHECKPOINT_INTERVAL_S > 0:
+        checkpointer = WalCheckpointer(database.engine, config.DB_CHECKPOINT_INTERVAL_S)
+        checkpointer.start()
+
+    archiver = None
+    if config.ARCHIVE_AFTER_DAYS > 0:
+        archiver = Archiver(database.engine, archive_sources, config.ARCHIVE_AFTER_DAYS, config.ARCHIVE_INTERVAL_S,
+                            database.archive_dir, config.ARCHIVE_WINDOW, config.ARCHIVE_SEGMENT_MAX_ROWS)
+        archiver.start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # CTRL+C lo maneja el master
+    logger.info("writer %d (%s) escuchando en %s", os.getpid(), database.name, database.writer_socket)
+    stop.wait()
+
+    # Último group commit con lo que quede en la cola
+    server.stop()
+    if checkpointer is not None:
+        checkpointer.stop()
+    if archiver is not None:
+        archiver.stop()
+
+
+def run_worker(listener: socket.socket, host: str, port: int) -> None:
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from app.shards import ShardedIngest, get_shards
+    from app.writer_socket import CommitSubscriber, WriterClient
+
+    # Un cliente por writer; con shards, cada lote va al writer del shard de su servicio
+    clients = {
+        database.name: WriterClient(database.writer_socket, config.INGEST_ACK, config.INGEST_ACK_TIMEOUT_S)
+        for database in writer_databases()
+    }
+    if config.SHARDING != "none":
+        ingest_queue = ShardedIngest(get_shards(), clients, config.INGEST_ACK)
+    else:
+        ingest_queue = next(iter(clients.values()))
+    app = create_app(ingest_queue=ingest_queue)
+    for database in writer_databases():
+        CommitSubscriber(database.writer_socket, app.extensions["commit_listeners"]).start()
+
+    # Todos los workers aceptan conexiones del mismo socket (el kernel reparte)
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info("worker %d atendiendo en http://%s:%d", os.getpid(), host, port)
+    server.serve_forever()
+
+
+# Forkea un proceso hijo que corre `target` y termina (sin volver al loop del master)
+def spawn(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            target(*args)
+        except Exception:
+            logger.exception("el proceso %d terminó con error", os.getpid())
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+    return pid
+
+
+def wait_for_writer(socket_path: str, timeout: float) -> bool:
+    from app.writer_socket import connect
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connect(socket_path, timeout=1.0).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de logs: workers HTTP pre-forkeados + proceso writer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.SERVE_WORKERS, help="procesos HTTP (default: núcleos)")
+    parser.add_argument("--ack", choices=["enqueue", "commit"], default=config.INGEST_ACK,
+                        help="responder POST /logs al encolar (202) o después del commit (201)")
+    args = parser.parse_args()
+    config.INGEST_ACK = args.ack
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(name)s: %(message)s")
+    # Sin una línea de log por request (el servidor de desarrollo las imprime todas)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    # El esquema se crea una vez acá; después se cierran las conexiones para no heredarlas al forkear
+    from app.db import ENGINE, init_db
+    from app.shards import get_shards
+    if config.SHARDING != "none":
+        shards = get_shards()
+        shards.init()
+        shards.dispose()
+    else:
+        init_db()
+        ENGINE.dispose()
+
+    listener = socket.create_server((args.host, args.port), backlog=1024)
+    listener.set_inheritable(True)
+
+    shutting_down = False
+
+    def request_stop(*_):
+        nonlocal shutting_down
+        shutting_down = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    # Un writer por DB (pid → nombre de la DB)
+    writers: Dict[int, str] = {}
+    started: Dict[int, float] = {}
+    for database in writer_databases():
+        pid = spawn(run_writer, listener, database.name)
+        writers[pid] = database.name
+        started[pid] = time.monotonic()
+    for database in writer_databases():
+        if not wait_for_writer(database.writer_socket, 10.0):
+            logger.error("el writer no abrió %s", database.writer_socket)
+    workers: Dict[int, float] = {}
+    for _ in range(max(1, args.workers)):
+        pid = spawn(run_worker, listener, args.host, args.port)
+        workers[pid] = started[pid] = time.monotonic()
+    logger.info("master %d: %d workers en http://%s:%d, ack=%s", os.getpid(), len(workers), args.host, args.port, args.ack)
+
+    # Vigilamos a los hijos: el que muere se vuelve a levantar
+    while not shutting_down:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        uptime = time.monotonic() - started.pop(pid, 0.0)
+        if shutting_down:
+            break
+        if uptime < MIN_UPTIME_S:
+            time.sleep(MIN_UPTIME_S)
+        if pid in writers:
+            name = writers.pop(pid)
+            logger.error("el writer de %s terminó (status %s), se relanza; POST /logs responde 503 mientras tanto",
+                         name, status)
+            new_pid = spawn(run_writer, listener, name)
+            writers[new_pid] = name
+            started[new_pid] = time.monotonic()
+        elif pid in workers:
+            del workers[pid]
+            logger.warning("el worker %d terminó (status %s), se relanza", pid, status)
+            new_pid = spawn(run_worker, listener, args.host, args.port)
+            workers[new_pid] = started[new_pid] = time.monotonic()
+
+    # Apagado ordenado: primero los workers (no entran más requests), después los writers (vacían su cola)
+    logger.info("apagando %d workers", len(workers))
+    for pid in workers:
+        terminate(pid)
+    for pid in workers:
+        reap(pid)
+    listener.close()
+    for pid in writers:
+        terminate(pid)
+    for pid in writers:
+        reap(pid)
+    logger.info("listo")
+
+
+def terminate(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def reap(pid: int) -> None:
+    try:
+        os.waitpid(pid, 0)
+    except ChildProcessError:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
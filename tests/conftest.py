@@ -0,0 +1,95 @@
+# conftest.py — fixtures comunes de los tests (python -m pytest)
+
+# La configuración se lee del entorno al importar app (config.py arma ENGINE con LOGS_DB_PATH),
+# así que antes de cualquier import de app apuntamos todo a una carpeta temporal:
+# los tests nunca tocan el logs.db del repo.
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="logs-tests-")
+os.environ["LOGS_DB_PATH"] = os.path.join(_TMP_DIR, "logs.db")
+os.environ["LOGS_SHARD_DIR"] = os.path.join(_TMP_DIR, "shards")
+os.environ["LOGS_ARCHIVE_DIR"] = os.path.join(_TMP_DIR, "archive")
+for name in ("LOGS_INGEST_MODE", "LOGS_PARTITIONING", "LOGS_SHARDING", "LOGS_STORAGE_LAYOUT",
+             "LOGS_FTS", "LOGS_RATE_LIMIT", "LOGS_ARCHIVE_AFTER_DAYS"):
+    os.environ.pop(name, None)
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import partitions  # noqa: E402
+from app.db import ENGINE, init_db, make_engine  # noqa: E402
+
+# Filtros de GET /logs sin ningún valor (como los arma parse_log_filters)
+NO_FILTERS = {"timestamp_start": None, "timestamp_end": None, "received_start": None,
+              "received_end": None, "service": None, "severity": None, "q": None}
+
+BASE_TIME = datetime(2030, 1, 1, 12, 0, 0)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    ENGINE.dispose()
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+# Fila lista para insert_rows; received_at se repite a propósito en varios tests (empates del orden)
+def make_row(i: int, service: str = "reports", severity: str = "INFO", received_at: datetime = BASE_TIME,
+             timestamp: datetime = None) -> Dict[str, Any]:
+    return {
+        "timestamp": timestamp or received_at - timedelta(seconds=i),
+        "received_at": received_at,
+        "service": service,
+        "severity": severity,
+        "message": f"log {i}",
+        "token_used": f"svc-{service}",
+    }
+
+
+def make_rows(count: int, **kwargs) -> List[Dict[str, Any]]:
+    return [make_row(i, **kwargs) for i in range(count)]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(str(tmp_path / "logs.db"))
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sessions(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+
+# El registro de particiones conocidas es del proceso (una sola DB): cada test arranca con DB nueva
+@pytest.fixture(autouse=True)
+def reset_partition_cache():
+    partitions._known_partitions.clear()
+    partitions._known_schema_version = None
+    yield
+    partitions._known_partitions.clear()
+    partitions._known_schema_version = None
+
+
+# App de Flask sobre la DB de LOGS_DB_PATH, vacía al empezar cada test
+@pytest.fixture
+def app():
+    from app import create_app
+
+    app = create_app()
+    with ENGINE.begin() as conn:
+        for table in ("logs", "log_rollups"):
+            conn.execute(text(f"DELETE FROM {table}"))
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
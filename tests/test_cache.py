@@ -0,0 +1,65 @@
+# test_cache.py — invalidación del cache de GET /logs (cache.py)
+
+from datetime import timedelta
+
+from app.cache import QueryCache, QueryScope
+from app.storage import WriteSummary
+from conftest import BASE_TIME, make_rows
+
+AUTH_REPORTS = {"Authorization": "Token svc-reports-123"}
+AUTH_CHAT = {"Authorization": "Token svc-chat-789"}
+
+
+def summary_of(rows) -> WriteSummary:
+    summary = WriteSummary()
+    summary.add(rows)
+    return summary
+
+
+def test_scope_matches_only_writes_that_can_change_the_result():
+    write = summary_of(make_rows(3, service="chat", severity="ERROR"))
+    assert QueryScope().affected_by(write)
+    assert QueryScope(service="chat", severity="ERROR").affected_by(write)
+    # ?severity=error filtra igual que ERROR
+    assert QueryScope(severity="error").affected_by(write)
+    assert not QueryScope(service="reports").affected_by(write)
+    assert not QueryScope(severity="DEBUG").affected_by(write)
+    assert not QueryScope(received_start=BASE_TIME + timedelta(minutes=1)).affected_by(write)
+    assert not QueryScope(timestamp_end=BASE_TIME - timedelta(hours=1)).affected_by(write)
+
+
+def test_entry_is_revalidated_or_dropped_by_later_writes():
+    cache = QueryCache(max_bytes=1024, max_entries=10)
+    cache.put("chat-errors", b"[]", {}, QueryScope(service="chat", severity="error"), cache.generation)
+
+    cache.note_write(summary_of(make_rows(2, service="reports", severity="ERROR")))
+    assert cache.get("chat-errors") is not None
+
+    cache.note_write(summary_of(make_rows(2, service="chat", severity="ERROR")))
+    assert cache.get("chat-errors") is None
+    assert cache.invalidations == 1
+
+
+# Una escritura confirmada mientras se ejecutaba la consulta invalida lo que se guarde con la generación vieja
+def test_write_during_query_is_not_lost():
+    cache = QueryCache(max_bytes=1024, max_entries=10)
+    generation = cache.generation
+    cache.note_write(summary_of(make_rows(1)))
+    cache.put("all", b"[]", {}, QueryScope(), generation)
+    assert cache.get("all") is None
+
+
+def test_get_logs_is_invalidated_by_a_matching_post(client):
+    item = {"timestamp": "2030-01-01T12:00:00Z", "severity": "error", "message": "boom"}
+
+    assert client.get("/logs?service=reports&severity=error").headers["X-Cache"] == "MISS"
+    assert client.get("/logs?service=reports&severity=error").headers["X-Cache"] == "HIT"
+
+    # Otro servicio no cambia el resultado: la entrada sigue sirviendo
+    assert client.post("/logs", json={**item, "service": "chat"}, headers=AUTH_CHAT).status_code == 201
+    assert client.get("/logs?service=reports&severity=error").headers["X-Cache"] == "HIT"
+
+    assert client.post("/logs", json={**item, "service": "reports"}, headers=AUTH_REPORTS).status_code == 201
+    response = client.get("/logs?service=reports&severity=error")
+    assert response.headers["X-Cache"] == "MISS"
+    assert [log["message"] for log in response.get_json()] == ["boom"]
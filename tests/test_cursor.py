@@ -0,0 +1,67 @@
+# test_cursor.py — paginado con cursor (keyset) de GET /logs
+
+from datetime import timedelta
+
+import pytest
+
+from app.storage import decode_cursor, encode_cursor, insert_rows, iter_log_rows
+from conftest import BASE_TIME, NO_FILTERS, make_rows
+
+AUTH = {"Authorization": "Token svc-reports-123"}
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(BASE_TIME, 42)) == (BASE_TIME, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", encode_cursor(BASE_TIME, 1)[:-3], "WyJ4Il0"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+# Lotes con el mismo received_at: el id desempata, así que ninguna página repite ni saltea filas
+def test_pages_with_tied_received_at_have_no_gaps_or_duplicates(sessions):
+    with sessions() as s:
+        for batch in range(5):
+            insert_rows(s, make_rows(50, received_at=BASE_TIME + timedelta(seconds=batch // 2)))
+        s.commit()
+
+    with sessions() as s:
+        expected = [(row.received_at, row.id) for row in iter_log_rows(s, NO_FILTERS)]
+        seen = []
+        after = None
+        while True:
+            page = list(iter_log_rows(s, NO_FILTERS, after=after, limit=30))
+            seen.extend((row.received_at, row.id) for row in page)
+            if len(page) < 30:
+                break
+            after = (page[-1].received_at, page[-1].id)
+
+    assert len(expected) == 250
+    assert seen == expected
+    assert expected == sorted(expected, reverse=True)
+
+
+def test_next_cursor_header_walks_every_log(client):
+    items = [{"timestamp": "2030-01-01T12:00:00Z", "service": "reports", "severity": "INFO", "message": f"log {i}"}
+             for i in range(7)]
+    assert client.post("/logs", json=items, headers=AUTH).status_code == 201
+
+    ids = []
+    response = client.get("/logs?limit=3")
+    while True:
+        ids.extend(log["id"] for log in response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get(f"/logs?limit=3&cursor={cursor}")
+
+    assert len(ids) == 7
+    assert ids == sorted(set(ids), reverse=True)
+
+
+def test_invalid_cursor_is_a_400(client):
+    response = client.get("/logs?cursor=no-es-un-cursor")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "cursor inválido"}
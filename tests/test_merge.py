@@ -0,0 +1,148 @@
+# test_merge.py — lecturas combinadas de varias tablas/DBs (particiones + logs, shards)
+# y retención: el merge tiene que dar el mismo orden que una sola tabla ordenada
+
+from collections import Counter
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import config
+from app.db import init_db
+from app.partitions import delete_legacy_logs_before, drop_partitions_before, list_partitions
+from app.rollups import ROLLUPS_TABLE
+from app.shards import Shard, ShardSet
+from app.storage import insert_rows, iter_log_rows, source_tables
+from conftest import BASE_TIME, NO_FILTERS, make_rows
+
+SERVICES = ["reports", "payments", "chat"]
+
+
+def keys(rows):
+    return [(row.received_at, row.id) for row in rows]
+
+
+# Páginas con cursor hasta agotar los resultados
+def walk_pages(fetch, page_size):
+    seen, after = [], None
+    while True:
+        page = fetch(after, page_size)
+        seen.extend(keys(page))
+        if len(page) < page_size:
+            return seen
+        after = (page[-1].received_at, page[-1].id)
+
+
+# Logs de antes de activar el particionado (tabla logs) + tres días de particiones, con
+# received_at intercalados entre unas y otras
+@pytest.fixture
+def partitioned(engine, sessions, monkeypatch):
+    with sessions() as s:
+        for day in range(3):
+            insert_rows(s, make_rows(20, received_at=BASE_TIME + timedelta(days=day, minutes=1),
+                                     timestamp=BASE_TIME + timedelta(days=day)))
+        s.commit()
+    monkeypatch.setattr(config, "PARTITIONING", "daily")
+    init_db(engine)   # reinicio con el particionado prendido: la secuencia de ids sigue a los de logs
+    with sessions() as s:
+        for day in range(3):
+            for batch in range(2):
+                insert_rows(s, make_rows(15, received_at=BASE_TIME + timedelta(days=day, minutes=batch),
+                                         timestamp=BASE_TIME + timedelta(days=day, hours=1)))
+        s.commit()
+    return sessions
+
+
+def test_partitioned_reads_merge_in_global_order(partitioned):
+    with partitioned() as s:
+        assert len(source_tables(s.connection())) == 4   # 3 particiones + logs
+        expected = sorted(keys(iter_log_rows(s, NO_FILTERS)), reverse=True)
+        assert keys(iter_log_rows(s, NO_FILTERS)) == expected
+        assert len(expected) == 150
+        assert len({log_id for _, log_id in expected}) == 150
+
+        assert keys(iter_log_rows(s, NO_FILTERS, limit=25, offset=40)) == expected[40:65]
+        paged = walk_pages(lambda after, size: list(iter_log_rows(s, NO_FILTERS, after=after, limit=size)), 25)
+        assert paged == expected
+
+
+def test_partitioned_reads_respect_timestamp_range(partitioned):
+    filters = {**NO_FILTERS, "timestamp_start": BASE_TIME + timedelta(days=1),
+               "timestamp_end": BASE_TIME + timedelta(days=1, hours=23)}
+    with partitioned() as s:
+        rows = list(iter_log_rows(s, filters))
+    assert len(rows) == 20 + 30
+    assert all(filters["timestamp_start"] <= row.timestamp <= filters["timestamp_end"] for row in rows)
+
+
+# Después de la retención, GET /logs/stats (rollups) tiene que coincidir con los logs que quedan
+def test_retention_keeps_rollups_in_sync(partitioned):
+    cutoff = BASE_TIME + timedelta(days=1, hours=12)
+    with partitioned.begin() as s:
+        conn = s.connection()
+        assert drop_partitions_before(conn, BASE_TIME + timedelta(days=1)) == ["logs_p20300101"]
+        assert delete_legacy_logs_before(conn, cutoff) == 40
+
+    with partitioned() as s:
+        conn = s.connection()
+        assert [p.name for p in list_partitions(conn)] == ["logs_p20300103", "logs_p20300102"]
+        remaining = Counter((row.service, row.severity) for row in iter_log_rows(s, NO_FILTERS))
+        for granularity in ("1m", "1h", "1d"):
+            query = (select(ROLLUPS_TABLE.c.service, ROLLUPS_TABLE.c.severity, func.sum(ROLLUPS_TABLE.c.count))
+                     .where(ROLLUPS_TABLE.c.granularity == granularity)
+                     .group_by(ROLLUPS_TABLE.c.service, ROLLUPS_TABLE.c.severity))
+            assert {(service, severity): count for service, severity, count in conn.execute(query)} == remaining
+    assert sum(remaining.values()) == 150 - 30 - 40
+
+
+# Un shard por servicio + la DB de antes del sharding: fetch_rows combina las páginas de todos
+@pytest.fixture
+def shards(engine, sessions, tmp_path, monkeypatch):
+    with sessions() as s:
+        insert_rows(s, make_rows(30, service="reports", received_at=BASE_TIME + timedelta(seconds=5)))
+        s.commit()
+    legacy = Shard("main", str(tmp_path / "logs.db"), engine, sessions, str(tmp_path / "archive"),
+                   str(tmp_path / "writer.sock"))
+
+    monkeypatch.setattr(config, "SHARDING", "service")
+    monkeypatch.setattr(config, "SHARD_DIR", str(tmp_path / "shards"))
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    shards = ShardSet(SERVICES, legacy=legacy)
+    shards.init()
+    for n, service in enumerate(SERVICES):
+        with shards.for_service(service).sessions() as s:
+            for second in range(4):
+                # el mismo received_at en todos los shards: el orden lo desempata el id
+                insert_rows(s, make_rows(10 + n, service=service, severity="ERROR" if n else "INFO",
+                                         received_at=BASE_TIME + timedelta(seconds=second * 3)))
+            s.commit()
+    yield shards
+    shards.dispose()
+
+
+def test_shard_ids_do_not_collide(shards):
+    ids = [log_id for _, log_id in keys(shards.fetch_rows(NO_FILTERS, None, 1000))]
+    assert len(ids) == len(set(ids)) == 30 + 4 * (10 + 11 + 12)
+    assert {shards.by_id(log_id).name for log_id in ids} == {"main", *SERVICES}
+
+
+def test_shard_fetch_rows_merges_in_global_order(shards):
+    expected = []
+    for shard in shards.all():
+        with shard.sessions() as s:
+            expected.extend(keys(iter_log_rows(s, NO_FILTERS)))
+    expected.sort(reverse=True)
+
+    assert keys(shards.fetch_rows(NO_FILTERS, None, 1000)) == expected
+    assert keys(shards.fetch_rows(NO_FILTERS, None, 20, offset=35)) == expected[35:55]
+    assert walk_pages(lambda after, size: shards.fetch_rows(NO_FILTERS, after, size), 17) == expected
+
+
+def test_shard_fetch_rows_by_service_and_severity(shards):
+    rows = shards.fetch_rows({**NO_FILTERS, "service": "reports"}, None, 1000)
+    # el shard de reports + los de reports que quedaron en la DB anterior
+    assert len(rows) == 4 * 10 + 30
+    assert {row.service for row in rows} == {"reports"}
+    rows = shards.fetch_rows({**NO_FILTERS, "severity": "ERROR"}, None, 1000)
+    assert {row.service for row in rows} == {"payments", "chat"}
+    assert keys(rows) == sorted(keys(rows), reverse=True)
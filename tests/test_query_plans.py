@@ -0,0 +1,39 @@
+# test_query_plans.py — cada combinación de filtros de GET /logs usa un índice, en cada layout
+# (lo mismo que benchmarks/query_plans.py, pero como test: un índice que se pierde rompe el build)
+
+import itertools
+
+import pytest
+
+from app.compact import COMPACT_VIEW, ensure_compact_schema
+from app.partitions import partition_table
+from app.storage import LOGS_TABLE, build_logs_query
+from benchmarks.query_plans import FILTER_GROUPS, FILTER_VALUES, plan_for
+
+COMBINATIONS = [
+    groups for n in range(len(FILTER_GROUPS) + 1) for groups in itertools.combinations(FILTER_GROUPS, n)
+]
+
+
+def combination_id(groups) -> str:
+    return "+".join(group[0].replace("_start", "") for group in groups) or "no-filters"
+
+
+@pytest.fixture
+def conn(engine):
+    with engine.begin() as conn:
+        ensure_compact_schema(conn)
+        partition_table("logs_p20300101").create(bind=conn, checkfirst=True)
+    with engine.connect() as conn:
+        yield conn
+
+
+@pytest.mark.parametrize("layout", ["logs", "compact", "partition"])
+@pytest.mark.parametrize("groups", COMBINATIONS, ids=combination_id)
+def test_filters_use_an_index(conn, layout, groups):
+    table = {"logs": LOGS_TABLE, "compact": COMPACT_VIEW, "partition": partition_table("logs_p20300101")}[layout]
+    filters = {name: FILTER_VALUES[name] for group in groups for name in group}
+    plan = plan_for(conn, build_logs_query(table, **filters))
+    # "SCAN <tabla>" sin "USING ... INDEX" = recorrido completo de la tabla
+    full_scans = [step for step in plan if step.strip().startswith("SCAN ") and "USING" not in step]
+    assert not full_scans, plan
@@ -0,0 +1,93 @@
+# test_writer.py — cola de ingesta con group commit (writer.py) y el writer de serve.py por socket Unix
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.storage import LOGS_TABLE
+from app.writer import IngestQueue, IngestUnavailable
+from app.writer_socket import CommitSubscriber, WriterClient, WriterServer
+from conftest import make_rows
+
+
+def count_logs(sessions) -> int:
+    with sessions() as s:
+        return s.execute(select(func.count()).select_from(LOGS_TABLE)).scalar_one()
+
+
+@pytest.fixture
+def queue(sessions):
+    queue = IngestQueue(sessions, max_rows=1_000, commit_rows=100, commit_interval_ms=5, ack="commit",
+                        ack_timeout_s=5)
+    queue.start()
+    yield queue
+    queue.stop(timeout=5)
+
+
+def test_a_failing_listener_does_not_fail_the_commit(queue, sessions):
+    summaries = []
+
+    def broken(summary):
+        raise RuntimeError("listener roto")
+
+    queue.listeners.extend([broken, lambda summary: summaries.append(summary.rows)])
+    queue.enqueue(make_rows(10))
+    assert count_logs(sessions) == 10
+    assert summaries == [10]
+    assert queue.stats()["write_errors"] == 0
+
+
+def test_a_failed_group_does_not_stop_the_writer(queue, sessions):
+    with pytest.raises(IngestUnavailable) as error:
+        queue.enqueue([{"service": "reports"}])   # fila sin columnas obligatorias
+    assert error.value.reason == "write_failed"
+
+    queue.enqueue(make_rows(3))
+    assert count_logs(sessions) == 3
+    assert queue.stats()["write_errors"] == 1
+
+
+def test_full_queue_rejects_the_batch(sessions):
+    # Sin start(): nadie vacía la cola
+    queue = IngestQueue(sessions, max_rows=5, commit_rows=100, commit_interval_ms=5)
+    queue.enqueue(make_rows(5))
+    with pytest.raises(IngestUnavailable) as error:
+        queue.enqueue(make_rows(1))
+    assert error.value.reason == "ingest_queue_full"
+
+
+# Un worker de serve.py: manda filas al writer por el socket y recibe los commits de vuelta
+def test_writer_socket_roundtrip(queue, sessions, tmp_path):
+    socket_path = str(tmp_path / "writer.sock")
+    server = WriterServer(socket_path, queue)
+    server.start()
+    try:
+        received = []
+        committed = threading.Event()
+
+        def on_commit(summary):
+            received.append(summary)
+            committed.set()
+
+        CommitSubscriber(socket_path, [on_commit], retry_s=0.05).start()
+        deadline = time.monotonic() + 5
+        while not server._subscribers and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        client = WriterClient(socket_path, ack="commit", ack_timeout_s=5)
+        client.enqueue(make_rows(7, service="chat", severity="ERROR"))
+        assert count_logs(sessions) == 7
+        assert client.stats()["committed_rows"] == 7
+
+        assert committed.wait(5)
+        assert received[0].rows == 7
+        assert received[0].services == {"chat"} and received[0].severities == {"ERROR"}
+    finally:
+        server.stop()
+
+    # Sin writer, el worker contesta 503 en vez de colgarse
+    with pytest.raises(IngestUnavailable) as error:
+        WriterClient(socket_path, ack="commit", ack_timeout_s=1).enqueue(make_rows(1))
+    assert error.value.reason == "writer_unavailable"